@@ -0,0 +1,119 @@
+# bench_asg_filter.py
+"""Micro-benchmark comparing ways of matching Auto Scaling Groups to the
+Subnets of Virtual Private Clouds.
+
+- list: the original filter, checking each Subnet Id with "in" against a
+  list of Subnet Ids, O(ASGs x zones x subnets).
+- set: filter_auto_scaling_groups_by_subnets, checking against a set.
+- index: group_auto_scaling_groups_by_vpc, classifying the Auto Scaling
+  Groups of every VPC in one linear pass.
+
+Each row renders every VPC, the way a multi VPC render would.
+
+Run from the project directory with...
+    python -m benchmarks.bench_asg_filter
+"""
+
+import random
+import timeit
+
+from vpc_tree.aws_resources import (
+    filter_auto_scaling_groups_by_subnets,
+    group_auto_scaling_groups_by_vpc,
+    index_subnet_vpcs,
+)
+
+SIZES = [
+    # (VPCs, Subnets per VPC, Auto Scaling Groups)
+    (1, 50, 500),
+    (5, 100, 2000),
+    (10, 200, 5000),
+    (20, 400, 10000),
+]
+
+
+def make_inventory(vpc_count, subnets_per_vpc, asg_count, seed=0):
+    """Create synthetic Subnets and Auto Scaling Groups."""
+    rng = random.Random(seed)
+    subnets = [
+        {"SubnetId": f"subnet-{v:04d}{s:04d}", "VpcId": f"vpc-{v:04d}"}
+        for v in range(vpc_count)
+        for s in range(subnets_per_vpc)
+    ]
+    asgs = []
+    for i in range(asg_count):
+        vpc = rng.randrange(vpc_count)
+        zones = rng.sample(range(subnets_per_vpc), 3)
+        asgs.append(
+            {
+                "AutoScalingGroupARN": f"arn:aws:asg-{i}",
+                "VPCZoneIdentifier": ",".join(
+                    f"subnet-{vpc:04d}{s:04d}" for s in zones
+                ),
+            }
+        )
+    return subnets, asgs
+
+
+def list_filter(auto_scaling_groups, subnet_ids):
+    """The original list based filter."""
+    filtered_asgs = []
+    for asg in auto_scaling_groups:
+        asg_subnet_ids = asg["VPCZoneIdentifier"].split(",")
+        if any(id in subnet_ids for id in asg_subnet_ids):
+            filtered_asgs.append(asg)
+    return filtered_asgs
+
+
+def per_vpc(filter_function, subnets, asgs):
+    """Filter the Auto Scaling Groups of every VPC one VPC at a time."""
+    vpc_subnet_ids = {}
+    for subnet in subnets:
+        vpc_subnet_ids.setdefault(subnet["VpcId"], []).append(
+            subnet["SubnetId"]
+        )
+    return {
+        vpc_id: filter_function(asgs, subnet_ids)
+        for vpc_id, subnet_ids in vpc_subnet_ids.items()
+    }
+
+
+def indexed(subnets, asgs):
+    """Classify the Auto Scaling Groups of every VPC in one pass."""
+    return group_auto_scaling_groups_by_vpc(asgs, index_subnet_vpcs(subnets))
+
+
+def main():
+    print(f"{'vpcs':>5} {'subnets':>8} {'asgs':>6} "
+          f"{'list s':>9} {'set s':>9} {'index s':>9}")
+    for vpc_count, subnets_per_vpc, asg_count in SIZES:
+        subnets, asgs = make_inventory(vpc_count, subnets_per_vpc, asg_count)
+        expected = per_vpc(list_filter, subnets, asgs)
+        filtered = per_vpc(
+            filter_auto_scaling_groups_by_subnets, subnets, asgs
+        )
+        assert filtered == expected
+        assert indexed(subnets, asgs) == {
+            vpc_id: vpc_asgs
+            for vpc_id, vpc_asgs in expected.items()
+            if len(vpc_asgs) > 0
+        }
+
+        times = [
+            min(timeit.repeat(function, number=1, repeat=3))
+            for function in (
+                lambda: per_vpc(list_filter, subnets, asgs),
+                lambda: per_vpc(
+                    filter_auto_scaling_groups_by_subnets, subnets, asgs
+                ),
+                lambda: indexed(subnets, asgs),
+            )
+        ]
+        print(
+            f"{vpc_count:>5} {vpc_count * subnets_per_vpc:>8} {asg_count:>6} "
+            + " ".join(f"{t:>9.4f}" for t in times)
+        )
+
+
+if __name__ == "__main__":
+    main()
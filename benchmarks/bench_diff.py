@@ -0,0 +1,72 @@
+# bench_diff.py
+"""Micro-benchmark of tree_diff comparing the trees of two versions of the
+large synthetic inventory.
+
+The new version has one Instance stopped and one Security Group rule added.
+Parsing the trees into nodes, diffing them and rendering the changes is
+timed against difflib's unified diff of the same lines.
+
+Run from the project directory with...
+    python -m benchmarks.bench_diff
+"""
+
+import difflib
+import time
+
+from vpc_tree import model, tree_diff
+from vpc_tree.fetch import VPCResources
+from vpc_tree.vpc_tree import VPCTree
+
+from .synthetic import PRESETS, Inventory
+
+
+def make_resources(inventory):
+    """Project the inventory onto the model."""
+    return VPCResources(
+        model.VPC.from_boto3(inventory.vpc),
+        model.project(model.SecurityGroup, inventory.security_groups),
+        model.project(model.Subnet, inventory.subnets),
+        model.project(model.Instance, inventory.instances),
+        model.project(model.LoadBalancer, inventory.load_balancers),
+        model.project(model.AutoScalingGroup, inventory.auto_scaling_groups),
+        model.project(model.TargetGroup, inventory.target_groups),
+    )
+
+
+def main():
+    inventory = Inventory(0, **PRESETS["large"])
+    old_lines = VPCTree()._vpc_text(make_resources(inventory))
+
+    resources = make_resources(inventory)
+    resources.instances[len(resources.instances) // 2].state = "stopped"
+    group = resources.security_groups[0]
+    group.ingress = group.ingress + (
+        model.Permission("tcp", 443, 443, ("0.0.0.0/0",), ()),
+    )
+    new_lines = VPCTree()._vpc_text(resources)
+
+    start = time.perf_counter()
+    old_roots = tree_diff.parse_trees(old_lines)
+    new_roots = tree_diff.parse_trees(new_lines)
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    changes = list(tree_diff.iter_diff_lines(old_roots, new_roots))
+    diff_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    unified = list(difflib.unified_diff(old_lines, new_lines, lineterm=""))
+    difflib_seconds = time.perf_counter() - start
+
+    print(f"{len(old_lines)} and {len(new_lines)} tree lines")
+    print(f"{'method':<14} {'seconds':>8} {'lines out':>10}")
+    for name, seconds, count in (
+        ("parse + hash", parse_seconds, ""),
+        ("tree diff", diff_seconds, len(changes)),
+        ("difflib", difflib_seconds, len(unified)),
+    ):
+        print(f"{name:<14} {seconds:>8.3f} {count:>10}")
+
+
+if __name__ == "__main__":
+    main()
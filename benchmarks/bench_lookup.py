@@ -0,0 +1,133 @@
+# bench_lookup.py
+"""Micro-benchmark of lookup.LookupIndex answering which Subnet and Instance
+IPv4 addresses belong to.
+
+Addresses are drawn from the large synthetic inventory's Subnets, a quarter
+of them the private IP address of an Instance and a tenth outside every
+Subnet.  Batch lookups of every address at once are timed with and, when it
+is installed, without NumPy, and a linear scan over the Subnets with the
+ipaddress module is timed on a sample for comparison.
+
+Run from the project directory with...
+    python -m benchmarks.bench_lookup
+"""
+
+import ipaddress
+import random
+import time
+
+from vpc_tree.fetch import VPCResources
+from vpc_tree import ipv4_batch
+from vpc_tree.ipv4 import parse_address
+from vpc_tree.lookup import LookupIndex
+from vpc_tree.model import VPC, Instance, Subnet, project
+
+from .synthetic import PRESETS, Inventory
+
+LOOKUPS = 1_000_000
+LINEAR_SAMPLE = 2_000
+
+
+def make_addresses(inventory, count, seed=0):
+    """Create addresses to look up."""
+    rng = random.Random(seed)
+    instance_ips = [i["PrivateIpAddress"] for i in inventory.instances]
+    networks = [
+        ipaddress.ip_network(subnet["CidrBlock"])
+        for subnet in inventory.subnets
+    ]
+    addresses = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.25:
+            addresses.append(rng.choice(instance_ips))
+        elif roll < 0.35:
+            host = rng.randrange(2**16)
+            addresses.append(f"192.168.{host >> 8}.{host & 255}")
+        else:
+            network = rng.choice(networks)
+            host = rng.randrange(network.num_addresses)
+            addresses.append(str(network.network_address + host))
+    return addresses
+
+
+def linear_lookup(subnets, address):
+    """Find the Subnets containing an address by checking each in turn."""
+    ip = ipaddress.ip_address(address)
+    return [subnet for subnet, network in subnets if ip in network]
+
+
+def main():
+    inventory = Inventory(0, **PRESETS["large"])
+    resources = VPCResources(
+        VPC.from_boto3(inventory.vpc),
+        [],
+        project(Subnet, inventory.subnets),
+        project(Instance, inventory.instances),
+        [],
+        [],
+        [],
+    )
+
+    start = time.perf_counter()
+    index = LookupIndex([resources])
+    build_seconds = time.perf_counter() - start
+
+    addresses = make_addresses(inventory, LOOKUPS)
+    start = time.perf_counter()
+    found = 0
+    for address in addresses:
+        found += len(index.lookup(parse_address(address)))
+    lookup_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for line in index.iter_lookup_lines(addresses):
+        pass
+    lines_seconds = time.perf_counter() - start
+
+    packed = [parse_address(address) for address in addresses]
+    batch_seconds = {}
+    for use_numpy in (False, True):
+        if use_numpy and not ipv4_batch.HAVE_NUMPY:
+            continue
+        start = time.perf_counter()
+        ipv4_batch.contained_in(
+            packed,
+            [subnet.cidr_block for subnet in resources.subnets],
+            use_numpy=use_numpy,
+        )
+        batch_seconds[use_numpy] = time.perf_counter() - start
+
+    subnets = [
+        (subnet, ipaddress.ip_network(subnet.cidr_block))
+        for subnet in resources.subnets
+    ]
+    sample = addresses[:LINEAR_SAMPLE]
+    start = time.perf_counter()
+    for address in sample:
+        linear_lookup(subnets, address)
+    linear_seconds = time.perf_counter() - start
+
+    print(
+        f"index of {len(resources.subnets)} subnets and "
+        f"{len(resources.instances)} instances built in {build_seconds:.3f} s"
+    )
+    print(f"{'method':<14} {'lookups':>9} {'seconds':>8} {'per second':>11}")
+    rows = [
+        ("trie", LOOKUPS, lookup_seconds),
+        ("trie + format", LOOKUPS, lines_seconds),
+        ("batch", LOOKUPS, batch_seconds[False]),
+    ]
+    if True in batch_seconds:
+        rows.append(("batch numpy", LOOKUPS, batch_seconds[True]))
+    rows.append(("linear", LINEAR_SAMPLE, linear_seconds))
+    for name, count, seconds in rows:
+        print(
+            f"{name:<14} {count:>9} {seconds:>8.3f} "
+            f"{count / seconds:>11.0f}"
+        )
+    print(f"{found} of {LOOKUPS} addresses found in a subnet")
+
+
+if __name__ == "__main__":
+    main()
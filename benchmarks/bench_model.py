@@ -0,0 +1,70 @@
+# bench_model.py
+"""Micro-benchmark comparing the memory held by Boto3 resource dictionaries
+with the memory held by the same resources projected onto vpc_tree.model.
+
+The synthetic inventory is round tripped through JSON first, so the
+dictionaries own their strings the way ones parsed from an AWS response do,
+rather than sharing the generator's.
+
+Run from the project directory with...
+    python -m benchmarks.bench_model
+"""
+
+import gc
+import json
+import time
+import tracemalloc
+
+from vpc_tree.model import MODEL_CLASSES, project
+
+from .synthetic import PRESETS, Inventory
+
+RESOURCE_NAMES = [
+    "security_groups",
+    "subnets",
+    "instances",
+    "load_balancers",
+    "auto_scaling_groups",
+    "target_groups",
+]
+
+
+def retained(function):
+    """Call a function, returning its result, the bytes it left allocated
+    and the seconds it took."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before, seconds
+
+
+def main():
+    inventory = Inventory(0, **PRESETS["large"])
+    text = {
+        name: json.dumps(getattr(inventory, name), default=str)
+        for name in RESOURCE_NAMES
+    }
+
+    print(f"{'resource':<20} {'count':>7} {'dict MiB':>9} {'model MiB':>10} "
+          f"{'ratio':>6} {'project s':>10}")
+    for name in RESOURCE_NAMES:
+        resources, dict_bytes, _ = retained(lambda: json.loads(text[name]))
+        models, model_bytes, seconds = retained(
+            lambda: project(MODEL_CLASSES[name], resources)
+        )
+        resources = None
+        print(
+            f"{name:<20} {len(models):>7} {dict_bytes / 2**20:>9.2f} "
+            f"{model_bytes / 2**20:>10.2f} "
+            f"{dict_bytes / max(model_bytes, 1):>6.1f} {seconds:>10.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench_prefix.py
+"""Benchmark rendering a synthetic tree of about a million lines with the
+original prefix rendering and with the current one.
+
+- original: every item gets a new copy of its prefix description and every
+  line rebuilds its prefix string one part at a time.
+- current: vpc_tree.text_tree.iter_tree, sharing prefix descriptions between
+  sibling items, with vpc_tree.prefix.get_prefix looking up prefix strings
+  that have already been built.
+
+Both renderers must produce byte identical output.
+
+Run from the project directory with...
+    python -m benchmarks.bench_prefix
+"""
+
+import hashlib
+import time
+
+from vpc_tree.prefix import build_prefix, get_prefix
+from vpc_tree.text_tree import iter_tree
+
+# Children per node at each level, 1 + 10 + 100 + ... lines per heading.
+BRANCHING = [10, 10, 10, 10, 10, 10]
+
+
+def make_tree(depth=0):
+    """Create nested lists describing a synthetic tree."""
+    if depth == len(BRANCHING):
+        return []
+    return [make_tree(depth + 1) for _ in range(BRANCHING[depth])]
+
+
+def original_iter_tree(prefix_description, heading, items, item_function):
+    """iter_tree as it was originally written."""
+    yield f"{build_prefix(prefix_description)}{heading}"
+    item_count = len(items)
+    for i in range(item_count):
+        last_item = i == item_count - 1
+        yield from item_function(prefix_description + [last_item], items[i])
+
+
+def original_item(prefix_description, children):
+    """Item function using the original prefix rendering."""
+    yield f"{build_prefix(prefix_description)}node : {len(children)}"
+    if len(children) > 0:
+        yield from original_iter_tree(
+            prefix_description + [True], "Children:", children, original_item
+        )
+
+
+def current_item(prefix_description, children):
+    """Item function using the current prefix rendering."""
+    yield f"{get_prefix(prefix_description)}node : {len(children)}"
+    if len(children) > 0:
+        yield from iter_tree(
+            prefix_description + [True], "Children:", children, current_item
+        )
+
+
+def render(iter_function, item_function, tree):
+    """Render tree, returning the line count, digest and seconds taken."""
+    digest = hashlib.sha256()
+    line_count = 0
+    start = time.perf_counter()
+    for line in iter_function([False], "Root:", tree, item_function):
+        digest.update(line.encode())
+        digest.update(b"\n")
+        line_count += 1
+    return line_count, digest.hexdigest(), time.perf_counter() - start
+
+
+def main():
+    tree = make_tree()
+    original = render(original_iter_tree, original_item, tree)
+    current = render(iter_tree, current_item, tree)
+    assert original[:2] == current[:2], "output is not byte identical"
+
+    print(f"lines    {original[0]}")
+    print(f"original {original[2]:.2f} s")
+    print(f"current  {current[2]:.2f} s")
+    print(f"speed up {original[2] / current[2]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# bench_reachability.py
+"""Micro-benchmark of reachability.ReachabilityIndex answering which
+Instances can receive traffic on a port from a source.
+
+Queries are drawn from the large synthetic inventory, ports from its rules
+and sources from CIDR blocks, Instance addresses and Security Group Ids.  A
+linear scan over every rule of every Security Group is timed on a sample
+for comparison.
+
+Run from the project directory with...
+    python -m benchmarks.bench_reachability
+"""
+
+import ipaddress
+import random
+import time
+
+from vpc_tree.fetch import VPCResources
+from vpc_tree.model import VPC, Instance, SecurityGroup, project
+from vpc_tree.reachability import ReachabilityIndex, _port_range
+
+from .synthetic import PRESETS, Inventory
+
+QUERIES = 2_000
+LINEAR_SAMPLE = 20
+
+
+def make_queries(resources, count, seed=0):
+    """Create (port, source) queries."""
+    rng = random.Random(seed)
+    ports = [
+        permission.from_port
+        for group in resources.security_groups
+        for permission in group.ingress
+        if permission.from_port is not None
+    ]
+    sources = [f"10.{octet}.0.0/16" for octet in range(256)]
+    sources += [i.private_ip_address for i in resources.instances[:1000]]
+    sources += [g.group_id for g in resources.security_groups]
+    return [
+        (rng.choice(ports), rng.choice(sources)) for _ in range(count)
+    ]
+
+
+def linear_query(resources, port, source):
+    """Find the Instances reachable on a port from a CIDR block or address
+    by checking every rule of every Security Group."""
+    if source.startswith("sg-"):
+        return None
+    network = ipaddress.ip_network(source, strict=False)
+    groups = set()
+    for group in resources.security_groups:
+        for permission in group.ingress:
+            from_port, to_port = _port_range(permission)
+            if not from_port <= port <= to_port:
+                continue
+            for cidr_block in permission.ip_ranges:
+                rule_network = ipaddress.ip_network(cidr_block, strict=False)
+                if network.overlaps(rule_network):
+                    groups.add(group.group_id)
+    return [
+        instance
+        for instance in resources.instances
+        if groups.intersection(instance.security_group_ids)
+    ]
+
+
+def main():
+    inventory = Inventory(0, **PRESETS["large"])
+    resources = VPCResources(
+        VPC.from_boto3(inventory.vpc),
+        project(SecurityGroup, inventory.security_groups),
+        [],
+        project(Instance, inventory.instances),
+        [],
+        [],
+        [],
+    )
+
+    start = time.perf_counter()
+    index = ReachabilityIndex([resources])
+    build_seconds = time.perf_counter() - start
+
+    queries = make_queries(resources, QUERIES)
+    start = time.perf_counter()
+    found = 0
+    for port, source in queries:
+        found += len(index.query(port, source))
+    query_seconds = time.perf_counter() - start
+
+    sample = [q for q in queries if not q[1].startswith("sg-")][:LINEAR_SAMPLE]
+    start = time.perf_counter()
+    for port, source in sample:
+        linear_query(resources, port, source)
+    linear_seconds = time.perf_counter() - start
+
+    rules = sum(
+        len(p.ip_ranges) + len(p.group_ids)
+        for group in resources.security_groups
+        for p in group.ingress
+    )
+    print(
+        f"index of {rules} rules and {len(resources.instances)} instances "
+        f"built in {build_seconds:.3f} s"
+    )
+    print(f"{'method':<8} {'queries':>8} {'seconds':>8} {'ms each':>8}")
+    for name, count, seconds in (
+        ("index", QUERIES, query_seconds),
+        ("linear", len(sample), linear_seconds),
+    ):
+        print(
+            f"{name:<8} {count:>8} {seconds:>8.3f} "
+            f"{seconds * 1000 / count:>8.2f}"
+        )
+    print(f"{found / QUERIES:.0f} instances reachable per query on average")
+
+
+if __name__ == "__main__":
+    main()
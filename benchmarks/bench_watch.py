@@ -0,0 +1,97 @@
+# bench_watch.py
+"""Micro-benchmark of generating the tree of the large synthetic inventory
+again on each --watch poll.
+
+Each poll projects the inventory again, as a fetch would, with the state
+of the next 1% of the Instances changed, like a deploy rolling through an
+Auto Scaling Group.  Generating the tree with and without a RenderCache is
+timed, the first poll filling the cache.  Diffing the tree with the last
+poll's is timed too, reading both trees into nodes with parse_trees and
+reading only the new tree with a TreeParser reusing the nodes of the lines
+the RenderCache reused.
+
+Run from the project directory with...
+    python -m benchmarks.bench_watch
+"""
+
+import time
+
+from vpc_tree import tree_diff
+from vpc_tree.text_tree import RenderCache
+from vpc_tree.vpc_tree import VPCTree
+
+from .bench_diff import make_resources
+from .synthetic import PRESETS, Inventory
+
+POLLS = 5
+
+
+def main():
+    inventory = Inventory(0, **PRESETS["large"])
+    tree = VPCTree()
+    render_cache = RenderCache()
+    parser = tree_diff.TreeParser()
+    old_lines = old_roots = None
+    step = len(inventory.instances) // 100
+    print(
+        f"{'poll':<6} {'uncached':>9} {'cached':>9} {'generated':>10} "
+        f"{'diff':>9} {'reused':>9} {'changes':>8}"
+    )
+    for poll in range(POLLS):
+        first = max(poll - 1, 0) * step
+        last = poll * step
+        for instance in inventory.instances[first:last]:
+            running = instance["State"]["Name"] == "running"
+            instance["State"] = {"Name": "stopped" if running else "running"}
+        resources = make_resources(inventory)
+
+        start = time.perf_counter()
+        lines = list(tree.iter_vpc_lines(resources))
+        uncached_seconds = time.perf_counter() - start
+
+        misses = render_cache.misses
+        start = time.perf_counter()
+        cached_lines = list(
+            tree.iter_vpc_lines(resources, render_cache=render_cache)
+        )
+        render_cache.sweep()
+        cached_seconds = time.perf_counter() - start
+        assert cached_lines == lines
+
+        generated = render_cache.misses - misses
+        diff_seconds = reused_seconds = 0.0
+        changes = 0
+        if old_lines is None:
+            # The first poll has nothing to diff, --watch only reads it into
+            # nodes once the tree changes.
+            old_roots = parser.parse(cached_lines)
+        else:
+            start = time.perf_counter()
+            diff_lines = list(
+                tree_diff.iter_diff_lines(
+                    tree_diff.parse_trees(old_lines),
+                    tree_diff.parse_trees(cached_lines),
+                )
+            )
+            diff_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            new_roots = parser.parse(cached_lines)
+            reused_lines = list(
+                tree_diff.iter_diff_lines(old_roots, new_roots)
+            )
+            reused_seconds = time.perf_counter() - start
+            assert reused_lines == diff_lines
+            changes = len(diff_lines)
+            old_roots = new_roots
+        old_lines = cached_lines
+
+        print(
+            f"{poll:<6} {uncached_seconds:>9.3f} {cached_seconds:>9.3f} "
+            f"{generated:>10} {diff_seconds:>9.3f} {reused_seconds:>9.3f} "
+            f"{changes:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
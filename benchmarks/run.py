@@ -0,0 +1,219 @@
+# run.py
+"""Benchmark suite timing VPC Tree's tree generators and full render on a
+synthetic inventory.
+
+Each benchmark is timed as the best of several runs, then run once more
+under tracemalloc to record its peak memory.  Results can be saved to a JSON
+baseline and later runs compared against it, flagging any benchmark that
+got slower or used more memory than the allowed tolerance.
+
+Run from the project directory with...
+    python -m benchmarks.run --preset large --save benchmarks/baseline.json
+    python -m benchmarks.run --preset large --compare benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from itertools import product
+
+from vpc_tree import cache, clients, fetch, model
+from vpc_tree.asg_tree import ASGTree
+from vpc_tree.lb_tree import LBTree
+from vpc_tree.prefix import get_prefix
+from vpc_tree.sg_tree import SGTree
+from vpc_tree.subnet_tree import SubnetTree
+from vpc_tree.tg_tree import TGTree
+from vpc_tree.vpc_tree import VPCTree
+
+from .synthetic import PRESETS, Inventory, StubRegistry
+
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.2
+
+# Differences smaller than these are noise, whatever their ratio.
+MIN_DIFFERENCES = {"seconds": 0.01, "peak_bytes": 2**20}
+
+
+def count_lines(lines):
+    """Consume a line generator, returning the number of lines."""
+    count = 0
+    for _ in lines:
+        count += 1
+    return count
+
+
+def prefix_descriptions():
+    """Every prefix description up to 7 levels deep."""
+    return [
+        list(description)
+        for depth in range(8)
+        for description in product([False, True], repeat=depth)
+    ]
+
+
+def make_benchmarks(inventory, registry):
+    """Create the benchmarks, functions returning a count of work done."""
+    descriptions = prefix_descriptions()
+    security_groups = model.project(
+        model.SecurityGroup, inventory.security_groups
+    )
+    subnets = model.project(model.Subnet, inventory.subnets)
+    instances = model.project(model.Instance, inventory.instances)
+    load_balancers = model.project(
+        model.LoadBalancer, inventory.load_balancers
+    )
+    auto_scaling_groups = model.project(
+        model.AutoScalingGroup, inventory.auto_scaling_groups
+    )
+    target_groups = model.project(model.TargetGroup, inventory.target_groups)
+
+    def prefixes():
+        for _ in range(2000):
+            for description in descriptions:
+                get_prefix(description)
+        return 2000 * len(descriptions)
+
+    def vpc_text():
+        previous = clients.get_registry()
+        clients.set_registry(registry)
+        try:
+            resources = fetch.fetch_vpc_resources(inventory.vpc["VpcId"])
+            return len(VPCTree()._vpc_text(resources))
+        finally:
+            clients.set_registry(previous)
+
+    return {
+        "sg_tree": lambda: count_lines(
+            SGTree(security_groups).iter_lines([False])
+        ),
+        "subnet_tree": lambda: count_lines(
+            SubnetTree(subnets, instances).iter_lines([False])
+        ),
+        "lb_tree": lambda: count_lines(
+            LBTree(load_balancers).iter_lines([False])
+        ),
+        "asg_tree": lambda: count_lines(
+            ASGTree(auto_scaling_groups).iter_lines([False])
+        ),
+        "tg_tree": lambda: count_lines(
+            TGTree(target_groups).iter_lines([True])
+        ),
+        "get_prefix": prefixes,
+        "vpc_text": vpc_text,
+    }
+
+
+def run_benchmark(function, repeat):
+    """Time a benchmark and measure its peak memory."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = function()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": min(seconds), "peak_bytes": peak, "count": count}
+
+
+def compare(results, baseline, tolerance):
+    """Compare results to a baseline, returning a list of regressions."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        for metric, min_difference in MIN_DIFFERENCES.items():
+            if result[metric] - previous[metric] < min_difference:
+                continue
+            ratio = result[metric] / max(previous[metric], 1e-9)
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name} {metric} {ratio:.2f}x baseline")
+    return regressions
+
+
+def parse_arguments():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="VPC Tree benchmark suite",
+    )
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--only", help="Comma separated names of benchmarks to run"
+    )
+    parser.add_argument("--save", metavar="FILE", help="Save results as JSON")
+    parser.add_argument(
+        "--compare", metavar="FILE", help="Compare with a saved baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Allowed fractional slow down before a regression is reported",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    cache.disable()
+
+    start = time.perf_counter()
+    inventory = Inventory(args.seed, **PRESETS[args.preset])
+    registry = StubRegistry([inventory])
+    print(
+        f"generated {args.preset} inventory in "
+        f"{time.perf_counter() - start:.2f} s",
+        file=sys.stderr,
+    )
+
+    benchmarks = make_benchmarks(inventory, registry)
+    if args.only:
+        names = args.only.split(",")
+        benchmarks = {name: benchmarks[name] for name in names}
+
+    results = {}
+    print(f"{'benchmark':<12} {'seconds':>9} {'peak MiB':>9} {'count':>9}")
+    for name, function in benchmarks.items():
+        result = run_benchmark(function, args.repeat)
+        results[name] = result
+        print(
+            f"{name:<12} {result['seconds']:>9.3f} "
+            f"{result['peak_bytes'] / 2**20:>9.1f} {result['count']:>9}"
+        )
+
+    report = {
+        "meta": {
+            "preset": args.preset,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+# synthetic.py
+"""Seeded generator of synthetic AWS inventories shaped like Boto3 responses,
+and stubbed clients that serve them.
+
+The same seed and sizes always give the same inventory, so timings can be
+compared between runs.
+"""
+
+import random
+from datetime import datetime, timezone
+
+AZS = ["eu-west-2a", "eu-west-2b", "eu-west-2c"]
+INSTANCE_TYPES = ["t3.micro", "t3.small", "m5.large", "c5.xlarge"]
+STATES = ["running", "running", "running", "stopped"]
+PROTOCOLS = ["tcp", "tcp", "udp", "-1"]
+
+PRESETS = {
+    "small": {
+        "security_groups": 20,
+        "rules_per_group": 5,
+        "subnets": 10,
+        "instances": 200,
+        "load_balancers": 10,
+        "auto_scaling_groups": 10,
+        "target_groups": 20,
+    },
+    "large": {
+        "security_groups": 1000,
+        "rules_per_group": 50,
+        "subnets": 500,
+        "instances": 50000,
+        "load_balancers": 2000,
+        "auto_scaling_groups": 2000,
+        "target_groups": 5000,
+    },
+}
+
+ACCOUNT_ID = "123456789012"
+REGION = "eu-west-2"
+
+
+class Inventory:
+    """A synthetic inventory of one Virtual Private Cloud.
+
+    Region wide resources are generated for the VPC only, so no filtering is
+    needed to find them.
+
+    Attributes:
+        vpc: A dictionary containing the Virtual Private Cloud.
+        security_groups, subnets, instances, load_balancers,
+        auto_scaling_groups, target_groups: Lists of dictionaries shaped
+        like the resources returned by Boto3.
+    """
+
+    def __init__(self, seed=0, vpc_index=0, **sizes):
+        """Generate an inventory.
+
+        Args:
+            seed: An integer seeding the random number generator.
+            vpc_index: An integer used to give the VPC a unique Id and CIDR.
+            sizes: Integers overriding the "small" preset's sizes.
+        """
+        sizes = {**PRESETS["small"], **sizes}
+        self._rng = random.Random(seed)
+        self._vpc_id = f"vpc-{vpc_index:017x}"
+        self._vpc_index = vpc_index
+        self.vpc = {
+            "VpcId": self._vpc_id,
+            "CidrBlock": f"10.{vpc_index}.0.0/16",
+            "State": "available",
+            "Tags": [{"Key": "Name", "Value": f"synthetic-{vpc_index}"}],
+        }
+        self.security_groups = [
+            self._security_group(
+                i, sizes["rules_per_group"], sizes["security_groups"]
+            )
+            for i in range(sizes["security_groups"])
+        ]
+        self.subnets = [self._subnet(i) for i in range(sizes["subnets"])]
+        self.instances = [
+            self._instance(i) for i in range(sizes["instances"])
+        ]
+        self.load_balancers = [
+            self._load_balancer(i) for i in range(sizes["load_balancers"])
+        ]
+        self.target_groups = [
+            self._target_group(i) for i in range(sizes["target_groups"])
+        ]
+        self.auto_scaling_groups = [
+            self._auto_scaling_group(i)
+            for i in range(sizes["auto_scaling_groups"])
+        ]
+
+    def _id(self, prefix, i):
+        """Create a resource Id unique to this VPC."""
+        return f"{prefix}-{self._vpc_index:04x}{i:013x}"
+
+    def _tags(self, name):
+        """Create a list of Tags with a Name and a few others."""
+        tags = [{"Key": "Name", "Value": name}]
+        for key in ("Environment", "Team", "CostCentre"):
+            tags.append({"Key": key, "Value": f"{key.lower()}-{name[-1]}"})
+        return tags
+
+    def _cidr_ip(self):
+        """Create a random /8 to /32 IPv4 CIDR."""
+        octets = [self._rng.randrange(256) for _ in range(4)]
+        return f"{'.'.join(map(str, octets))}/{self._rng.randint(8, 32)}"
+
+    def _permission(self, group_count):
+        """Create a Security Group Permission."""
+        protocol = self._rng.choice(PROTOCOLS)
+        permission = {
+            "IpProtocol": protocol,
+            "IpRanges": [
+                {"CidrIp": self._cidr_ip()}
+                for _ in range(self._rng.randint(0, 3))
+            ],
+            "Ipv6Ranges": [],
+            "PrefixListIds": [],
+            "UserIdGroupPairs": [
+                {
+                    "GroupId": self._id(
+                        "sg", self._rng.randrange(group_count)
+                    ),
+                    "UserId": ACCOUNT_ID,
+                }
+                for _ in range(self._rng.randint(0, 2))
+            ],
+        }
+        if protocol != "-1":
+            from_port = self._rng.randrange(1, 65536)
+            permission["FromPort"] = from_port
+            permission["ToPort"] = min(
+                65535, from_port + self._rng.choice([0, 0, 0, 10, 1000])
+            )
+        return permission
+
+    def _security_group(self, i, rule_count, group_count):
+        """Create a Security Group referring to others by Id."""
+        return {
+            "Description": f"security group {i}",
+            "GroupId": self._id("sg", i),
+            "GroupName": f"security-group-{i}",
+            "IpPermissions": [
+                self._permission(group_count) for _ in range(rule_count)
+            ],
+            "IpPermissionsEgress": [
+                {
+                    "IpProtocol": "-1",
+                    "IpRanges": [{"CidrIp": "0.0.0.0/0"}],
+                    "Ipv6Ranges": [],
+                    "PrefixListIds": [],
+                    "UserIdGroupPairs": [],
+                }
+            ],
+            "OwnerId": ACCOUNT_ID,
+            "VpcId": self._vpc_id,
+            "Tags": self._tags(f"security-group-{i}"),
+        }
+
+    def _subnet(self, i):
+        """Create a /26 Subnet, up to 1024 fit in the VPC's /16."""
+        return {
+            "AvailabilityZone": AZS[i % len(AZS)],
+            "AvailableIpAddressCount": 59,
+            "CidrBlock": f"10.{self._vpc_index}.{i // 4}.{(i % 4) * 64}/26",
+            "DefaultForAz": False,
+            "MapPublicIpOnLaunch": False,
+            "State": "available",
+            "SubnetId": self._id("subnet", i),
+            "VpcId": self._vpc_id,
+            "OwnerId": ACCOUNT_ID,
+            "Tags": self._tags(f"subnet-{i}"),
+        }
+
+    def _instance(self, i):
+        """Create an Instance in a random Subnet."""
+        subnet_index = self._rng.randrange(len(self.subnets))
+        subnet = self.subnets[subnet_index]
+        address = (
+            f"10.{self._vpc_index}.{subnet_index // 4}."
+            f"{(subnet_index % 4) * 64 + self._rng.randint(4, 62)}"
+        )
+        groups = [
+            {
+                "GroupId": self._id(
+                    "sg", self._rng.randrange(len(self.security_groups))
+                ),
+                "GroupName": "security-group",
+            }
+            for _ in range(self._rng.randint(1, 3))
+        ]
+        return {
+            "AmiLaunchIndex": 0,
+            "ImageId": self._id("ami", self._rng.randrange(20)),
+            "InstanceId": self._id("i", i),
+            "InstanceType": self._rng.choice(INSTANCE_TYPES),
+            "LaunchTime": datetime(2023, 7, 20, tzinfo=timezone.utc),
+            "Placement": {"AvailabilityZone": subnet["AvailabilityZone"]},
+            "PrivateDnsName": f"ip-{address.replace('.', '-')}.internal",
+            "PrivateIpAddress": address,
+            "SecurityGroups": groups,
+            "State": {"Code": 16, "Name": self._rng.choice(STATES)},
+            "SubnetId": subnet["SubnetId"],
+            "VpcId": self._vpc_id,
+            "NetworkInterfaces": [
+                {
+                    "PrivateIpAddress": address,
+                    "Groups": groups,
+                    "SubnetId": subnet["SubnetId"],
+                    "VpcId": self._vpc_id,
+                }
+            ],
+            "Tags": self._tags(f"instance-{i}"),
+        }
+
+    def _load_balancer(self, i):
+        """Create an Application Load Balancer in three Subnets."""
+        subnets = self._rng.sample(self.subnets, min(3, len(self.subnets)))
+        return {
+            "AvailabilityZones": [
+                {
+                    "ZoneName": subnet["AvailabilityZone"],
+                    "SubnetId": subnet["SubnetId"],
+                    "LoadBalancerAddresses": [],
+                }
+                for subnet in subnets
+            ],
+            "LoadBalancerArn": (
+                f"arn:aws:elasticloadbalancing:{REGION}:{ACCOUNT_ID}:"
+                f"loadbalancer/app/lb-{i}/{self._id('', i)[1:]}"
+            ),
+            "LoadBalancerName": f"lb-{i}",
+            "Scheme": "internal",
+            "SecurityGroups": [
+                self._id("sg", self._rng.randrange(len(self.security_groups)))
+            ],
+            "State": {"Code": "active"},
+            "Type": "application",
+            "VpcId": self._vpc_id,
+        }
+
+    def _target_group(self, i):
+        """Create a Target Group linked to a random Load Balancer."""
+        load_balancer_arns = []
+        if len(self.load_balancers) > 0:
+            load_balancer_arns.append(
+                self._rng.choice(self.load_balancers)["LoadBalancerArn"]
+            )
+        return {
+            "HealthCheckPath": "/",
+            "LoadBalancerArns": load_balancer_arns,
+            "Port": 80,
+            "Protocol": "HTTP",
+            "TargetGroupArn": (
+                f"arn:aws:elasticloadbalancing:{REGION}:{ACCOUNT_ID}:"
+                f"targetgroup/tg-{i}/{self._id('', i)[1:]}"
+            ),
+            "TargetGroupName": f"tg-{i}",
+            "TargetType": "instance",
+            "VpcId": self._vpc_id,
+        }
+
+    def _auto_scaling_group(self, i):
+        """Create an Auto Scaling Group with a few of the Instances."""
+        subnets = self._rng.sample(self.subnets, min(3, len(self.subnets)))
+        instances = self._rng.sample(
+            self.instances, min(5, len(self.instances))
+        )
+        asg = {
+            "AutoScalingGroupARN": (
+                f"arn:aws:autoscaling:{REGION}:{ACCOUNT_ID}:autoScalingGroup:"
+                f"{self._id('', i)[1:]}:autoScalingGroupName/asg-{i}"
+            ),
+            "AutoScalingGroupName": f"asg-{i}",
+            "DesiredCapacity": len(instances),
+            "Instances": [
+                {
+                    "InstanceId": instance["InstanceId"],
+                    "AvailabilityZone": instance["Placement"][
+                        "AvailabilityZone"
+                    ],
+                    "LifecycleState": "InService",
+                    "HealthStatus": "Healthy",
+                }
+                for instance in instances
+            ],
+            "LoadBalancerNames": [],
+            "MaxSize": 10,
+            "MinSize": 1,
+            "TargetGroupARNs": [
+                tg["TargetGroupArn"]
+                for tg in self._rng.sample(
+                    self.target_groups, min(1, len(self.target_groups))
+                )
+            ],
+            "VPCZoneIdentifier": ",".join(s["SubnetId"] for s in subnets),
+        }
+        if i % 2 == 0:
+            asg["LaunchTemplate"] = {
+                "LaunchTemplateId": self._id("lt", i),
+                "Version": "$Latest",
+            }
+        else:
+            asg["LaunchConfigurationName"] = f"launch-configuration-{i}"
+        return asg
+
+
+class StubPaginator:
+    """Serves pages of an inventory like a Boto3 paginator."""
+
+    def __init__(self, pages_function):
+        """Initializes instance."""
+        self._pages_function = pages_function
+
+    def paginate(self, **parameters):
+        """Yield the pages of the response."""
+        return self._pages_function(**parameters)
+
+
+class StubClient:
+    """A Boto3 client serving the resources of synthetic inventories.
+
+    Only the calls made by vpc_tree.aws_resources are supported.
+    """
+
+    PAGE_SIZES = {
+        "describe_vpcs": 1000,
+        "describe_security_groups": 1000,
+        "describe_subnets": 1000,
+        "describe_instances": 1000,
+        "describe_load_balancers": 400,
+        "describe_auto_scaling_groups": 100,
+        "describe_target_groups": 400,
+    }
+
+    def __init__(self, inventories):
+        """Initializes instance.
+
+        Args:
+            inventories: A list of Inventory instances.
+        """
+        self.inventories = inventories
+
+    def get_paginator(self, operation_name):
+        """Get a StubPaginator for an operation."""
+        return StubPaginator(getattr(self, f"_{operation_name}"))
+
+    def describe_vpcs(self, **parameters):
+        """Return a single page of Virtual Private Clouds."""
+        return next(self._describe_vpcs(**parameters))
+
+    def get_caller_identity(self):
+        """Return the synthetic account Id."""
+        return {"Account": ACCOUNT_ID}
+
+    def _pages(self, operation_name, key, items):
+        """Split items into pages."""
+        size = self.PAGE_SIZES[operation_name]
+        for start in range(0, max(len(items), 1), size):
+            yield {key: items[start:start + size]}
+
+    def _in_vpcs(self, attribute, parameters):
+        """Get the resources from the inventories matching a vpc-id
+        filter."""
+        vpc_ids = None
+        for resource_filter in parameters.get("Filters", []):
+            if resource_filter["Name"] == "vpc-id":
+                vpc_ids = set(resource_filter["Values"])
+
+        items = []
+        for inventory in self.inventories:
+            if vpc_ids is None or inventory.vpc["VpcId"] in vpc_ids:
+                items += getattr(inventory, attribute)
+        return items
+
+    def _describe_vpcs(self, **parameters):
+        vpcs = [inventory.vpc for inventory in self.inventories]
+        if "VpcIds" in parameters:
+            vpc_ids = parameters["VpcIds"]
+            vpcs = [vpc for vpc in vpcs if vpc["VpcId"] in vpc_ids]
+        return self._pages("describe_vpcs", "Vpcs", vpcs)
+
+    def _describe_security_groups(self, **parameters):
+        return self._pages(
+            "describe_security_groups",
+            "SecurityGroups",
+            self._in_vpcs("security_groups", parameters),
+        )
+
+    def _describe_subnets(self, **parameters):
+        return self._pages(
+            "describe_subnets",
+            "Subnets",
+            self._in_vpcs("subnets", parameters),
+        )
+
+    def _describe_instances(self, **parameters):
+        for page in self._pages(
+            "describe_instances",
+            "Instances",
+            self._in_vpcs("instances", parameters),
+        ):
+            yield {
+                "Reservations": [
+                    {"Instances": [instance]} for instance in page["Instances"]
+                ]
+            }
+
+    def _describe_load_balancers(self, **parameters):
+        return self._pages(
+            "describe_load_balancers",
+            "LoadBalancers",
+            self._in_vpcs("load_balancers", {}),
+        )
+
+    def _describe_auto_scaling_groups(self, **parameters):
+        return self._pages(
+            "describe_auto_scaling_groups",
+            "AutoScalingGroups",
+            self._in_vpcs("auto_scaling_groups", {}),
+        )
+
+    def _describe_target_groups(self, **parameters):
+        target_groups = self._in_vpcs("target_groups", {})
+        if "LoadBalancerArn" in parameters:
+            target_groups = [
+                tg
+                for tg in target_groups
+                if parameters["LoadBalancerArn"] in tg["LoadBalancerArns"]
+            ]
+        return self._pages(
+            "describe_target_groups", "TargetGroups", target_groups
+        )
+
+
+class StubRegistry:
+    """A stand in for vpc_tree.clients.ClientRegistry handing out
+    StubClients."""
+
+    profile_name = None
+
+    def __init__(self, inventories):
+        """Initializes instance.
+
+        Args:
+            inventories: A list of Inventory instances.
+        """
+        self._client = StubClient(inventories)
+
+    def get_client(self, service_name, region_name=None, profile_name=None):
+        """Get the StubClient, whatever the service."""
+        return self._client
+
+    def get_region_name(self, region_name=None, profile_name=None):
+        """Get the synthetic region."""
+        return region_name or REGION
+
+    def get_account_id(self, profile_name=None):
+        """Get the synthetic account Id."""
+        return ACCOUNT_ID
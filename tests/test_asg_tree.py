@@ -2,6 +2,7 @@
 
 import pytest
 from vpc_tree.asg_tree import ASGTree
+from vpc_tree.model import AutoScalingGroup, project
 
 
 @pytest.fixture(scope="class")
@@ -24,7 +25,9 @@ def auto_scaling_groups():
 @pytest.mark.usefixtures("auto_scaling_groups")
 class TestASGTree:
     def test_generate(self, auto_scaling_groups):
-        asg_tree_generator = ASGTree(auto_scaling_groups)
+        asg_tree_generator = ASGTree(
+            project(AutoScalingGroup, auto_scaling_groups)
+        )
         text_tree = []
         asg_tree_generator.generate(text_tree, [])
 
@@ -2,12 +2,22 @@
 
 
 import pytest
+from vpc_tree import aws_resources
 from vpc_tree.aws_resources import (
+    get_existing_vpc_ids,
     get_load_balancer_arns,
+    get_indexed_target_groups,
+    get_instances_in_vpcs,
     get_subnet_ids,
     filter_auto_scaling_groups_by_subnets,
     filter_instances_by_subnet,
     filter_load_balancers_by_vpc,
+    group_by_vpc,
+    group_auto_scaling_groups_by_vpc,
+    index_load_balancers_by_vpc,
+    index_subnet_vpcs,
+    index_target_groups_by_load_balancer,
+    scope_filters,
 )
 
 
@@ -61,6 +71,24 @@ def auto_scaling_groups():
     ]
 
 
+@pytest.fixture(scope="function")
+def target_groups():
+    return [
+        {
+            "TargetGroupArn": "arn:aws:TG-01...",
+            "LoadBalancerArns": ["arn:aws:LB-01..."],
+        },
+        {
+            "TargetGroupArn": "arn:aws:TG-02...",
+            "LoadBalancerArns": ["arn:aws:LB-01...", "arn:aws:LB-02..."],
+        },
+        {
+            "TargetGroupArn": "arn:aws:TG-03...",
+            "LoadBalancerArns": [],
+        },
+    ]
+
+
 class TestGetSubnetIds:
     def test_function(self, subnets):
         results = get_subnet_ids(subnets)
@@ -89,6 +117,18 @@ class TestFilterLoadBalancersByVPC:
         assert results == expected
 
 
+class TestIndexLoadBalancersByVPC:
+    def test_function(self, load_balancers):
+        results = index_load_balancers_by_vpc(load_balancers)
+        assert list(results.keys()) == ["VPC-01", "VPC-02"]
+        assert results["VPC-01"] == filter_load_balancers_by_vpc(
+            load_balancers, "VPC-01"
+        )
+        assert results["VPC-02"] == filter_load_balancers_by_vpc(
+            load_balancers, "VPC-02"
+        )
+
+
 class TestGetLoadBalancerARNs:
     def test_function(self, load_balancers):
         results = get_load_balancer_arns(load_balancers)
@@ -118,3 +158,153 @@ class TestFilterAutoScalingGroupsBySubnets:
             },
         ]
         assert results == expected
+
+
+class TestIndexTargetGroupsByLoadBalancer:
+    def test_function(self, target_groups):
+        results = index_target_groups_by_load_balancer(target_groups)
+        assert results == {
+            "arn:aws:LB-01...": [target_groups[0], target_groups[1]],
+            "arn:aws:LB-02...": [target_groups[1]],
+        }
+
+
+class TestGetIndexedTargetGroups:
+    def test_function(self, target_groups):
+        index = index_target_groups_by_load_balancer(target_groups)
+        results = get_indexed_target_groups(
+            index, ["arn:aws:LB-02...", "arn:aws:LB-03..."]
+        )
+        assert results == [target_groups[1]]
+
+
+class TestIndexSubnetVPCs:
+    def test_function(self):
+        subnets = [
+            {"SubnetId": "Subnet-01", "VpcId": "VPC-01"},
+            {"SubnetId": "Subnet-02", "VpcId": "VPC-02"},
+        ]
+        results = index_subnet_vpcs(subnets)
+        assert results == {"Subnet-01": "VPC-01", "Subnet-02": "VPC-02"}
+
+
+class TestGroupAutoScalingGroupsByVPC:
+    def test_function(self, auto_scaling_groups):
+        auto_scaling_groups.append(
+            {
+                "AutoScalingGroupARN": "arn:aws:ASG-04...",
+                "VPCZoneIdentifier": "Subnet-03,Subnet-01",
+            }
+        )
+        subnet_vpc_index = {
+            "Subnet-01": "VPC-01",
+            "Subnet-02": "VPC-01",
+            "Subnet-03": "VPC-02",
+        }
+        results = group_auto_scaling_groups_by_vpc(
+            auto_scaling_groups, subnet_vpc_index
+        )
+        assert results == {
+            "VPC-01": [
+                auto_scaling_groups[0],
+                auto_scaling_groups[1],
+                auto_scaling_groups[3],
+            ],
+            "VPC-02": [auto_scaling_groups[3]],
+        }
+
+    def test_matches_filter(self, auto_scaling_groups, subnets):
+        subnet_vpc_index = {
+            subnet["SubnetId"]: "VPC-01" for subnet in subnets
+        }
+        results = group_auto_scaling_groups_by_vpc(
+            auto_scaling_groups, subnet_vpc_index
+        )
+        assert results["VPC-01"] == filter_auto_scaling_groups_by_subnets(
+            auto_scaling_groups, get_subnet_ids(subnets)
+        )
+
+
+class TestGroupByVPC:
+    def test_group(self):
+        resources = [
+            {"GroupId": "SG-01", "VpcId": "VPC-01"},
+            {"GroupId": "SG-02", "VpcId": "VPC-02"},
+            {"GroupId": "SG-03", "VpcId": "VPC-01"},
+            {"InstanceId": "I-01"},
+        ]
+        index = group_by_vpc(resources)
+        assert index == {
+            "VPC-01": [resources[0], resources[2]],
+            "VPC-02": [resources[1]],
+        }
+
+
+class TestScopeFilters:
+    def test_instances(self):
+        scope = {
+            "subnet_ids": ["SN-01"],
+            "instance_states": ["running"],
+            "tags": {"Env": ["prod", "test"], "App": ["web"]},
+        }
+        assert scope_filters("describe_instances", scope) == [
+            {"Name": "subnet-id", "Values": ["SN-01"]},
+            {"Name": "instance-state-name", "Values": ["running"]},
+            {"Name": "tag:App", "Values": ["web"]},
+            {"Name": "tag:Env", "Values": ["prod", "test"]},
+        ]
+
+    def test_unsupported_keys(self):
+        scope = {"availability_zones": ["eu-west-2a"], "tags": {"Env": ["a"]}}
+        assert scope_filters("describe_security_groups", scope) == [
+            {"Name": "tag:Env", "Values": ["a"]},
+        ]
+        scope = {"instance_states": ["running"]}
+        assert scope_filters("describe_subnets", scope) is None
+
+    def test_pushed_down(self, monkeypatch):
+        calls = []
+
+        class Paginator:
+            def paginate(self, **parameters):
+                calls.append(parameters)
+                return [{"Reservations": []}]
+
+        class Client:
+            def get_paginator(self, operation_name):
+                return Paginator()
+
+        monkeypatch.setattr(
+            aws_resources, "get_client", lambda *args: Client()
+        )
+        filters = [{"Name": "instance-state-name", "Values": ["running"]}]
+        get_instances_in_vpcs(["VPC-01"], filters=filters)
+        get_instances_in_vpcs(None, filters=filters)
+
+        assert calls == [
+            {"Filters": [{"Name": "vpc-id", "Values": ["VPC-01"]}, *filters]},
+            {"Filters": filters},
+        ]
+
+
+class TestGetExistingVPCIds:
+    def test_function(self, monkeypatch):
+        calls = []
+
+        class Paginator:
+            def paginate(self, **parameters):
+                calls.append(parameters)
+                return [{"Vpcs": [{"VpcId": "VPC-03"}, {"VpcId": "VPC-01"}]}]
+
+        class Client:
+            def get_paginator(self, operation_name):
+                return Paginator()
+
+        monkeypatch.setattr(
+            aws_resources, "get_client", lambda *args: Client()
+        )
+        vpc_ids = ["VPC-01", "VPC-02", "VPC-03"]
+        results = get_existing_vpc_ids(vpc_ids)
+        assert results == ["VPC-01", "VPC-03"]
+        assert calls == [{"Filters": [{"Name": "vpc-id", "Values": vpc_ids}]}]
+        assert get_existing_vpc_ids([]) == []
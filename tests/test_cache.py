@@ -0,0 +1,153 @@
+# test_cache.py
+
+from datetime import datetime, timezone
+
+import pytest
+from vpc_tree import cache, clients
+from vpc_tree.cache import ResponseCache, cached, make_key
+
+
+class FakeRegistry:
+    profile_name = None
+
+    def __init__(self):
+        self.access_key = "AKIAEXAMPLE1"
+
+    def get_region_name(self, region_name=None):
+        return region_name or "eu-west-2"
+
+    def get_credentials_id(self):
+        return [self.profile_name, self.access_key]
+
+
+@pytest.fixture(scope="function")
+def response_cache(tmp_path):
+    response_cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    yield response_cache
+    response_cache.close()
+
+
+@pytest.fixture(scope="function")
+def registry(monkeypatch):
+    registry = FakeRegistry()
+    monkeypatch.setattr(clients, "get_registry", lambda: registry)
+    return registry
+
+
+@pytest.fixture(scope="function")
+def enabled_cache(tmp_path, registry):
+    cache.enable(str(tmp_path / "cache.sqlite3"))
+    yield cache.get_cache()
+    cache.disable()
+
+
+class TestResponseCache:
+    def test_put_get(self, response_cache):
+        value = [
+            {
+                "InstanceId": "i-01",
+                "LaunchTime": datetime(2023, 7, 20, tzinfo=timezone.utc),
+            }
+        ]
+        response_cache.put("key", "instances", value)
+        assert response_cache.get("key", "instances") == value
+
+    def test_missing(self, response_cache):
+        assert response_cache.get("key", "instances") is None
+
+    def test_expired(self, response_cache):
+        response_cache.put("key", "instances", [])
+        response_cache.ttls["instances"] = -1
+        assert response_cache.get("key", "instances") is None
+
+    def test_refresh(self, response_cache):
+        response_cache.put("key", "instances", [])
+        response_cache.refresh = True
+        assert response_cache.get("key", "instances") is None
+
+    def test_evict_least_recently_used(self, response_cache):
+        response_cache.put("key-1", "subnets", ["1" * 100])
+        response_cache.put("key-2", "subnets", ["2" * 100])
+        response_cache.get("key-1", "subnets")
+        response_cache.max_size = response_cache.size() + 1
+        response_cache.put("key-3", "subnets", ["3" * 100])
+
+        assert response_cache.get("key-1", "subnets") == ["1" * 100]
+        assert response_cache.get("key-2", "subnets") is None
+        assert response_cache.get("key-3", "subnets") == ["3" * 100]
+
+
+class TestMakeKey:
+    def test_normalized(self):
+        key_1 = make_key("1", "eu-west-2", "get", {"a": 1, "b": 2})
+        key_2 = make_key("1", "eu-west-2", "get", {"b": 2, "a": 1})
+        assert key_1 == key_2
+
+    def test_different_region(self):
+        key_1 = make_key("1", "eu-west-2", "get", {})
+        key_2 = make_key("1", "eu-west-1", "get", {})
+        assert key_1 != key_2
+
+
+class TestCached:
+    def test_disabled(self):
+        calls = []
+
+        @cached("subnets")
+        def get_subnets(vpc_id):
+            calls.append(vpc_id)
+            return [vpc_id]
+
+        get_subnets("vpc-01")
+        get_subnets("vpc-01")
+        assert calls == ["vpc-01", "vpc-01"]
+
+    def test_enabled(self, enabled_cache, registry):
+        calls = []
+
+        @cached("subnets")
+        def get_subnets(vpc_id):
+            calls.append(vpc_id)
+            return [vpc_id]
+
+        assert get_subnets("vpc-01") == ["vpc-01"]
+        assert get_subnets(vpc_id="vpc-01") == ["vpc-01"]
+        assert get_subnets("vpc-02") == ["vpc-02"]
+        assert calls == ["vpc-01", "vpc-02"]
+
+    def test_credentials(self, enabled_cache, registry):
+        calls = []
+
+        @cached("vpcs")
+        def get_vpcs():
+            calls.append(registry.access_key)
+            return [registry.access_key]
+
+        assert get_vpcs() == ["AKIAEXAMPLE1"]
+        registry.access_key = "AKIAEXAMPLE2"
+        assert get_vpcs() == ["AKIAEXAMPLE2"]
+        assert calls == ["AKIAEXAMPLE1", "AKIAEXAMPLE2"]
+
+    def test_hit_without_network(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAEXAMPLE1")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+        registry = clients.ClientRegistry(region_name="eu-west-2")
+        monkeypatch.setattr(clients, "get_registry", lambda: registry)
+        created = []
+        monkeypatch.setattr(
+            registry,
+            "get_client",
+            lambda *args, **kwargs: created.append(args),
+        )
+
+        @cached("vpcs")
+        def get_vpcs():
+            return ["vpc-01"]
+
+        cache.enable(str(tmp_path / "cache.sqlite3"))
+        try:
+            get_vpcs()
+            assert get_vpcs() == ["vpc-01"]
+        finally:
+            cache.disable()
+        assert created == []
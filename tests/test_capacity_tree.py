@@ -0,0 +1,36 @@
+# test_capacity_tree.py
+
+from vpc_tree.capacity_tree import CapacityTree
+from vpc_tree.model import VPC, Subnet
+
+
+class TestCapacityTree:
+    def test_iter_lines(self):
+        vpc = VPC("vpc-01", "10.0.0.0/22", {}, ("10.1.0.0/24",))
+        subnets = [
+            Subnet("sn-02", "vpc-01", "eu-west-2b", "10.0.2.0/24", {}, 250),
+            Subnet(
+                "sn-01",
+                "vpc-01",
+                "eu-west-2a",
+                "10.0.0.0/24",
+                {"Name": "public"},
+                251,
+            ),
+            Subnet("sn-03", "vpc-01", "eu-west-2a", "10.1.0.0/24"),
+        ]
+
+        assert list(CapacityTree(vpc, subnets).iter_lines([])) == [
+            "Capacity:",
+            "├──10.0.0.0/22 : 1024 addresses : 512 in 2 Subnets : 512 free",
+            "│  ├──Subnets:",
+            "│  │  ├──sn-01 : public : 10.0.0.0/24 : 251 of 256 available",
+            "│  │  └──sn-02 : 10.0.2.0/24 : 250 of 256 available",
+            "│  └──Free:",
+            "│     ├──10.0.1.0/24 : 256 addresses",
+            "│     └──10.0.3.0/24 : 256 addresses",
+            "└──10.1.0.0/24 : 256 addresses : 256 in 1 Subnets : 0 free",
+            "   ├──Subnets:",
+            "   │  └──sn-03 : 10.1.0.0/24 : 256 addresses",
+            "   └──Free:",
+        ]
@@ -0,0 +1,60 @@
+# test_clients.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from vpc_tree.clients import ClientRegistry, is_throttling_response
+
+
+@pytest.fixture(scope="function")
+def registry():
+    return ClientRegistry(region_name="eu-west-2", max_pool_connections=20)
+
+
+class TestClientRegistry:
+    def test_same_client(self, registry):
+        client = registry.get_client("ec2")
+        assert registry.get_client("ec2") is client
+        assert registry.get_client("ec2", "eu-west-2") is client
+
+    def test_different_service(self, registry):
+        assert registry.get_client("ec2") is not registry.get_client("elbv2")
+
+    def test_different_region(self, registry):
+        client = registry.get_client("ec2", "us-east-1")
+        assert client is not registry.get_client("ec2")
+        assert client.meta.region_name == "us-east-1"
+
+    def test_max_pool_connections(self, registry):
+        client = registry.get_client("ec2")
+        assert client.meta.config.max_pool_connections == 20
+
+    def test_retries(self, registry):
+        client = registry.get_client("ec2")
+        assert client.meta.config.retries["mode"] == "standard"
+
+    def test_credentials_id(self, registry, monkeypatch):
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAEXAMPLE1")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+        monkeypatch.delenv("AWS_PROFILE", raising=False)
+        assert registry.get_credentials_id() == [None, "AKIAEXAMPLE1"]
+
+    def test_thread_safe(self, registry):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(lambda _: registry.get_client("ec2"), range(32))
+            )
+        assert all(client is results[0] for client in results)
+
+
+class TestIsThrottlingResponse:
+    def test_throttled(self):
+        parsed = {"Error": {"Code": "RequestLimitExceeded"}}
+        assert is_throttling_response((None, parsed))
+
+    def test_other_error(self):
+        parsed = {"Error": {"Code": "InvalidVpcID.NotFound"}}
+        assert not is_throttling_response((None, parsed))
+
+    def test_no_response(self):
+        assert not is_throttling_response(None)
@@ -0,0 +1,496 @@
+# test_fetch.py
+
+import threading
+from concurrent.futures import Future
+
+import pytest
+from vpc_tree import aws_resources
+from vpc_tree.fetch import (
+    TARGET_GROUPS_BY_LOAD_BALANCER,
+    TARGET_GROUPS_BY_REGION,
+    SECTIONS,
+    PendingVPCResources,
+    fetch_vpc_resources,
+    fetching_vpcs_resources,
+    iter_region_vpcs,
+    plan_fetch,
+)
+from vpc_tree.vpc_tree import VPCTree
+
+
+@pytest.fixture(scope="function")
+def fake_aws(monkeypatch):
+    calls = []
+
+    def fake(name, result):
+        def function(*args):
+            calls.append((name, args))
+            return result
+
+        monkeypatch.setattr(aws_resources, name, function)
+
+    fake(
+        "get_vpc",
+        {
+            "VpcId": "vpc-01",
+            "CidrBlock": "10.0.0.0/16",
+            "Tags": [{"Key": "Name", "Value": "vpc-01-name"}],
+        },
+    )
+    fake(
+        "get_security_groups",
+        [
+            {
+                "GroupId": "sg-01",
+                "GroupName": "security-group-01",
+                "IpPermissions": [],
+                "IpPermissionsEgress": [],
+            }
+        ],
+    )
+    fake(
+        "get_subnets",
+        [
+            {
+                "AvailabilityZone": "eu-west-2a",
+                "CidrBlock": "10.0.1.0/24",
+                "SubnetId": "sn-01",
+                "VpcId": "vpc-01",
+            }
+        ],
+    )
+    fake("get_instances", [])
+    fake(
+        "get_load_balancers",
+        [
+            {
+                "AvailabilityZones": [],
+                "LoadBalancerArn": "arn:aws:lb-01...",
+                "LoadBalancerName": "load-balancer-01",
+                "SecurityGroups": [],
+                "VpcId": "vpc-01",
+            },
+            {
+                "AvailabilityZones": [],
+                "LoadBalancerArn": "arn:aws:lb-02...",
+                "LoadBalancerName": "load-balancer-02",
+                "SecurityGroups": [],
+                "VpcId": "vpc-02",
+            },
+        ],
+    )
+    fake(
+        "get_auto_scaling_groups",
+        [
+            {
+                "AutoScalingGroupARN": "arn:aws:asg-01...",
+                "AutoScalingGroupName": "auto-scaling-group-01",
+                "Instances": [],
+                "LoadBalancerNames": [],
+                "MaxSize": 3,
+                "MinSize": 1,
+                "TargetGroupARNs": [],
+                "VPCZoneIdentifier": "sn-01",
+            },
+            {
+                "AutoScalingGroupARN": "arn:aws:asg-02...",
+                "AutoScalingGroupName": "auto-scaling-group-02",
+                "Instances": [],
+                "LoadBalancerNames": [],
+                "MaxSize": 3,
+                "MinSize": 1,
+                "TargetGroupARNs": [],
+                "VPCZoneIdentifier": "sn-99",
+            },
+        ],
+    )
+    fake(
+        "get_target_groups",
+        [
+            {
+                "LoadBalancerArns": ["arn:aws:lb-01..."],
+                "TargetGroupArn": "arn:aws:tg-01...",
+                "TargetGroupName": "target-group-01",
+            }
+        ],
+    )
+    fake(
+        "get_all_target_groups",
+        [
+            {
+                "LoadBalancerArns": ["arn:aws:lb-02..."],
+                "TargetGroupArn": "arn:aws:tg-02...",
+                "TargetGroupName": "target-group-02",
+            },
+            {
+                "LoadBalancerArns": ["arn:aws:lb-01..."],
+                "TargetGroupArn": "arn:aws:tg-01...",
+                "TargetGroupName": "target-group-01",
+            },
+        ],
+    )
+
+    return calls
+
+
+class TestFetchVPCResources:
+    def test_dependencies(self, fake_aws):
+        resources = fetch_vpc_resources(
+            "vpc-01", 4, TARGET_GROUPS_BY_LOAD_BALANCER
+        )
+
+        assert [lb.arn for lb in resources.load_balancers] == [
+            "arn:aws:lb-01..."
+        ]
+        assert [asg.arn for asg in resources.auto_scaling_groups] == [
+            "arn:aws:asg-01..."
+        ]
+        assert ("get_target_groups", (["arn:aws:lb-01..."],)) in fake_aws
+
+    def test_sequential_matches_concurrent(self, fake_aws):
+        tree = VPCTree()
+        sequential = tree._vpc_text(fetch_vpc_resources("vpc-01", 1))
+        concurrent = tree._vpc_text(fetch_vpc_resources("vpc-01", 8))
+
+        assert sequential == concurrent
+        assert sequential[-1] == "         └──arn:aws:lb-01..."
+
+    def test_target_group_modes_match(self, fake_aws):
+        by_region = fetch_vpc_resources("vpc-01", 4, TARGET_GROUPS_BY_REGION)
+        by_load_balancer = fetch_vpc_resources(
+            "vpc-01", 4, TARGET_GROUPS_BY_LOAD_BALANCER
+        )
+
+        assert by_region.target_groups == by_load_balancer.target_groups
+        assert ("get_all_target_groups", ()) in fake_aws
+
+
+class TestSections:
+    def test_plan(self):
+        assert plan_fetch(SECTIONS) == {
+            "security_groups",
+            "subnets",
+            "instances",
+            "load_balancers",
+            "auto_scaling_groups",
+            "target_groups",
+        }
+        assert plan_fetch(["sgs"]) == {"security_groups"}
+        assert plan_fetch(["asgs", "tgs"]) == {
+            "auto_scaling_groups",
+            "subnets",
+            "target_groups",
+            "load_balancers",
+        }
+
+    def test_unknown_section(self):
+        with pytest.raises(ValueError):
+            plan_fetch(["vpcs"])
+
+    def test_skip_calls(self, fake_aws):
+        resources = fetch_vpc_resources(
+            "vpc-01", 1, TARGET_GROUPS_BY_REGION, ["subnets", "sgs"]
+        )
+        assert sorted(name for name, _ in fake_aws) == [
+            "get_instances",
+            "get_security_groups",
+            "get_subnets",
+            "get_vpc",
+        ]
+        assert resources.load_balancers is None
+
+    def test_dependency_not_displayed(self, fake_aws):
+        resources = fetch_vpc_resources(
+            "vpc-01", 1, TARGET_GROUPS_BY_LOAD_BALANCER, ["tgs"]
+        )
+        lines = list(VPCTree().iter_vpc_lines(resources, ["tgs"]))
+        assert lines[1] == "└──Target Groups:"
+        assert all(line.startswith("   ") for line in lines[2:])
+        assert ("get_target_groups", (["arn:aws:lb-01..."],)) in fake_aws
+        assert "get_auto_scaling_groups" not in dict(fake_aws)
+
+    def test_last_section(self, fake_aws):
+        resources = fetch_vpc_resources("vpc-01", 1)
+        lines = list(VPCTree().iter_vpc_lines(resources, ["lbs", "sgs"]))
+
+        assert lines[1] == "├──Security Groups:"
+        last = lines.index("└──Load Balancers:")
+        assert all(line.startswith("   ") for line in lines[last + 1:])
+        assert "Subnets:" not in "".join(lines)
+
+
+class TestScope:
+    def test_filters(self, fake_aws):
+        fetch_vpc_resources(
+            "vpc-01", 1, scope={"instance_states": ["running"]}
+        )
+        state = [{"Name": "instance-state-name", "Values": ["running"]}]
+        assert ("get_instances", ("vpc-01", state)) in fake_aws
+        assert ("get_subnets", ("vpc-01", None)) in fake_aws
+
+    def test_no_scope(self, fake_aws):
+        fetch_vpc_resources("vpc-01", 1)
+        assert ("get_instances", ("vpc-01", None)) in fake_aws
+
+
+class TestPendingVPCResources:
+    def test_stream_sections(self, fake_aws):
+        resources = fetch_vpc_resources("vpc-01", 1)
+        futures = {name: Future() for name in vars(resources)}
+        futures["vpc"].set_result(resources.vpc)
+        futures["security_groups"].set_result(resources.security_groups)
+
+        lines = VPCTree().iter_vpc_lines(PendingVPCResources(futures))
+        assert next(lines).startswith("vpc-01 : ")
+        assert next(lines) == "├──Security Groups:"
+        assert next(lines) == "│  └──sg-01 : security-group-01"
+        assert not futures["subnets"].done()
+
+    def test_result(self, fake_aws):
+        resources = fetch_vpc_resources("vpc-01", 1)
+        futures = {}
+        for name, value in vars(resources).items():
+            futures[name] = Future()
+            futures[name].set_result(value)
+
+        result = PendingVPCResources(futures).result()
+        assert vars(result) == vars(resources)
+
+
+@pytest.fixture(scope="function")
+def regions_aws(monkeypatch):
+    slow_region_released = threading.Event()
+
+    def get_vpcs(region_name=None):
+        if region_name == "slow-1":
+            assert slow_region_released.wait(timeout=5)
+        if region_name == "broken-1":
+            raise RuntimeError("not authorised")
+        return [
+            {"VpcId": f"vpc-{region_name}", "CidrBlock": "10.0.0.0/16"},
+            {
+                "VpcId": f"vpc-{region_name}-named",
+                "CidrBlock": "10.1.0.0/16",
+                "Tags": [{"Key": "Name", "Value": "named"}],
+            },
+        ]
+
+    monkeypatch.setattr(aws_resources, "get_vpcs", get_vpcs)
+    return slow_region_released
+
+
+class TestIterRegionVPCs:
+    def test_stream_completed_regions(self, regions_aws):
+        regions = iter_region_vpcs(["slow-1", "eu-west-2"], 2)
+        region_name, vpcs, error = next(regions)
+        assert region_name == "eu-west-2"
+        assert vpcs[0]["VpcId"] == "vpc-eu-west-2"
+        assert error is None
+
+        regions_aws.set()
+        assert [name for name, _, _ in regions] == ["slow-1"]
+
+    def test_error(self, regions_aws):
+        regions_aws.set()
+        regions = iter_region_vpcs(["broken-1", "us-east-1"])
+        results = {name: (vpcs, error) for name, vpcs, error in regions}
+        assert isinstance(results["broken-1"][1], RuntimeError)
+        assert results["us-east-1"][1] is None
+
+    def test_display_vpc_list(self, regions_aws, capsys):
+        regions_aws.set()
+        listed = VPCTree().display_vpc_list(["us-east-1", "broken-1"], 1)
+        assert listed is False
+
+        captured = capsys.readouterr()
+        assert captured.out.splitlines() == [
+            "us-east-1 : vpc-us-east-1",
+            "us-east-1 : named : vpc-us-east-1-named",
+        ]
+        assert captured.err == "vpc_tree: error: broken-1: not authorised\n"
+
+
+@pytest.fixture(scope="function")
+def multi_aws(monkeypatch):
+    calls = []
+    vpc_ids = ["vpc-01", "vpc-02", "vpc-03"]
+
+    def in_vpcs(resources, requested):
+        if requested is None:
+            return resources
+        return [r for r in resources if r.get("VpcId") in requested]
+
+    resources = {
+        "vpcs": [
+            {"VpcId": vpc_id, "CidrBlock": "10.0.0.0/16", "Tags": []}
+            for vpc_id in vpc_ids
+        ],
+        "security_groups": [
+            {
+                "GroupId": f"sg-{vpc_id}",
+                "GroupName": "sg",
+                "VpcId": vpc_id,
+                "IpPermissions": [],
+                "IpPermissionsEgress": [],
+            }
+            for vpc_id in vpc_ids
+        ],
+        "subnets": [
+            {
+                "SubnetId": f"sn-{vpc_id}",
+                "VpcId": vpc_id,
+                "AvailabilityZone": "eu-west-2a",
+                "CidrBlock": "10.0.1.0/24",
+            }
+            for vpc_id in vpc_ids
+        ],
+        "instances": [{"InstanceId": "i-gone", "State": {}}],
+        "load_balancers": [
+            {
+                "AvailabilityZones": [],
+                "LoadBalancerArn": f"lb-{vpc_id}",
+                "LoadBalancerName": "lb",
+                "SecurityGroups": [],
+                "VpcId": vpc_id,
+            }
+            for vpc_id in vpc_ids
+        ],
+        "auto_scaling_groups": [
+            {
+                "AutoScalingGroupARN": "arn:aws:asg-01...",
+                "AutoScalingGroupName": "asg",
+                "Instances": [],
+                "LoadBalancerNames": [],
+                "MaxSize": 3,
+                "MinSize": 1,
+                "TargetGroupARNs": [],
+                "VPCZoneIdentifier": "sn-vpc-02",
+            }
+        ],
+        "target_groups": [
+            {
+                "TargetGroupArn": f"tg-{vpc_id}",
+                "TargetGroupName": "tg",
+                "LoadBalancerArns": [lb],
+            }
+            for vpc_id, lb in [
+                ("vpc-01", "lb-vpc-01"),
+                ("vpc-02", "lb-vpc-02"),
+            ]
+        ],
+    }
+
+    def fake(name, function):
+        def recorded(*args, **kwargs):
+            calls.append(name)
+            return function(*args, **kwargs)
+
+        monkeypatch.setattr(aws_resources, name, recorded)
+
+    fake(
+        "get_vpcs",
+        lambda region_name=None, vpc_ids=None: in_vpcs(
+            resources["vpcs"], vpc_ids
+        ),
+    )
+    for name in ("security_groups", "subnets", "instances"):
+        fake(
+            f"get_{name}_in_vpcs",
+            lambda vpc_ids, region_name, filters, name=name: in_vpcs(
+                resources[name], vpc_ids
+            ),
+        )
+    for name in ("load_balancers", "auto_scaling_groups"):
+        fake(f"get_{name}", lambda region_name, name=name: resources[name])
+    fake(
+        "get_all_target_groups", lambda region_name: resources["target_groups"]
+    )
+    fake(
+        "get_target_groups",
+        lambda arns, region_name=None: [
+            tg
+            for arn in arns
+            for tg in resources["target_groups"]
+            if arn in tg["LoadBalancerArns"]
+        ],
+    )
+    return calls
+
+
+def fetch_vpcs(vpc_ids, max_workers=4, mode=TARGET_GROUPS_BY_REGION):
+    with fetching_vpcs_resources(vpc_ids, max_workers, mode) as pending:
+        return [resources.result() for resources in pending]
+
+
+class TestFetchingVPCsResources:
+    def test_partition(self, multi_aws):
+        vpc_01, vpc_02 = fetch_vpcs(["vpc-02", "vpc-01"])[::-1]
+        assert vpc_02.vpc.vpc_id == "vpc-02"
+        assert [sg.group_id for sg in vpc_02.security_groups] == [
+            "sg-vpc-02"
+        ]
+        assert [sn.subnet_id for sn in vpc_02.subnets] == ["sn-vpc-02"]
+        assert vpc_02.instances == []
+        assert [lb.vpc_id for lb in vpc_02.load_balancers] == ["vpc-02"]
+        assert len(vpc_02.auto_scaling_groups) == 1
+        assert [tg.arn for tg in vpc_02.target_groups] == [
+            "tg-vpc-02"
+        ]
+        assert vpc_01.auto_scaling_groups == []
+
+    def test_order(self, multi_aws):
+        vpcs = fetch_vpcs(["vpc-02", "vpc-01"])
+        assert [resources.vpc.vpc_id for resources in vpcs] == [
+            "vpc-02",
+            "vpc-01",
+        ]
+
+    def test_region_wide_calls_once(self, multi_aws):
+        fetch_vpcs(["vpc-01", "vpc-02", "vpc-03"], 1)
+        assert sorted(multi_aws) == sorted(
+            [
+                "get_vpcs",
+                "get_security_groups_in_vpcs",
+                "get_subnets_in_vpcs",
+                "get_instances_in_vpcs",
+                "get_load_balancers",
+                "get_auto_scaling_groups",
+                "get_all_target_groups",
+            ]
+        )
+
+    def test_sections(self, multi_aws):
+        with fetching_vpcs_resources(
+            ["vpc-01", "vpc-02"], 2, sections=["asgs"]
+        ) as pending:
+            vpcs = [resources.result() for resources in pending]
+        assert sorted(multi_aws) == [
+            "get_auto_scaling_groups",
+            "get_subnets_in_vpcs",
+            "get_vpcs",
+        ]
+        assert [len(r.auto_scaling_groups) for r in vpcs] == [0, 1]
+        assert vpcs[1].instances is None
+
+    def test_all(self, multi_aws):
+        vpcs = fetch_vpcs(None)
+        assert [resources.vpc.vpc_id for resources in vpcs] == [
+            "vpc-01",
+            "vpc-02",
+            "vpc-03",
+        ]
+        assert vpcs[2].target_groups == []
+
+    def test_target_group_modes_match(self, multi_aws):
+        by_region = fetch_vpcs(None, 2, TARGET_GROUPS_BY_REGION)
+        by_load_balancer = fetch_vpcs(None, 2, TARGET_GROUPS_BY_LOAD_BALANCER)
+        assert [r.target_groups for r in by_region] == [
+            r.target_groups for r in by_load_balancer
+        ]
+
+    def test_display_vpcs_tree(self, multi_aws, capsys):
+        VPCTree().display_vpcs_tree(["vpc-01", "vpc-02"], 1)
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0].startswith("vpc-01")
+        assert lines.count("") == 1
+        assert lines[lines.index("") + 1].startswith("vpc-02")
@@ -0,0 +1,117 @@
+# test_inventory.py
+
+import json
+import os
+
+import pytest
+from vpc_tree import aws_resources
+from vpc_tree.fetch import VPCResources
+from vpc_tree.inventory import MANIFEST_NAME, render_vpc_file, write_inventory
+from vpc_tree.model import VPC
+
+
+@pytest.fixture(scope="function")
+def regions_aws(monkeypatch):
+    def get_vpcs(region_name=None, vpc_ids=None):
+        if region_name == "broken-1":
+            raise RuntimeError("not authorised")
+        return [
+            {"VpcId": f"vpc-{i}", "CidrBlock": "10.0.0.0/16", "Tags": []}
+            for i in range(2)
+        ]
+
+    def get_subnets_in_vpcs(vpc_ids=None, region_name=None, filters=None):
+        return [
+            {
+                "SubnetId": f"sn-{region_name}",
+                "VpcId": "vpc-1",
+                "AvailabilityZone": f"{region_name}a",
+                "CidrBlock": "10.0.1.0/24",
+            }
+        ]
+
+    monkeypatch.setattr(aws_resources, "get_vpcs", get_vpcs)
+    monkeypatch.setattr(
+        aws_resources, "get_subnets_in_vpcs", get_subnets_in_vpcs
+    )
+    for name in (
+        "get_security_groups_in_vpcs",
+        "get_instances_in_vpcs",
+    ):
+        monkeypatch.setattr(
+            aws_resources, name, lambda vpc_ids, region_name, filters: []
+        )
+    for name in (
+        "get_load_balancers",
+        "get_auto_scaling_groups",
+        "get_all_target_groups",
+    ):
+        monkeypatch.setattr(aws_resources, name, lambda region_name: [])
+
+
+class TestWriteInventory:
+    def test_files(self, regions_aws, tmp_path):
+        manifest = write_inventory(
+            str(tmp_path), ["eu-west-2", "us-east-1"], 2, 2
+        )
+
+        vpcs = [(vpc["region"], vpc["vpc_id"]) for vpc in manifest["vpcs"]]
+        assert vpcs == [
+            ("eu-west-2", "vpc-0"),
+            ("eu-west-2", "vpc-1"),
+            ("us-east-1", "vpc-0"),
+            ("us-east-1", "vpc-1"),
+        ]
+        with open(tmp_path / "us-east-1" / "vpc-1.txt") as file:
+            lines = file.read().splitlines()
+        assert "│  └──sn-us-east-1 : us-east-1a : 10.0.1.0/24" in lines
+        assert manifest["vpcs"][3]["lines"] == len(lines)
+        assert manifest["regions"]["us-east-1"]["vpcs"] == 2
+        assert manifest["errors"] == {}
+
+    def test_manifest(self, regions_aws, tmp_path):
+        manifest = write_inventory(str(tmp_path), ["eu-west-2"], 1, 1)
+
+        with open(tmp_path / MANIFEST_NAME) as file:
+            assert json.load(file) == manifest
+        assert manifest["seconds"] >= manifest["regions"]["eu-west-2"][
+            "fetch_seconds"
+        ]
+        for vpc in manifest["vpcs"]:
+            assert os.path.exists(tmp_path / vpc["file"])
+            assert vpc["render_seconds"] >= 0
+
+    def test_region_error(self, regions_aws, tmp_path):
+        manifest = write_inventory(str(tmp_path), ["broken-1", "eu-west-2"])
+
+        assert manifest["errors"] == {"broken-1": "not authorised"}
+        assert list(manifest["regions"]) == ["eu-west-2"]
+
+    def test_render_error(self, regions_aws, tmp_path):
+        # A directory where a tree file goes can not be written to.
+        os.makedirs(tmp_path / "eu-west-2" / "vpc-0.txt")
+        manifest = write_inventory(str(tmp_path), ["eu-west-2"], 1, 1)
+
+        assert list(manifest["errors"]) == ["eu-west-2/vpc-0"]
+        assert [vpc["vpc_id"] for vpc in manifest["vpcs"]] == ["vpc-1"]
+        assert os.path.exists(tmp_path / MANIFEST_NAME)
+
+
+class TestRenderVPCFile:
+    def test_render(self, tmp_path):
+        resources = VPCResources(
+            VPC("vpc-01", "10.0.0.0/16"),
+            [],
+            [],
+            [],
+            [],
+            [],
+            [],
+        )
+        path = tmp_path / "vpc-01.txt"
+        result = render_vpc_file(str(path), resources)
+
+        with open(path) as file:
+            lines = file.read().splitlines()
+        assert result["lines"] == len(lines) == 6
+        assert lines[-1] == "└──Target Groups:"
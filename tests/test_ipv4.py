@@ -0,0 +1,109 @@
+# test_ipv4.py
+
+import pytest
+from vpc_tree.ipv4 import (
+    address_to_int,
+    cidr_range,
+    free_cidr_blocks,
+    int_to_address,
+    parse_address,
+    parse_cidr,
+    range_to_cidr_blocks,
+)
+
+
+class TestAddressToInt:
+    def test_zero(self):
+        assert address_to_int("0.0.0.0") == 0
+
+    def test_max(self):
+        assert address_to_int("255.255.255.255") == 2**32 - 1
+
+    def test_address(self):
+        assert address_to_int("10.0.1.9") == (10 << 24) + (1 << 8) + 9
+
+
+class TestParseAddress:
+    def test_address(self):
+        assert parse_address("10.0.1.9") == address_to_int("10.0.1.9")
+
+    @pytest.mark.parametrize(
+        "text", ["10.0.1", "10.0.1.256", "10.0.1.x", "10.0.1.-1", ""]
+    )
+    def test_invalid(self, text):
+        with pytest.raises(ValueError):
+            parse_address(text)
+
+
+class TestParseCIDR:
+    def test_cidr(self):
+        assert parse_cidr("10.0.1.0/24") == (address_to_int("10.0.1.0"), 24)
+
+    def test_host_bits(self):
+        assert parse_cidr("10.0.1.7/24") == (address_to_int("10.0.1.0"), 24)
+
+    def test_all(self):
+        assert parse_cidr("0.0.0.0/0") == (0, 0)
+
+    @pytest.mark.parametrize("text", ["10.0.1.0", "10.0.1.0/33", "x/8"])
+    def test_invalid(self, text):
+        with pytest.raises(ValueError):
+            parse_cidr(text)
+
+
+class TestIntToAddress:
+    @pytest.mark.parametrize(
+        "address", ["0.0.0.0", "10.0.1.2", "255.255.255.255"]
+    )
+    def test_round_trip(self, address):
+        assert int_to_address(address_to_int(address)) == address
+
+
+class TestRangeToCIDRBlocks:
+    def test_aligned(self):
+        first, last = cidr_range("10.0.0.0/16")
+        assert range_to_cidr_blocks(first, last) == ["10.0.0.0/16"]
+
+    def test_unaligned(self):
+        first = address_to_int("10.0.0.1")
+        last = address_to_int("10.0.0.8")
+        assert range_to_cidr_blocks(first, last) == [
+            "10.0.0.1/32",
+            "10.0.0.2/31",
+            "10.0.0.4/30",
+            "10.0.0.8/32",
+        ]
+
+    def test_everything(self):
+        assert range_to_cidr_blocks(0, 2**32 - 1) == ["0.0.0.0/0"]
+
+    def test_empty(self):
+        assert range_to_cidr_blocks(2, 1) == []
+
+
+class TestFreeCIDRBlocks:
+    def test_gaps(self):
+        assert free_cidr_blocks(
+            "10.0.0.0/22", ["10.0.2.0/24", "10.0.0.0/25", "192.168.0.0/24"]
+        ) == ["10.0.0.128/25", "10.0.1.0/24", "10.0.3.0/24"]
+
+    def test_full(self):
+        assert free_cidr_blocks("10.0.0.0/24", ["10.0.0.0/24"]) == []
+
+    def test_empty(self):
+        assert free_cidr_blocks("10.0.0.0/24", []) == ["10.0.0.0/24"]
+
+    def test_large(self):
+        allocated = [
+            f"10.{i >> 4}.{(i & 15) * 16}.0/20" for i in range(0, 4096, 3)
+        ]
+        free = free_cidr_blocks("10.0.0.0/8", allocated)
+
+        def size(cidr_block):
+            first, last = cidr_range(cidr_block)
+            return last - first + 1
+
+        assert sum(map(size, free)) + sum(map(size, allocated)) == 2**24
+        ranges = sorted(map(cidr_range, free + allocated))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end + 1 == start
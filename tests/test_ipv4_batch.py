@@ -0,0 +1,63 @@
+# test_ipv4_batch.py
+
+import random
+
+import pytest
+from vpc_tree import ipv4_batch
+from vpc_tree.ipv4_batch import contained_in, pack_addresses
+
+SUBNETS = ["10.0.2.0/24", "10.0.1.0/24", "10.0.16.0/20", "10.0.0.0/28"]
+
+ADDRESSES = [
+    "10.0.1.10",
+    "10.0.2.255",
+    "10.0.3.0",
+    "10.0.0.15",
+    "10.0.0.16",
+    "10.0.31.200",
+    "9.255.255.255",
+    "255.255.255.255",
+    "0.0.0.0",
+]
+
+
+def random_addresses(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        f"10.0.{rng.randrange(40)}.{rng.randrange(256)}" for _ in range(count)
+    ]
+
+
+class TestContainedIn:
+    def test_contained_in(self):
+        found = contained_in(
+            pack_addresses(ADDRESSES), SUBNETS, use_numpy=False
+        )
+        assert found == [1, 0, -1, 3, -1, 2, -1, -1, -1]
+
+    def test_no_blocks(self):
+        assert contained_in([1, 2], [], use_numpy=False) == [-1, -1]
+
+    def test_numpy_not_installed(self, monkeypatch):
+        monkeypatch.setattr(ipv4_batch, "HAVE_NUMPY", False)
+        with pytest.raises(ImportError):
+            contained_in([1], SUBNETS, use_numpy=True)
+
+    def test_invalid_block(self):
+        with pytest.raises(ValueError):
+            contained_in([1], ["10.0.0.0"], use_numpy=False)
+
+
+class TestNumPy:
+    @pytest.fixture(autouse=True)
+    def numpy(self):
+        return pytest.importorskip("numpy")
+
+    def test_contained_in_identical(self):
+        addresses = pack_addresses(ADDRESSES + random_addresses(2000))
+        assert contained_in(addresses, SUBNETS, use_numpy=True) == (
+            contained_in(addresses, SUBNETS, use_numpy=False)
+        )
+
+    def test_no_blocks(self):
+        assert contained_in([1, 2], [], use_numpy=True) == [-1, -1]
@@ -2,6 +2,7 @@
 
 import pytest
 from vpc_tree.lb_tree import LBTree
+from vpc_tree.model import LoadBalancer, project
 
 
 @pytest.fixture(scope="class")
@@ -32,7 +33,7 @@ def load_balancers():
 @pytest.mark.usefixtures("load_balancers")
 class TestLBTree:
     def test_generate(self, load_balancers):
-        lb_tree_generator = LBTree(load_balancers)
+        lb_tree_generator = LBTree(project(LoadBalancer, load_balancers))
         text_tree = []
         lb_tree_generator.generate(text_tree, [])
 
@@ -0,0 +1,170 @@
+# test_lookup.py
+
+import pytest
+from vpc_tree.fetch import VPCResources
+from vpc_tree.ipv4 import parse_address
+from vpc_tree.lookup import CIDRTrie, LookupIndex
+from vpc_tree.model import VPC, Instance, Subnet
+
+
+def vpc_resources(vpc_id, subnets, instances):
+    return VPCResources(
+        VPC(vpc_id, "10.0.0.0/16"), [], subnets, instances, [], [], []
+    )
+
+
+@pytest.fixture(scope="function")
+def index():
+    return LookupIndex(
+        [
+            vpc_resources(
+                "vpc-01",
+                [
+                    Subnet(
+                        "sn-01",
+                        "vpc-01",
+                        "eu-west-2a",
+                        "10.0.1.0/24",
+                        {"Name": "public"},
+                    ),
+                    Subnet("sn-02", "vpc-01", "eu-west-2b", "10.0.2.0/24"),
+                ],
+                [
+                    Instance(
+                        "i-01",
+                        "ami-01",
+                        "t2.micro",
+                        "running",
+                        "10.0.1.10",
+                        "sn-01",
+                        "vpc-01",
+                        (),
+                        {"Name": "web"},
+                    ),
+                    Instance(
+                        "i-02",
+                        "ami-01",
+                        "t2.micro",
+                        "stopped",
+                        None,
+                        "sn-02",
+                        "vpc-01",
+                        (),
+                    ),
+                ],
+            ),
+            vpc_resources(
+                "vpc-02",
+                [Subnet("sn-03", "vpc-02", "eu-west-2a", "10.0.1.0/24")],
+                [],
+            ),
+        ]
+    )
+
+
+class TestCIDRTrie:
+    def test_nested(self):
+        trie = CIDRTrie()
+        trie.insert("10.0.0.0/8", "wide")
+        trie.insert("10.1.0.0/16", "narrow")
+        trie.insert("10.1.2.3/32", "host")
+
+        assert trie.matches(parse_address("10.2.0.1")) == ["wide"]
+        assert trie.matches(parse_address("10.1.0.1")) == ["wide", "narrow"]
+        assert trie.matches(parse_address("10.1.2.3")) == [
+            "wide",
+            "narrow",
+            "host",
+        ]
+        assert trie.matches(parse_address("11.0.0.1")) == []
+        assert len(trie) == 3
+
+    def test_default_route(self):
+        trie = CIDRTrie()
+        trie.insert("0.0.0.0/0", "all")
+        assert trie.matches(parse_address("8.8.8.8")) == ["all"]
+
+    def test_same_block(self):
+        trie = CIDRTrie()
+        trie.insert("10.0.0.0/24", "a")
+        trie.insert("10.0.0.0/24", "b")
+        assert trie.matches(parse_address("10.0.0.1")) == ["a", "b"]
+
+    def test_matches(self):
+        trie = CIDRTrie()
+        trie.insert("10.0.0.0/16", "vpc")
+        trie.insert("10.0.1.0/24", "subnet")
+        trie.insert("10.0.2.0/24", "other")
+        assert trie.matches(parse_address("10.0.1.5")) == ["vpc", "subnet"]
+        assert trie.matches(parse_address("10.1.0.1")) == []
+
+
+class TestLookupIndex:
+    def test_instance(self, index):
+        matches = index.lookup(parse_address("10.0.1.10"))
+        assert [m.subnet.subnet_id for m in matches] == ["sn-01", "sn-03"]
+        assert matches[0].instance.instance_id == "i-01"
+        assert matches[1].instance is None
+
+    def test_lines(self, index):
+        lines = list(
+            index.iter_lookup_lines(
+                ["10.0.1.10\n", "10.0.2.7", "", "192.168.0.1", "10.0.300.1"]
+            )
+        )
+        assert lines == [
+            "10.0.1.10 : vpc-01 : sn-01 : public : eu-west-2a : 10.0.1.0/24 "
+            ": i-01 : web",
+            "10.0.1.10 : vpc-02 : sn-03 : eu-west-2a : 10.0.1.0/24",
+            "10.0.2.7 : vpc-01 : sn-02 : eu-west-2b : 10.0.2.0/24",
+            "192.168.0.1 : not found",
+            "10.0.300.1 : invalid address",
+        ]
+
+    def test_batches(self, index):
+        lines = ["10.0.1.10", "bad", "", "10.0.2.7", "192.168.0.1"] * 3
+        expected = list(index.iter_lookup_lines(lines))
+        assert list(index.iter_lookup_lines(lines, 4)) == expected
+        assert list(index.iter_lookup_lines(lines, 100)) == expected
+
+    def test_streams(self, index):
+        def lines():
+            yield "10.0.2.7"
+            raise AssertionError("read past the first answer")
+
+        assert next(index.iter_lookup_lines(lines())).startswith("10.0.2.7")
+
+    def test_lookup_many(self, index):
+        addresses = [
+            parse_address(a)
+            for a in ("10.0.1.10", "10.0.2.7", "192.168.0.1", "10.0.1.200")
+        ]
+        expected = [index.lookup(address) for address in addresses]
+        found = index.lookup_many(addresses)
+
+        def describe(matches):
+            return [(m.vpc, m.subnet, m.instance) for m in matches]
+
+        assert list(map(describe, found)) == list(map(describe, expected))
+        assert len(found[0]) == 2 and found[2] == []
+
+    def test_overlapping_vpcs(self):
+        index = LookupIndex(
+            [
+                vpc_resources(
+                    "vpc-a",
+                    [Subnet("sn-a", "vpc-a", "eu-west-2a", "10.0.0.0/20")],
+                    [],
+                ),
+                vpc_resources(
+                    "vpc-b",
+                    [Subnet("sn-b", "vpc-b", "eu-west-2a", "10.0.1.0/24")],
+                    [],
+                ),
+            ]
+        )
+        address = parse_address("10.0.1.5")
+        matches = index.lookup(address)
+        assert [m.subnet.subnet_id for m in matches] == ["sn-a", "sn-b"]
+        (found,) = index.lookup_many([address])
+        assert [m.subnet for m in found] == [m.subnet for m in matches]
@@ -0,0 +1,235 @@
+# test_model.py
+
+import json
+
+import pytest
+from vpc_tree.model import (
+    VPC,
+    AutoScalingGroup,
+    Instance,
+    LoadBalancer,
+    Permission,
+    SecurityGroup,
+    Subnet,
+    TargetGroup,
+    group_instances_by_subnet,
+    project,
+)
+
+
+@pytest.fixture(scope="function")
+def instance():
+    return {
+        "InstanceId": "i-01",
+        "ImageId": "ami-01",
+        "InstanceType": "t2.micro",
+        "State": {"Code": 16, "Name": "running"},
+        "PrivateIpAddress": "10.0.0.10",
+        "SubnetId": "sn-01",
+        "VpcId": "vpc-01",
+        "SecurityGroups": [{"GroupId": "sg-01", "GroupName": "web"}],
+        "Tags": [{"Key": "Name", "Value": "web-01"}],
+        "LaunchTime": "2023-07-20T00:00:00+00:00",
+    }
+
+
+@pytest.fixture(scope="function")
+def security_group():
+    return {
+        "GroupId": "sg-01",
+        "GroupName": "web",
+        "Description": "web servers",
+        "VpcId": "vpc-01",
+        "IpPermissions": [
+            {
+                "IpProtocol": "tcp",
+                "FromPort": 443,
+                "ToPort": 443,
+                "IpRanges": [{"CidrIp": "0.0.0.0/0"}],
+                "UserIdGroupPairs": [],
+            }
+        ],
+        "IpPermissionsEgress": [
+            {
+                "IpProtocol": "-1",
+                "IpRanges": [],
+                "UserIdGroupPairs": [{"GroupId": "sg-02"}],
+            }
+        ],
+    }
+
+
+@pytest.fixture(scope="function")
+def auto_scaling_group():
+    return {
+        "AutoScalingGroupARN": "arn:aws:asg-01...",
+        "AutoScalingGroupName": "asg-01",
+        "MinSize": 1,
+        "MaxSize": 3,
+        "MixedInstancesPolicy": {
+            "LaunchTemplate": {
+                "LaunchTemplateSpecification": {"LaunchTemplateId": "lt-01"}
+            }
+        },
+        "VPCZoneIdentifier": "sn-01,sn-02",
+        "Instances": [{"InstanceId": "i-01"}],
+        "LoadBalancerNames": [],
+        "TargetGroupARNs": ["arn:aws:tg-01..."],
+    }
+
+
+class TestProjection:
+    def test_instance(self, instance):
+        result = Instance.from_boto3(instance)
+        assert result.instance_id == "i-01"
+        assert result.state == "running"
+        assert result.security_group_ids == ("sg-01",)
+        assert result.name == "web-01"
+
+    def test_no_dict(self, instance):
+        result = Instance.from_boto3(instance)
+        assert not hasattr(result, "__dict__")
+        with pytest.raises(AttributeError):
+            result.launch_time = None
+
+    def test_interned(self, instance):
+        first, second = project(
+            Instance, json.loads(json.dumps([instance, instance]))
+        )
+        assert first.instance_type is second.instance_type
+        assert first.security_group_ids[0] is second.security_group_ids[0]
+
+    def test_security_group(self, security_group):
+        result = SecurityGroup.from_boto3(security_group)
+        assert result.ingress[0].from_port == 443
+        assert result.ingress[0].ip_ranges == ("0.0.0.0/0",)
+        assert result.egress[0].from_port is None
+        assert result.egress[0].group_ids == ("sg-02",)
+
+    def test_other_sources(self, security_group):
+        permission = security_group["IpPermissions"][0]
+        permission["Ipv6Ranges"] = [{"CidrIpv6": "::/0"}]
+        permission["PrefixListIds"] = [{"PrefixListId": "pl-01"}]
+        result = SecurityGroup.from_boto3(security_group)
+        assert result.ingress[0].ipv6_ranges == ("::/0",)
+        assert result.ingress[0].prefix_list_ids == ("pl-01",)
+        assert Permission.from_boto3(result.ingress[0].to_boto3()) == (
+            result.ingress[0]
+        )
+
+    def test_auto_scaling_group(self, auto_scaling_group):
+        result = AutoScalingGroup.from_boto3(auto_scaling_group)
+        assert result.launch_template_id is None
+        assert result.mixed_instances_launch_template_id == "lt-01"
+        assert result.subnet_ids == ("sn-01", "sn-02")
+
+    def test_no_name(self):
+        vpc = VPC.from_boto3({"VpcId": "vpc-01", "CidrBlock": "10.0.0.0/16"})
+        assert vpc.tags == {}
+        assert vpc.name is None
+
+    def test_own_tags(self):
+        resources = [
+            VPC.from_boto3({"VpcId": "vpc-01", "CidrBlock": "10.0.0.0/16"}),
+            VPC("vpc-02", "10.1.0.0/16"),
+            Subnet("sn-01", "vpc-02", "eu-west-2a", "10.1.0.0/24"),
+        ]
+        resources[0].tags["Name"] = "tagged"
+        resources[1].tags["Name"] = "tagged"
+        assert VPC("vpc-03", "10.2.0.0/16").tags == {}
+        assert resources[2].tags == {}
+        assert VPC.from_boto3({"VpcId": "vpc-04", "CidrBlock": ""}).tags == {}
+
+
+class TestRoundTrip:
+    @pytest.mark.parametrize(
+        "model_class, resource",
+        [
+            (VPC, VPC("vpc-01", "10.0.0.0/16", {"Name": "main"})),
+            (
+                Subnet,
+                Subnet("sn-01", "vpc-01", "eu-west-2a", "10.0.0.0/24"),
+            ),
+            (
+                VPC,
+                VPC("vpc-01", "10.0.0.0/16", {}, ("10.1.0.0/16",)),
+            ),
+            (
+                Subnet,
+                Subnet(
+                    "sn-01", "vpc-01", "eu-west-2a", "10.0.0.0/24", {}, 250
+                ),
+            ),
+            (
+                LoadBalancer,
+                LoadBalancer(
+                    "arn:aws:lb-01...",
+                    "lb-01",
+                    "vpc-01",
+                    (("eu-west-2a", "sn-01"),),
+                    ("sg-01",),
+                ),
+            ),
+            (
+                TargetGroup,
+                TargetGroup("arn:aws:tg-01...", "tg-01", ("arn:aws:lb-01",)),
+            ),
+        ],
+    )
+    def test_round_trip(self, model_class, resource):
+        assert model_class.from_boto3(resource.to_boto3()) == resource
+
+    def test_fixtures(self, instance, security_group, auto_scaling_group):
+        for model_class, resource in [
+            (Instance, instance),
+            (SecurityGroup, security_group),
+            (AutoScalingGroup, auto_scaling_group),
+        ]:
+            result = model_class.from_boto3(resource)
+            assert model_class.from_boto3(result.to_boto3()) == result
+
+    def test_vpc_cidr_blocks(self):
+        vpc = VPC.from_boto3(
+            {
+                "VpcId": "vpc-01",
+                "CidrBlock": "10.0.0.0/16",
+                "CidrBlockAssociationSet": [
+                    {
+                        "CidrBlock": "10.0.0.0/16",
+                        "CidrBlockState": {"State": "associated"},
+                    },
+                    {
+                        "CidrBlock": "100.64.0.0/10",
+                        "CidrBlockState": {"State": "associated"},
+                    },
+                    {
+                        "CidrBlock": "10.9.0.0/16",
+                        "CidrBlockState": {"State": "disassociated"},
+                    },
+                ],
+            }
+        )
+        assert vpc.cidr_blocks == ("10.0.0.0/16", "100.64.0.0/10")
+
+    def test_not_equal(self):
+        assert Subnet("sn-01", "vpc-01", "a", "10.0.0.0/24") != Subnet(
+            "sn-02", "vpc-01", "a", "10.0.1.0/24"
+        )
+
+
+class TestGroupInstancesBySubnet:
+    def test_group(self, instance):
+        instances = [
+            Instance(f"i-{i}", "ami", "t2", "running", ip, "sn-01", "vpc", ())
+            for i, ip in enumerate(["10.0.0.10", None, "10.0.0.9"])
+        ]
+        instance["SubnetId"] = "sn-02"
+        instances.append(Instance.from_boto3(instance))
+
+        result = group_instances_by_subnet(instances)
+        assert [i.instance_id for i in result["sn-01"]] == [
+            "i-2",
+            "i-0",
+            "i-1",
+        ]
+        assert [i.instance_id for i in result["sn-02"]] == ["i-01"]
@@ -1,10 +1,13 @@
 # test_prefix.py
 
+from itertools import product
+
 from vpc_tree.prefix import (
     ELBOW,
     PIPE,
     SPACE,
     TEE,
+    build_prefix,
     elbow_or_tee,
     get_prefix,
     space_or_pipe,
@@ -48,3 +51,12 @@ class TestGetPrefix:
 
     def test_more_subtrees_more_nodes(self):
         assert get_prefix([False, False]) == PIPE + TEE
+
+
+class TestBuildPrefix:
+    def test_matches_get_prefix(self):
+        for depth in range(5):
+            for prefix_description in product([False, True], repeat=depth):
+                expected = build_prefix(list(prefix_description))
+                assert get_prefix(list(prefix_description)) == expected
+                assert get_prefix(list(prefix_description)) == expected
@@ -0,0 +1,159 @@
+# test_ratelimit.py
+
+import io
+from types import SimpleNamespace
+
+import pytest
+from botocore.hooks import HierarchicalEmitter
+from vpc_tree import clients, ratelimit
+from vpc_tree.ratelimit import DECREASE_COOLDOWN, RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+
+
+@pytest.fixture(scope="function")
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture(scope="function")
+def bucket(clock):
+    return TokenBucket(
+        max_rate=10, min_rate=1, burst=2, clock=clock, sleep=clock.sleep
+    )
+
+
+class TestTokenBucket:
+    def test_burst(self, bucket, clock):
+        bucket.acquire()
+        bucket.acquire()
+        assert clock.slept == []
+
+    def test_wait(self, bucket, clock):
+        for _ in range(4):
+            bucket.acquire()
+        assert clock.slept == pytest.approx([0.1, 0.2])
+        assert bucket.counters["waits"] == 2
+        assert bucket.counters["wait_seconds"] == pytest.approx(0.3)
+
+    def test_refill(self, bucket, clock):
+        bucket.acquire()
+        bucket.acquire()
+        clock.now = 0.2
+        bucket.acquire()
+        bucket.acquire()
+        assert clock.slept == []
+
+    def test_throttled(self, bucket):
+        bucket.throttled()
+        assert bucket.rate == 5
+        assert bucket.counters["throttles"] == 1
+
+    def test_throttled_cooldown(self, bucket, clock):
+        bucket.throttled()
+        bucket.throttled()
+        assert bucket.rate == 5
+        clock.now = DECREASE_COOLDOWN
+        bucket.throttled()
+        assert bucket.rate == 2.5
+        assert bucket.counters["throttles"] == 3
+
+    def test_min_rate(self, bucket, clock):
+        for i in range(10):
+            clock.now = i * DECREASE_COOLDOWN
+            bucket.throttled()
+        assert bucket.rate == 1
+
+    def test_succeeded(self, bucket):
+        bucket.throttled()
+        for _ in range(5):
+            bucket.succeeded()
+        assert 5 < bucket.rate < 10
+        for _ in range(1000):
+            bucket.succeeded()
+        assert bucket.rate == 10
+
+
+@pytest.fixture(scope="function")
+def ec2():
+    return SimpleNamespace(
+        meta=SimpleNamespace(
+            events=HierarchicalEmitter(),
+            service_model=SimpleNamespace(service_name="ec2"),
+            region_name="eu-west-2",
+        )
+    )
+
+
+class TestRateLimiter:
+    def test_shared_bucket(self):
+        limiter = RateLimiter()
+        bucket = limiter.get_bucket("ec2", "eu-west-2")
+        assert limiter.get_bucket("ec2", "eu-west-2") is bucket
+        assert limiter.get_bucket("ec2", "us-east-1") is not bucket
+        assert limiter.get_bucket("elbv2", "eu-west-2") is not bucket
+
+    def test_instrument(self, ec2):
+        limiter = RateLimiter()
+        limiter.instrument(ec2)
+        events = ec2.meta.events
+        events.emit("before-send.ec2.DescribeVpcs", request=None)
+        throttled = (None, {"Error": {"Code": "RequestLimitExceeded"}})
+        events.emit("needs-retry.ec2.DescribeVpcs", response=throttled)
+        events.emit("needs-retry.ec2.DescribeVpcs", response=None)
+
+        counters = limiter.counters()[("ec2", "eu-west-2")]
+        assert counters["calls"] == 1
+        assert counters["throttles"] == 1
+        assert counters["rate"] < limiter.max_rate
+
+    def test_succeeded(self, ec2):
+        limiter = RateLimiter()
+        limiter.instrument(ec2)
+        bucket = limiter.get_bucket("ec2", "eu-west-2")
+        bucket.throttled()
+        rate = bucket.rate
+
+        events = ec2.meta.events
+        error = {"Error": {"Code": "UnauthorizedOperation"}}
+        for status_code, parsed in ((403, error), (200, error)):
+            events.emit(
+                "after-call.ec2.DescribeVpcs",
+                http_response=SimpleNamespace(status_code=status_code),
+                parsed=parsed,
+            )
+        assert bucket.rate == rate
+
+        events.emit(
+            "after-call.ec2.DescribeVpcs",
+            http_response=SimpleNamespace(status_code=200),
+            parsed={},
+        )
+        assert bucket.rate > rate
+
+    def test_write_counters(self):
+        limiter = RateLimiter()
+        limiter.get_bucket("ec2", "eu-west-2").acquire()
+        output = io.StringIO()
+        limiter.write_counters(output)
+        lines = output.getvalue().splitlines()
+        assert lines[1].split()[:3] == ["ec2", "eu-west-2", "1"]
+
+
+class TestEnable:
+    def test_instruments_clients(self, monkeypatch):
+        monkeypatch.setattr(ratelimit, "_limiter", None)
+        monkeypatch.setattr(clients, "_client_hooks", [])
+        limiter = ratelimit.enable(max_rate=5)
+        assert ratelimit.get_limiter() is limiter
+        assert clients._client_hooks == [limiter.instrument]
@@ -0,0 +1,167 @@
+# test_reachability.py
+
+import pytest
+from vpc_tree.fetch import VPCResources
+from vpc_tree.model import VPC, Instance, Permission, SecurityGroup
+from vpc_tree.reachability import IntervalTree, ReachabilityIndex
+
+
+def instance(instance_id, address, group_ids, name=None):
+    return Instance(
+        instance_id,
+        "ami-01",
+        "t2.micro",
+        "running",
+        address,
+        "sn-01",
+        "vpc-01",
+        group_ids,
+        {} if name is None else {"Name": name},
+    )
+
+
+@pytest.fixture(scope="function")
+def index():
+    groups = [
+        SecurityGroup(
+            "sg-db",
+            "db",
+            "vpc-01",
+            (
+                Permission("tcp", 5432, 5432, ("10.0.0.0/8",), ()),
+                Permission("tcp", 5432, 5432, (), ("sg-app",)),
+            ),
+            (),
+        ),
+        SecurityGroup(
+            "sg-app",
+            "app",
+            "vpc-01",
+            (
+                Permission("tcp", 8000, 8999, ("10.4.1.0/24",), ()),
+                Permission("6", 22, 22, ("192.168.0.0/16",), ()),
+            ),
+            (),
+        ),
+        SecurityGroup(
+            "sg-admin",
+            "admin",
+            "vpc-01",
+            (Permission("-1", None, None, (), ("sg-bastion",)),),
+            (),
+        ),
+        SecurityGroup(
+            "sg-cache",
+            "cache",
+            "vpc-01",
+            (
+                Permission(
+                    "tcp", 6379, 6379, (), (), ("2001:db8::/32",), ("pl-01",)
+                ),
+            ),
+            (),
+        ),
+    ]
+    instances = [
+        instance("i-db", "10.0.3.10", ("sg-db",), "db"),
+        instance("i-app", "10.0.1.10", ("sg-app", "sg-admin")),
+        instance("i-bastion", "10.9.0.5", ("sg-bastion",)),
+        instance("i-cache", "10.0.4.10", ("sg-cache",)),
+    ]
+    return ReachabilityIndex(
+        [
+            VPCResources(
+                VPC("vpc-01", "10.0.0.0/16"), groups, [], instances, [], [], []
+            )
+        ]
+    )
+
+
+def instance_ids(results):
+    return [instance.instance_id for _, instance, _ in results]
+
+
+class TestIntervalTree:
+    def test_stab(self):
+        tree = IntervalTree(
+            [(0, 65535, "all"), (80, 80, "http"), (8000, 8999, "apps")]
+        )
+        assert sorted(tree.stab(80)) == ["all", "http"]
+        assert sorted(tree.stab(8999)) == ["all", "apps"]
+        assert tree.stab(9000) == ["all"]
+        assert len(tree) == 3
+
+    def test_matches_linear_scan(self):
+        intervals = [
+            (start, start + length, i)
+            for i, (start, length) in enumerate(
+                (s * 37 % 1000, s * 13 % 50) for s in range(200)
+            )
+        ]
+        tree = IntervalTree(intervals)
+        for point in range(0, 1100, 7):
+            expected = [v for s, e, v in intervals if s <= point <= e]
+            assert sorted(tree.stab(point)) == expected
+
+    def test_empty(self):
+        assert IntervalTree([]).stab(80) == []
+
+
+class TestReachabilityIndex:
+    def test_cidr_containing_source(self, index):
+        results = index.query(5432, "10.4.0.0/16")
+        assert instance_ids(results) == ["i-db"]
+        assert results[0][2][0].describe() == "sg-db tcp 5432 from 10.0.0.0/8"
+
+    def test_cidr_inside_source(self, index):
+        assert instance_ids(index.query(8080, "10.0.0.0/8")) == ["i-app"]
+        assert index.query(8080, "10.5.0.0/16") == []
+
+    def test_port_range(self, index):
+        assert index.query(5433, "10.4.0.0/16") == []
+        assert index.query(5432, "10.4.0.0/16", "udp") == []
+
+    def test_protocol_number(self, index):
+        assert instance_ids(index.query(22, "192.168.1.1")) == ["i-app"]
+
+    def test_group_source(self, index):
+        results = index.query(5432, "sg-app")
+        assert instance_ids(results) == ["i-db"]
+        assert results[0][2][0].describe() == "sg-db tcp 5432 from sg-app"
+
+    def test_group_resolved_from_address(self, index):
+        results = index.query(5432, "10.0.1.10")
+        assert instance_ids(results) == ["i-db"]
+        assert [rule.source for rule in results[0][2]] == [
+            "10.0.0.0/8",
+            "sg-app",
+        ]
+
+    def test_all_protocols(self, index):
+        assert instance_ids(index.query(3389, "10.9.0.0/24", "udp")) == [
+            "i-app"
+        ]
+
+    def test_lines(self, index):
+        assert list(index.iter_query_lines(5432, "10.0.1.10/32")) == [
+            "vpc-01 : i-db : db : 10.0.3.10 : sg-db tcp 5432 from 10.0.0.0/8, "
+            "sg-db tcp 5432 from sg-app"
+        ]
+
+    def test_unknown_not_allowed(self, index):
+        assert instance_ids(index.query(6379, "192.0.2.0/24")) == []
+
+    def test_unknown(self, index):
+        assert instance_ids(index.query_unknown(6379)) == ["i-cache"]
+        assert index.query_unknown(6380) == []
+
+    def test_unknown_lines(self, index):
+        assert list(index.iter_query_lines(6379, "192.0.2.0/24")) == [
+            "vpc-01 : i-cache : 10.0.4.10 : unknown : "
+            "sg-cache tcp 6379 from 2001:db8::/32, "
+            "sg-cache tcp 6379 from pl-01"
+        ]
+
+    def test_invalid_source(self, index):
+        with pytest.raises(ValueError):
+            index.query(5432, "10.0.0.0/40")
@@ -2,6 +2,7 @@
 
 import pytest
 from vpc_tree.sg_tree import SGTree
+from vpc_tree.model import SecurityGroup, project
 
 
 @pytest.fixture(scope="class")
@@ -53,7 +54,7 @@ def security_groups():
 @pytest.mark.usefixtures("security_groups")
 class TestSGTree:
     def test_generate(self, security_groups):
-        sg_tree_generator = SGTree(security_groups)
+        sg_tree_generator = SGTree(project(SecurityGroup, security_groups))
         text_tree = []
         sg_tree_generator.generate(text_tree, [])
 
@@ -0,0 +1,251 @@
+# test_snapshot.py
+
+import gzip
+import subprocess
+import sys
+from contextlib import contextmanager
+
+import pytest
+from vpc_tree import aws_resources, fetch
+from vpc_tree.fetch import VPCResources
+from vpc_tree.model import (
+    VPC,
+    Instance,
+    Permission,
+    SecurityGroup,
+    Subnet,
+    TargetGroup,
+)
+from vpc_tree.snapshot import (
+    SnapshotError,
+    iter_records,
+    iter_snapshot,
+    load_snapshot,
+    save_snapshot,
+)
+from vpc_tree.vpc_tree import VPCTree
+
+
+@pytest.fixture(scope="function")
+def vpcs_resources():
+    return [
+        VPCResources(
+            vpc=VPC("vpc-01", "10.0.0.0/16", {"Name": "vpc-one"}),
+            security_groups=[
+                SecurityGroup(
+                    "sg-01",
+                    "sg-one",
+                    "vpc-01",
+                    (Permission("tcp", 22, 22, ("10.0.0.0/8",), ()),),
+                    (Permission("-1", None, None, (), ("sg-01",)),),
+                )
+            ],
+            subnets=[
+                Subnet("sn-01", "vpc-01", "eu-west-2a", "10.0.0.0/24"),
+                Subnet(
+                    "sn-02",
+                    "vpc-01",
+                    "eu-west-2b",
+                    "10.0.1.0/24",
+                    {"Name": "private"},
+                ),
+            ],
+            instances=[
+                Instance(
+                    "i-01",
+                    "ami-01",
+                    "t2.micro",
+                    "running",
+                    "10.0.0.10",
+                    "sn-01",
+                    "vpc-01",
+                    ("sg-01",),
+                )
+            ],
+            load_balancers=[],
+            auto_scaling_groups=[],
+            target_groups=[TargetGroup("arn:aws:tg-01...", "tg-01", ())],
+        ),
+        VPCResources(
+            vpc=VPC("vpc-02", "10.1.0.0/16"),
+            security_groups=[],
+            subnets=[Subnet("sn-03", "vpc-02", "eu-west-2a", "10.1.0.0/24")],
+            instances=[],
+            load_balancers=[],
+            auto_scaling_groups=[],
+            target_groups=[],
+        ),
+    ]
+
+
+class TestSnapshot:
+    def test_round_trip(self, tmp_path, vpcs_resources):
+        path = str(tmp_path / "snapshot.jsonl.gz")
+        save_snapshot(path, vpcs_resources)
+        results = load_snapshot(path)
+
+        assert list(results.keys()) == ["vpc-01", "vpc-02"]
+        for expected in vpcs_resources:
+            result = results[expected.vpc.vpc_id]
+            assert vars(result) == vars(expected)
+
+    def test_select_vpc(self, tmp_path, vpcs_resources):
+        path = str(tmp_path / "snapshot.jsonl.gz")
+        save_snapshot(path, vpcs_resources)
+        results = load_snapshot(path, {"vpc-02"})
+
+        assert list(results.keys()) == ["vpc-02"]
+
+    def test_iter_records(self, tmp_path, vpcs_resources):
+        path = str(tmp_path / "snapshot.jsonl.gz")
+        save_snapshot(path, vpcs_resources)
+        records = list(iter_records(path))
+
+        assert records[0] == (
+            "vpc-01",
+            "vpc",
+            vpcs_resources[0].vpc.to_boto3(),
+        )
+        assert records[1] == (
+            "vpc-01",
+            "security_groups",
+            vpcs_resources[0].security_groups[0].to_boto3(),
+        )
+        assert len(records) == 8
+
+    def test_display_tag_filters(self, tmp_path, vpcs_resources, capsys):
+        path = str(tmp_path / "snapshot.jsonl.gz")
+        save_snapshot(path, vpcs_resources)
+        VPCTree().display_snapshot_tree(
+            path, ["vpc-01"], ["subnets"], {"Name": ["private"]}
+        )
+
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[1:] == [
+            "└──Subnets:",
+            "   └──sn-02 : private : eu-west-2b : 10.0.1.0/24",
+        ]
+
+    def test_display_diff(self, tmp_path, vpcs_resources, capsys):
+        old_path = str(tmp_path / "old.jsonl.gz")
+        new_path = str(tmp_path / "new.jsonl.gz")
+        save_snapshot(old_path, vpcs_resources)
+        vpcs_resources[0].instances[0].state = "stopped"
+        save_snapshot(new_path, vpcs_resources[:1])
+
+        assert VPCTree().display_diff(old_path, snapshot_path=new_path)
+        assert capsys.readouterr().out.splitlines() == [
+            "~ vpc-01 : vpc-one : 10.0.0.0/16",
+            "~ └──Subnets:",
+            "~    └──sn-01 : eu-west-2a : 10.0.0.0/24",
+            "~       └──Instances:",
+            "-          └──i-01 : ami-01 : t2.micro : running : 10.0.0.10",
+            "+          └──i-01 : ami-01 : t2.micro : stopped : 10.0.0.10",
+            "",
+            "- vpc-02 : 10.1.0.0/16",
+            "- ├──Security Groups:",
+            "- ├──Subnets:",
+            "- │  └──sn-03 : eu-west-2a : 10.1.0.0/24",
+            "- ├──Load Balancers:",
+            "- ├──Auto Scaling Groups:",
+            "- └──Target Groups:",
+        ]
+
+        assert not VPCTree().display_diff(new_path, snapshot_path=new_path)
+        assert capsys.readouterr().out == ""
+
+    def test_display_diff_deleted_vpc(
+        self, tmp_path, vpcs_resources, monkeypatch, capsys
+    ):
+        old_path = str(tmp_path / "old.jsonl.gz")
+        save_snapshot(old_path, vpcs_resources)
+        fetched = []
+
+        @contextmanager
+        def fetching_vpcs_resources(vpc_ids, *args):
+            fetched.append(vpc_ids)
+            yield iter(vpcs_resources[:1])
+
+        monkeypatch.setattr(
+            aws_resources, "get_existing_vpc_ids", lambda vpc_ids: ["vpc-01"]
+        )
+        monkeypatch.setattr(
+            fetch, "fetching_vpcs_resources", fetching_vpcs_resources
+        )
+        assert VPCTree().display_diff(old_path, ["vpc-01", "vpc-02"])
+        assert fetched == [["vpc-01"]]
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0] == "- vpc-02 : 10.1.0.0/16"
+        assert "- │  └──sn-03 : eu-west-2a : 10.1.0.0/24" in lines
+
+    def test_not_a_snapshot(self, tmp_path):
+        path = tmp_path / "snapshot.jsonl.gz"
+        path.write_text("not a snapshot")
+        with pytest.raises(SnapshotError):
+            list(iter_records(str(path)))
+
+    def test_unsupported_version(self, tmp_path):
+        path = tmp_path / "snapshot.jsonl.gz"
+        with gzip.open(path, "wt") as file:
+            file.write('{"format":"vpc_tree.snapshot","version":99}\n')
+        with pytest.raises(SnapshotError):
+            list(iter_records(str(path)))
+
+    def test_streamed(self, tmp_path, vpcs_resources):
+        path = tmp_path / "snapshot.jsonl.gz"
+        save_snapshot(str(path), vpcs_resources)
+        with gzip.open(path, "at") as file:
+            file.write("not json\n")
+
+        vpcs = iter_snapshot(str(path))
+        assert vars(next(vpcs)) == vars(vpcs_resources[0])
+        with pytest.raises(SnapshotError, match="line 10"):
+            next(vpcs)
+
+    def test_truncated(self, tmp_path, vpcs_resources):
+        path = tmp_path / "snapshot.jsonl.gz"
+        save_snapshot(str(path), vpcs_resources)
+        path.write_bytes(path.read_bytes()[:-20])
+        with pytest.raises(SnapshotError, match="truncated"):
+            load_snapshot(str(path))
+
+    def test_record_before_vpc(self, tmp_path):
+        path = tmp_path / "snapshot.jsonl.gz"
+        with gzip.open(path, "wt") as file:
+            file.write('{"format":"vpc_tree.snapshot","version":1}\n')
+            file.write('{"vpc_id":"vpc-01","type":"subnets","data":{}}\n')
+        with pytest.raises(SnapshotError, match="not after its vpc record"):
+            load_snapshot(str(path))
+
+    def test_invalid_record(self, tmp_path):
+        path = tmp_path / "snapshot.jsonl.gz"
+        with gzip.open(path, "wt") as file:
+            file.write('{"format":"vpc_tree.snapshot","version":1}\n')
+            file.write('{"vpc_id":"vpc-01","type":"vpc","data":{}}\n')
+        with pytest.raises(SnapshotError, match="vpc record is not valid"):
+            load_snapshot(str(path))
+
+    def test_display_order(self, tmp_path, vpcs_resources, capsys):
+        path = str(tmp_path / "snapshot.jsonl.gz")
+        save_snapshot(path, vpcs_resources)
+        VPCTree().display_snapshot_tree(path, ["vpc-02", "vpc-01"], ["sgs"])
+
+        lines = capsys.readouterr().out.splitlines()
+        assert [line for line in lines if line.startswith("vpc-")] == [
+            "vpc-02 : 10.1.0.0/16",
+            "vpc-01 : vpc-one : 10.0.0.0/16",
+        ]
+
+    def test_display_missing(self, tmp_path, vpcs_resources):
+        path = str(tmp_path / "snapshot.jsonl.gz")
+        save_snapshot(path, vpcs_resources)
+        with pytest.raises(SnapshotError, match="vpc-03"):
+            VPCTree().display_snapshot_tree(path, ["vpc-01", "vpc-03"])
+
+    def test_no_boto3_import(self):
+        code = (
+            "import sys\n"
+            "from vpc_tree import cli\n"
+            "assert 'boto3' not in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
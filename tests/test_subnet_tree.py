@@ -2,6 +2,8 @@
 
 import pytest
 from vpc_tree.subnet_tree import SubnetTree
+from vpc_tree.model import Instance, Subnet, project
+from vpc_tree.text_tree import RenderCache
 
 
 @pytest.fixture(scope="class")
@@ -67,7 +69,9 @@ def instances():
 @pytest.mark.usefixtures("subnets", "instances")
 class TestSubnetTree:
     def test_generate(self, subnets, instances):
-        subnet_tree_generator = SubnetTree(subnets, instances)
+        subnet_tree_generator = SubnetTree(
+            project(Subnet, subnets), project(Instance, instances)
+        )
         text_tree = []
         subnet_tree_generator.generate(text_tree, [])
 
@@ -95,3 +99,38 @@ class TestSubnetTree:
         assert len(text_tree) == len(expected)
         for i in range(len(expected)):
             assert text_tree[i] == expected[i]
+
+    def test_numeric_order(self):
+        subnets = [
+            Subnet("sn-10", "vpc-01", "eu-west-2a", "10.0.10.0/24"),
+            Subnet("sn-02", "vpc-01", "eu-west-2a", "10.0.2.0/24"),
+        ]
+        lines = list(SubnetTree(subnets, []).iter_lines([]))
+        assert lines[1].startswith("├──sn-02")
+        assert lines[2].startswith("└──sn-10")
+
+    def test_render_cache(self, subnets, instances):
+        cache = RenderCache()
+        expected = list(
+            SubnetTree(
+                project(Subnet, subnets), project(Instance, instances)
+            ).iter_lines([])
+        )
+        for _ in range(2):
+            lines = SubnetTree(
+                project(Subnet, subnets), project(Instance, instances), cache
+            ).iter_lines([])
+            assert list(lines) == expected
+            cache.sweep()
+        assert (cache.hits, cache.misses) == (3, 6)
+
+        stopped = project(Instance, instances)
+        stopped[1].state = "stopped"
+        tree_generator = SubnetTree(project(Subnet, subnets), stopped, cache)
+        lines = tree_generator.iter_lines([])
+        assert [line for line in lines if "stopped" in line] == [
+            "│     └──i-02 : instance-02 : ami-1234 : t2.micro : stopped"
+            " : 10.0.1.6"
+        ]
+        # Only sn-01 and i-02 are generated again.
+        assert (cache.hits, cache.misses) == (6, 8)
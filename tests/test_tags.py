@@ -1,7 +1,8 @@
 # test_tags.py
 
 import pytest
-from vpc_tree.tags import get_tag, get_tag_value
+from vpc_tree.model import VPC, Subnet
+from vpc_tree.tags import TagIndex, get_tag, get_tag_value, index_tags
 
 
 @pytest.fixture(scope="function")
@@ -40,3 +41,43 @@ class TestGetTagValue:
     def test_get_tag_value(self, resource):
         value = get_tag_value(resource, "TagKey-01")
         assert value == "Res-01-TagValue-01"
+
+
+@pytest.fixture(scope="function")
+def tag_index():
+    index = TagIndex()
+    index.add("Res-01", {"Env": "prod", "Team": "web"})
+    index.add("Res-02", {"Env": "test", "Team": "web"})
+    index.add("Res-03", {"Env": "prod", "Team": "data"})
+    return index
+
+
+class TestTagIndex:
+    def test_get(self, tag_index):
+        assert tag_index.get("Env", "prod") == {"Res-01", "Res-03"}
+        assert tag_index.get("Env", "dev") == set()
+
+    def test_match_any_value(self, tag_index):
+        ids = tag_index.match({"Env": ["prod", "test"]})
+        assert ids == {"Res-01", "Res-02", "Res-03"}
+
+    def test_match_every_key(self, tag_index):
+        ids = tag_index.match({"Env": ["prod"], "Team": ["web"]})
+        assert ids == {"Res-01"}
+        assert tag_index.match({"Env": ["prod"], "Owner": ["me"]}) == set()
+
+    def test_keys(self, tag_index):
+        assert tag_index.keys() == ["Env", "Team"]
+
+
+class TestIndexTags:
+    def test_models(self):
+        index = index_tags(
+            [
+                VPC("Vpc-01", "10.0.0.0/16", {"Name": "main"}),
+                Subnet("Sn-01", "Vpc-01", "a", "10.0.0.0/24", {"Name": "a"}),
+                Subnet("Sn-02", "Vpc-01", "b", "10.0.1.0/24"),
+            ]
+        )
+        assert index.get("Name", "main") == {"Vpc-01"}
+        assert index.match({"Name": ["main", "a"]}) == {"Vpc-01", "Sn-01"}
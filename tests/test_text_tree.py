@@ -1,7 +1,13 @@
 # test_text_tree.py
 
 import pytest
-from vpc_tree.text_tree import add_node, add_tree
+from vpc_tree.text_tree import (
+    RenderCache,
+    add_node,
+    add_tree,
+    iter_node,
+    iter_tree,
+)
 
 
 @pytest.fixture(scope="class")
@@ -39,3 +45,70 @@ class TestAddTree:
         assert text_tree[2] == "│     ├──Node 2"
         assert text_tree[3] == "│     ├──Node 3"
         assert text_tree[4] == "│     └──Node 4"
+
+
+@pytest.mark.usefixtures("prefix_definition", "heading", "nodes")
+class TestIterTree:
+    def test_iter_tree(self, prefix_definition, heading, nodes):
+        text_tree = []
+        add_tree(text_tree, prefix_definition, heading, nodes, add_node)
+        lines = iter_tree(prefix_definition, heading, nodes, iter_node)
+        assert list(lines) == text_tree
+
+    def test_lazy(self, prefix_definition, heading):
+        def item_function(prefix_definition, item):
+            raise AssertionError("item generated too early")
+            yield
+
+        lines = iter_tree(prefix_definition, heading, [1], item_function)
+        assert next(lines) == "│  └──Tree Heading"
+
+
+class TestRenderCache:
+    @pytest.fixture(scope="function")
+    def generated(self):
+        return []
+
+    @pytest.fixture(scope="function")
+    def item_function(self, generated):
+        def item_function(prefix_definition, item):
+            generated.append(item)
+            yield from iter_node(prefix_definition, item.upper())
+
+        return item_function
+
+    def lines(self, cache, item_function, items):
+        lines = list(
+            iter_tree(
+                [],
+                "Items:",
+                items,
+                cache.wrap(item_function, lambda item: item[0]),
+            )
+        )
+        cache.sweep()
+        return lines
+
+    def test_reused(self, item_function, generated):
+        cache = RenderCache()
+        first = self.lines(cache, item_function, ["a1", "b1", "c1"])
+        second = self.lines(cache, item_function, ["a1", "b1", "c1"])
+        assert first == second == ["Items:", "├──A1", "├──B1", "└──C1"]
+        assert generated == ["a1", "b1", "c1"]
+        assert (cache.hits, cache.misses) == (3, 3)
+
+    def test_changed_and_moved(self, item_function, generated):
+        cache = RenderCache()
+        self.lines(cache, item_function, ["a1", "b1", "c1"])
+        generated.clear()
+        lines = self.lines(cache, item_function, ["a1", "b2", "c1", "d1"])
+        assert lines == ["Items:", "├──A1", "├──B2", "├──C1", "└──D1"]
+        assert generated == ["b2", "c1", "d1"]
+
+    def test_sweep(self, item_function, generated):
+        cache = RenderCache()
+        self.lines(cache, item_function, ["a1", "b1"])
+        self.lines(cache, item_function, ["b1"])
+        generated.clear()
+        self.lines(cache, item_function, ["a1", "b1"])
+        assert generated == ["a1"]
@@ -2,6 +2,7 @@
 
 import pytest
 from vpc_tree.tg_tree import TGTree
+from vpc_tree.model import TargetGroup, project
 
 
 @pytest.fixture(scope="class")
@@ -18,7 +19,7 @@ def target_groups():
 @pytest.mark.usefixtures("target_groups")
 class TestTGTree:
     def test_generate(self, target_groups):
-        tg_tree_generator = TGTree(target_groups)
+        tg_tree_generator = TGTree(project(TargetGroup, target_groups))
         text_tree = []
         tg_tree_generator.generate(text_tree, [])
 
@@ -0,0 +1,167 @@
+# test_trace.py
+
+import io
+import json
+import time
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+from vpc_tree import clients, trace
+from vpc_tree.clients import ClientRegistry
+from vpc_tree.trace import Tracer
+
+
+@pytest.fixture(scope="function")
+def tracer():
+    return Tracer()
+
+
+@pytest.fixture(scope="function")
+def ec2(tracer):
+    client = boto3.client(
+        "ec2",
+        region_name="eu-west-2",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+    tracer.instrument(client)
+    return client
+
+
+def describe_subnets_pages(ec2, pages):
+    with Stubber(ec2) as stubber:
+        for i in range(pages):
+            response = {"Subnets": [{"SubnetId": f"subnet-{i}"}]}
+            if i < pages - 1:
+                response["NextToken"] = f"token-{i}"
+            stubber.add_response("describe_subnets", response)
+        paginator = ec2.get_paginator("describe_subnets")
+        return [
+            subnet
+            for page in paginator.paginate()
+            for subnet in page["Subnets"]
+        ]
+
+
+class TestTracer:
+    def test_api_calls(self, tracer, ec2):
+        assert len(describe_subnets_pages(ec2, 3)) == 3
+        events = [e for e in tracer.events if e["cat"] == "aws"]
+        assert [e["name"] for e in events] == ["ec2.DescribeSubnets"] * 3
+        assert [e["args"]["page"] for e in events] == [1, 2, 3]
+        for event in events:
+            assert event["ph"] == "X"
+            assert event["dur"] >= 0
+            assert event["args"]["service"] == "ec2"
+            assert event["args"]["retries"] == 0
+            assert event["args"]["throttles"] == 0
+
+    def test_page_number_restarts(self, tracer, ec2):
+        describe_subnets_pages(ec2, 2)
+        describe_subnets_pages(ec2, 1)
+        pages = [e["args"]["page"] for e in tracer.events]
+        assert pages == [1, 2, 1]
+
+    def test_span(self, tracer):
+        with tracer.span("sg_tree", lines=3):
+            pass
+        (event,) = tracer.events
+        assert event["name"] == "sg_tree"
+        assert event["cat"] == "vpc_tree"
+        assert event["args"] == {"lines": 3}
+
+    def test_error_response(self, tracer, ec2):
+        with Stubber(ec2) as stubber:
+            stubber.add_client_error(
+                "describe_subnets",
+                "UnauthorizedOperation",
+                http_status_code=403,
+            )
+            with pytest.raises(ClientError):
+                ec2.describe_subnets()
+        (event,) = tracer.events
+        assert event["args"]["error"] == "UnauthorizedOperation"
+
+    def test_success_has_no_error(self, tracer, ec2):
+        describe_subnets_pages(ec2, 1)
+        (event,) = tracer.events
+        assert "error" not in event["args"]
+
+    def test_iter_span(self, tracer, monkeypatch):
+        clock = iter(range(100))
+        monkeypatch.setattr(time, "perf_counter", lambda: next(clock))
+
+        def generate():
+            yield "a"
+            yield "b"
+
+        for line in tracer.iter_span("sg_tree", generate(), lines=2):
+            # The consumer's time between lines is not counted.
+            next(clock)
+        (event,) = tracer.events
+        assert event["args"] == {"lines": 2}
+        assert event["dur"] == 3 * 1e6
+
+    def test_write(self, tracer, ec2, tmp_path):
+        describe_subnets_pages(ec2, 2)
+        with tracer.span("subnet_tree"):
+            pass
+        path = tmp_path / "trace.json"
+        tracer.write(str(path))
+
+        with open(path) as file:
+            events = json.load(file)["traceEvents"]
+        assert [e["ph"] for e in events] == ["M", "X", "X", "X"]
+        assert events[0]["name"] == "thread_name"
+
+    def test_summary(self, tracer, ec2):
+        describe_subnets_pages(ec2, 2)
+        with tracer.span("subnet_tree"):
+            pass
+        rows = {row["name"]: row for row in tracer.summary()}
+        assert rows["ec2.DescribeSubnets"]["count"] == 2
+        assert rows["subnet_tree"]["count"] == 1
+
+        output = io.StringIO()
+        tracer.write_summary(output)
+        lines = output.getvalue().splitlines()
+        assert lines[0].startswith("name")
+        assert len(lines) == 3
+
+
+class TestEnable:
+    @pytest.fixture(autouse=True)
+    def restore(self, monkeypatch):
+        monkeypatch.setattr(trace, "_tracer", None)
+        monkeypatch.setattr(clients, "_client_hooks", [])
+        monkeypatch.setattr(
+            clients, "_registry", ClientRegistry(region_name="eu-west-2")
+        )
+
+    def test_span_disabled(self):
+        with trace.span("sg_tree"):
+            pass
+        assert trace.get_tracer() is None
+
+    def test_client_hooks(self):
+        instrumented = []
+        existing = clients.get_client("ec2")
+        clients.add_client_hook(instrumented.append)
+        created = clients.get_client("elbv2")
+        assert instrumented == [existing, created]
+
+    def test_instruments_clients(self):
+        tracer = trace.enable()
+        assert clients._client_hooks == [tracer.instrument]
+
+    def test_span_enabled(self):
+        tracer = trace.enable()
+        with trace.span("sg_tree"):
+            pass
+        assert [e["name"] for e in tracer.events] == ["sg_tree"]
+
+    def test_iter_span_disabled(self):
+        lines = ["a", "b"]
+        assert trace.iter_span("sg_tree", lines) is lines
@@ -0,0 +1,184 @@
+# test_tree_diff.py
+
+import pytest
+from vpc_tree.tree_diff import (
+    TreeParser,
+    diff_nodes,
+    iter_diff_lines,
+    parse_trees,
+)
+
+
+@pytest.fixture(scope="function")
+def old_lines():
+    return [
+        "vpc-01 : 10.0.0.0/16",
+        "├──Security Groups:",
+        "│  ├──sg-01 : web",
+        "│  │  └──Ingress Permissions:",
+        "│  │     └──tcp : 80 : 80",
+        "│  └──sg-02 : db",
+        "└──Subnets:",
+        "   ├──sn-01 : eu-west-2a : 10.0.1.0/24",
+        "   │  └──Instances:",
+        "   │     └──i-01 : ami-01 : t2.micro : running : 10.0.1.5",
+        "   └──sn-02 : eu-west-2b : 10.0.2.0/24",
+        "",
+        "vpc-02 : 10.1.0.0/16",
+        "└──Subnets:",
+    ]
+
+
+class TestParseTrees:
+    def test_structure(self, old_lines):
+        roots = parse_trees(old_lines)
+        assert [root.text for root in roots] == [
+            "vpc-01 : 10.0.0.0/16",
+            "vpc-02 : 10.1.0.0/16",
+        ]
+        subnets = roots[0].children[1]
+        assert subnets.text == "Subnets:"
+        assert [node.key for node in subnets.children] == ["sn-01", "sn-02"]
+        assert subnets.children[0].children[0].children[0].key == "i-01"
+
+    def test_digests(self, old_lines):
+        old = parse_trees(old_lines)
+        new = parse_trees(old_lines)
+        assert old[0].digest == new[0].digest
+        assert old[0].digest != old[1].digest
+
+        changed = list(old_lines)
+        changed[9] = changed[9].replace("running", "stopped")
+        new = parse_trees(changed)
+        assert new[0].digest != old[0].digest
+        assert new[0].children[0].digest == old[0].children[0].digest
+        assert new[1].digest == old[1].digest
+
+
+def describe(nodes):
+    return [(n.text, n.digest, describe(n.children)) for n in nodes]
+
+
+class TestTreeParser:
+    def test_reuses_subtrees(self, old_lines):
+        parser = TreeParser()
+        old = parser.parse(old_lines)
+        changed = list(old_lines)
+        changed[9] = changed[9].replace("running", "stopped")
+        new = parser.parse(changed)
+
+        assert describe(new) == describe(parse_trees(changed))
+        assert new[0].children[0] is old[0].children[0]
+        assert new[1] is old[1]
+        assert new[0].children[1] is not old[0].children[1]
+        subnets = new[0].children[1].children
+        assert subnets[1] is old[0].children[1].children[1]
+
+    def test_subtree_grows(self, old_lines):
+        parser = TreeParser()
+        parser.parse(old_lines)
+        grown = old_lines[:11] + ["      └──Instances:"] + old_lines[11:]
+        new = parser.parse(grown)
+
+        assert describe(new) == describe(parse_trees(grown))
+        assert new[0].children[1].children[1].children[0].key == "Instances:"
+
+    def test_equal_lines(self, old_lines):
+        parser = TreeParser()
+        parser.parse(old_lines)
+        copied = [line[:1] + line[1:] for line in old_lines]
+        assert describe(parser.parse(copied)) == describe(
+            parse_trees(old_lines)
+        )
+
+
+class TestDiff:
+    def test_identical(self, old_lines):
+        roots = parse_trees(old_lines)
+        assert diff_nodes(roots, parse_trees(old_lines)) == []
+        assert list(iter_diff_lines(roots, parse_trees(old_lines))) == []
+
+    def test_changes(self, old_lines):
+        new_lines = list(old_lines)
+        new_lines[9] = new_lines[9].replace("running", "stopped")
+        new_lines[5] = "│  ├──sg-02 : db"
+        new_lines.insert(6, "│  └──sg-03 : cache")
+        del new_lines[11]
+
+        assert list(
+            iter_diff_lines(parse_trees(old_lines), parse_trees(new_lines))
+        ) == [
+            "~ vpc-01 : 10.0.0.0/16",
+            "~ ├──Security Groups:",
+            "+ │  └──sg-03 : cache",
+            "~ └──Subnets:",
+            "~    ├──sn-01 : eu-west-2a : 10.0.1.0/24",
+            "~    │  └──Instances:",
+            "-    │     └──i-01 : ami-01 : t2.micro : running : 10.0.1.5",
+            "+    │     └──i-01 : ami-01 : t2.micro : stopped : 10.0.1.5",
+            "-    └──sn-02 : eu-west-2b : 10.0.2.0/24",
+        ]
+
+    def test_removed_tree(self, old_lines):
+        old = parse_trees(old_lines)
+        new = parse_trees(old_lines[:11])
+        assert list(iter_diff_lines(old, new)) == [
+            "- vpc-02 : 10.1.0.0/16",
+            "- └──Subnets:",
+        ]
+
+    def test_added_and_removed_siblings(self):
+        old = parse_trees(["a", "├──x : 1", "└──y : 1"])
+        new = parse_trees(["a", "├──y : 1", "└──z : 1"])
+        changes = diff_nodes(old[0].children, new[0].children)
+        assert [(m, o and o.text, n and n.text) for m, o, n in changes] == [
+            ("+", None, "z : 1"),
+            ("-", "x : 1", None),
+        ]
+
+    def test_shared_keys(self):
+        old = parse_trees(
+            [
+                "sg-01 : web",
+                "└──Ingress Permissions:",
+                "   ├──tcp : 22 : 22",
+                "   │  └──IP Ranges:",
+                "   │     └──10.0.0.0/8",
+                "   └──tcp : 443 : 443",
+                "      └──IP Ranges:",
+                "         └──0.0.0.0/0",
+            ]
+        )
+        new = parse_trees(
+            [
+                "sg-01 : web",
+                "└──Ingress Permissions:",
+                "   ├──tcp : 443 : 443",
+                "   │  └──IP Ranges:",
+                "   │     └──0.0.0.0/0",
+                "   └──tcp : 22 : 22",
+                "      └──IP Ranges:",
+                "         └──10.1.0.0/16",
+            ]
+        )
+        assert list(iter_diff_lines(old, new)) == [
+            "~ sg-01 : web",
+            "~ └──Ingress Permissions:",
+            "~    └──tcp : 22 : 22",
+            "~       └──IP Ranges:",
+            "+          ├──10.1.0.0/16",
+            "-          └──10.0.0.0/8",
+        ]
+
+    def test_shared_keys_reordered(self):
+        old = parse_trees(
+            ["a", "├──tcp : 22 : 22", "│  └──x", "└──tcp : 80 : 80"]
+        )
+        new = parse_trees(
+            ["a", "├──tcp : 80 : 80", "│  └──y", "└──tcp : 22 : 22"]
+        )
+        changes = diff_nodes(old[0].children, new[0].children)
+        assert [(o.text, n.text) for _, o, n in changes] == [
+            ("tcp : 80 : 80", "tcp : 80 : 80"),
+            ("tcp : 22 : 22", "tcp : 22 : 22"),
+        ]
@@ -0,0 +1,125 @@
+# test_watch.py
+
+import time
+
+import pytest
+from vpc_tree import aws_resources
+from vpc_tree.vpc_tree import VPCTree
+from vpc_tree.watch import Poller
+
+
+@pytest.fixture(scope="function")
+def instance():
+    return {
+        "ImageId": "ami-1234",
+        "InstanceId": "i-01",
+        "InstanceType": "t2.micro",
+        "PrivateIpAddress": "10.0.1.10",
+        "SecurityGroups": [],
+        "State": {"Name": "pending"},
+        "SubnetId": "sn-01",
+        "VpcId": "vpc-01",
+    }
+
+
+@pytest.fixture(scope="function")
+def fake_aws(monkeypatch, instance):
+    calls = []
+
+    def fake(name, result):
+        def function(*args):
+            calls.append(name)
+            return result
+
+        monkeypatch.setattr(aws_resources, name, function)
+
+    fake("get_vpc", {"VpcId": "vpc-01", "CidrBlock": "10.0.0.0/16"})
+    fake("get_security_groups", [])
+    fake(
+        "get_subnets",
+        [
+            {
+                "AvailabilityZone": "eu-west-2a",
+                "CidrBlock": "10.0.1.0/24",
+                "SubnetId": "sn-01",
+                "VpcId": "vpc-01",
+            }
+        ],
+    )
+    fake("get_instances", [instance])
+    fake(
+        "get_load_balancers",
+        [
+            {
+                "AvailabilityZones": [],
+                "LoadBalancerArn": "arn:aws:lb-01...",
+                "LoadBalancerName": "load-balancer-01",
+                "SecurityGroups": [],
+                "VpcId": "vpc-01",
+            }
+        ],
+    )
+    fake("get_auto_scaling_groups", [])
+    fake("get_all_target_groups", [])
+    return calls
+
+
+class TestPoller:
+    def test_tiers(self, fake_aws):
+        poller = Poller("vpc-01", 1, slow_every=3)
+        polled = [poller.poll() for _ in range(4)]
+        assert fake_aws.count("get_instances") == 4
+        assert fake_aws.count("get_load_balancers") == 2
+        assert fake_aws.count("get_auto_scaling_groups") == 2
+        assert fake_aws.count("get_all_target_groups") == 2
+        for resources in polled:
+            assert [lb.name for lb in resources.load_balancers] == [
+                "load-balancer-01"
+            ]
+            assert resources.target_groups == []
+
+    def test_due_sections(self, fake_aws):
+        poller = Poller("vpc-01", sections=("subnets", "lbs"), slow_every=2)
+        assert poller.due_sections() == ("subnets", "lbs")
+        poller.poll()
+        assert poller.due_sections() == ("subnets",)
+
+    def test_only_slow_sections(self, fake_aws):
+        poller = Poller("vpc-01", 1, sections=("lbs",), slow_every=2)
+        poller.poll()
+        fake_aws.clear()
+        resources = poller.poll()
+        assert fake_aws == ["get_vpc"]
+        assert len(resources.load_balancers) == 1
+
+
+class TestDisplayWatch:
+    def test_changes(self, fake_aws, instance, monkeypatch, capsys):
+        states = iter(["pending", "running"])
+
+        def sleep(seconds):
+            instance["State"] = {"Name": next(states)}
+
+        monkeypatch.setattr(time, "sleep", sleep)
+        monkeypatch.setattr(time, "strftime", lambda format: "12:00:00")
+        VPCTree().display_watch(
+            "vpc-01", 10, 1, sections=("subnets",), polls=3
+        )
+
+        assert capsys.readouterr().out.splitlines() == [
+            "vpc-01 : 10.0.0.0/16",
+            "└──Subnets:",
+            "   └──sn-01 : eu-west-2a : 10.0.1.0/24",
+            "      └──Instances:",
+            "         └──i-01 : ami-1234 : t2.micro : pending : 10.0.1.10",
+            "            └──SecurityGroups:",
+            "",
+            "12:00:00",
+            "~ vpc-01 : 10.0.0.0/16",
+            "~ └──Subnets:",
+            "~    └──sn-01 : eu-west-2a : 10.0.1.0/24",
+            "~       └──Instances:",
+            "-          └──i-01 : ami-1234 : t2.micro : pending : 10.0.1.10",
+            "+          └──i-01 : ami-1234 : t2.micro : running : 10.0.1.10",
+        ]
+        assert fake_aws.count("get_instances") == 3
@@ -2,6 +2,52 @@
 """Top-level package for VPC Tree.
 
 Change Log.
+- 0.3.0 Performance and scale improvements...
+    - Fetch the resources in a VPC concurrently, --max-workers option.
+    - Share Boto3 clients between fetches, --region and --profile options.
+    - Fetch all Target Groups in a region with one paginated call and join
+      them to Load Balancers with an index, --target-groups option.
+    - Cache AWS responses on disk, --no-cache and --refresh options.
+    - Save and display snapshots, --save-snapshot and --from-snapshot
+      options.
+    - Group Instances by Subnet in a single pass, sorted by numeric IP
+      address.
+    - Match Auto Scaling Groups to Subnets with sets and a Subnet Id to VPC
+      index.
+    - Generate trees one line at a time and stream them to the console as
+      each section's resources arrive.
+    - Build each prefix string once and share prefix descriptions between
+      sibling nodes.
+    - Trace AWS calls and tree generation, --trace and --timings options.
+    - List VPCs in several regions concurrently, --regions and --all-regions
+      options.
+    - Display several VPCs, or every VPC with --all, fetching region wide
+      resources once.
+    - Write every VPC in every region to tree files generated on a process
+      pool, with a manifest, --inventory and --processes options.
+    - Limit the rate of AWS calls per service and region, adapting to
+      throttling, --max-rate and --no-rate-limit options.
+    - Project resources onto a compact __slots__ model with interned
+      strings, fix the VPC name missing from the tree's first line.
+    - Display and fetch only some sections of the tree, --only and --skip
+      options.
+    - Scope the Subnets, Instances and Security Groups fetched with EC2
+      filters, --subnet, --az, --state and --tag options.
+    - Hold each resource's tags in a dictionary and index tags across
+      resources, --tag also scopes --from-snapshot.
+    - Look up the Subnets and Instances of IPv4 addresses read from standard
+      input with a CIDR radix trie, --lookup option.
+    - Find the Instances Security Groups allow traffic to a port from a
+      CIDR block, address or Security Group, indexing rules in an interval
+      tree and a CIDR trie, --port, --from and --protocol options.
+    - Answer --lookup addresses read from a file in batches, using NumPy when
+      it is installed.
+    - Sort Subnets by CIDR block numerically, display Subnet capacity and the
+      free CIDR blocks left in each VPC CIDR block, --capacity option.
+    - Compare VPC trees with a snapshot, matching subtrees by Merkle hash,
+      --diff option.
+    - Watch a VPC, polling region wide resources less often and rendering
+      only the resources that changed, --watch option.
 - 0.2.2 Fix error were get_instances would get Instances from all VPCs.
 - 0.2.1 Expand information in Auto Scaling Group sub-tree to include...
     - Launch Template
@@ -14,4 +60,4 @@ Change Log.
 - 0.1.0 Initial release.
 """
 
-__version__ = "0.2.2"
+__version__ = "0.3.0"
@@ -1,26 +1,30 @@
 # asg_tree.py
 """VPC Tree application's Auto Scale Group functionality."""
 
+from operator import attrgetter
+
 from .prefix import get_prefix
-from .text_tree import add_node, add_tree
+from .text_tree import cache_item_function, iter_node, iter_tree
 
 
 class ASGTree:
     """Generates a text tree representation of AWS Auto Scaling Groups.
 
     Attributes:
-        auto_scaling_groups: A list of dictionaries containing Auto Scaling
-        Groups from Boto3.
+        auto_scaling_groups: A list of model.AutoScalingGroup instances.
+        render_cache: A text_tree.RenderCache reusing the lines of unchanged
+        Auto Scaling Groups, None to generate every line.
     """
 
-    def __init__(self, auto_scaling_groups):
+    def __init__(self, auto_scaling_groups, render_cache=None):
         """Initializes instance.
 
         Args:
-            auto_scaling_groups: A list of dictionaries containing Auto
-            Scaling Groups from Boto3.
+            auto_scaling_groups: A list of model.AutoScalingGroup instances.
+            render_cache: A text_tree.RenderCache, None to not cache lines.
         """
         self.auto_scaling_groups = auto_scaling_groups
+        self.render_cache = render_cache
 
     def generate(self, text_tree, prefix_description):
         """Generate a text based tree describing the Auto Scaling Groups.
@@ -30,77 +34,77 @@ class ASGTree:
             prefix_description: A list of booleans describing a common prefix
             to be added to all strings is this text tree.
         """
-        add_tree(
-            text_tree,
+        text_tree.extend(self.iter_lines(prefix_description))
+
+    def iter_lines(self, prefix_description):
+        """Generate the lines of a text based tree describing the Auto Scaling
+        Groups.
+
+        Args:
+            prefix_description: A list of booleans describing a common prefix
+            to be added to all strings is this text tree.
+
+        Yields:
+            Strings containing the lines of the tree.
+        """
+        yield from iter_tree(
             prefix_description,
             "Auto Scaling Groups:",
             self.auto_scaling_groups,
-            self._add_asg_tree,
+            cache_item_function(
+                self.render_cache, self._iter_asg_tree, attrgetter("arn")
+            ),
         )
 
-    def _add_asg_tree(self, text_tree, prefix_description, asg):
-        """Adds tree describing Auto Scaling Group to text_tree."""
-        arn = asg["AutoScalingGroupARN"]
-        name = asg["AutoScalingGroupName"]
-        text_tree.append(f"{get_prefix(prefix_description)}{arn} : {name}")
+    def _iter_asg_tree(self, prefix_description, asg):
+        """Generates tree describing Auto Scaling Group."""
+        arn = asg.arn
+        name = asg.name
+        yield f"{get_prefix(prefix_description)}{arn} : {name}"
 
         sub_prefix_1 = get_prefix(prefix_description + [False])
         sub_prefix_2 = get_prefix(prefix_description + [False] + [True])
 
-        min = asg["MinSize"]
-        max = asg["MaxSize"]
-        text_tree.append(f"{sub_prefix_1}MinSize = {min} : MaxSize = {max}")
+        min = asg.min_size
+        max = asg.max_size
+        yield f"{sub_prefix_1}MinSize = {min} : MaxSize = {max}"
 
-        if "LaunchConfigurationName" in asg:
-            text_tree.append(f"{sub_prefix_1}Launch Configuration")
-            text_tree.append(f"{sub_prefix_2}{asg['LaunchConfigurationName']}")
+        if asg.launch_configuration_name is not None:
+            yield f"{sub_prefix_1}Launch Configuration"
+            yield f"{sub_prefix_2}{asg.launch_configuration_name}"
 
-        if "LaunchTemplate" in asg:
-            text_tree.append(f"{sub_prefix_1}Launch Template")
-            id = asg["LaunchTemplate"]["LaunchTemplateId"]
-            text_tree.append(f"{sub_prefix_2}{id}")
+        if asg.launch_template_id is not None:
+            yield f"{sub_prefix_1}Launch Template"
+            yield f"{sub_prefix_2}{asg.launch_template_id}"
 
-        if "MixedInstancesPolicy" in asg:
-            text_tree.append(f"{sub_prefix_1}Mixed Instances Policy")
-            id = asg["MixedInstancesPolicy"]["LaunchTemplate"][
-                "LaunchTemplateSpecification"
-            ]["LaunchTemplateId"]
-            text_tree.append(f"{sub_prefix_2}{id}")
+        if asg.mixed_instances_launch_template_id is not None:
+            yield f"{sub_prefix_1}Mixed Instances Policy"
+            yield f"{sub_prefix_2}{asg.mixed_instances_launch_template_id}"
 
-        add_tree(
-            text_tree,
+        yield from iter_tree(
             prefix_description + [False],
             "Subnets:",
-            asg["VPCZoneIdentifier"].split(","),
-            add_node,
+            asg.subnet_ids,
+            iter_node,
         )
 
-        add_tree(
-            text_tree,
+        yield from iter_tree(
             prefix_description + [False],
             "Instances:",
-            asg["Instances"],
-            self._add_instance_node,
+            asg.instance_ids,
+            iter_node,
         )
 
-        add_tree(
-            text_tree,
+        yield from iter_tree(
             prefix_description + [False],
             "Load Balancers:",
-            asg["LoadBalancerNames"],
-            add_node,
+            asg.load_balancer_names,
+            iter_node,
         )
 
-        add_tree(
-            text_tree,
+        yield from iter_tree(
             prefix_description + [True],
             "Target Groups:",
-            asg["TargetGroupARNs"],
-            add_node,
-        )
-
-    def _add_instance_node(self, text_tree, prefix_description, instance):
-        """Adds Id of Instance linked to Auto Scaling Group to text_tree."""
-        text_tree.append(
-            f"{get_prefix(prefix_description)}{instance['InstanceId']}"
+            asg.target_group_arns,
+            iter_node,
         )
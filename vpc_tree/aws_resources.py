@@ -2,21 +2,97 @@
 """VPC Tree application's functionality to retrieve and filter resources from
 Boto3."""
 
-import boto3
+from .cache import cached
+from .clients import get_client
+
+# The most values EC2 accepts in one filter or list of Ids.
+MAX_FILTER_VALUES = 200
+
+# The EC2 filter name each describe operation supports for each key of a
+# scope, see scope_filters.
+SCOPE_FILTER_NAMES = {
+    "describe_security_groups": {},
+    "describe_subnets": {
+        "subnet_ids": "subnet-id",
+        "availability_zones": "availability-zone",
+    },
+    "describe_instances": {
+        "subnet_ids": "subnet-id",
+        "availability_zones": "availability-zone",
+        "instance_states": "instance-state-name",
+    },
+}
+
+
+@cached("regions")
+def get_regions():
+    """Get the AWS regions enabled for the AWS account.
+
+    Returns:
+        A sorted list of strings containing the names of the regions.
+    """
+    client = get_client("ec2")
+    response = client.describe_regions()
+    return sorted(region["RegionName"] for region in response["Regions"])
 
 
-def get_vpcs():
+@cached("vpcs")
+def get_vpcs(region_name=None, vpc_ids=None):
     """Get all Virtual Private Clouds in AWS account.
 
+    Args:
+        region_name: A string containing the AWS region, None to use the
+        default region.
+        vpc_ids: A list of strings containing the Ids of the Virtual Private
+        Clouds to get, None to get all of them.
+
     Returns:
         A list of dictionaries containing the details of the Virtual Private
         Clouds.
     """
-    client = boto3.client("ec2")
-    vpc_response = client.describe_vpcs()
-    return vpc_response["Vpcs"]
+    vpcs = []
+
+    client = get_client("ec2", region_name)
+    paginator = client.get_paginator("describe_vpcs")
+    if vpc_ids is None:
+        pages = paginator.paginate()
+    else:
+        pages = (
+            page
+            for chunk in _chunks(vpc_ids, MAX_FILTER_VALUES)
+            for page in paginator.paginate(VpcIds=chunk)
+        )
+    for page in pages:
+        vpcs += page["Vpcs"]
+
+    return vpcs
+
+
+@cached("vpcs")
+def get_existing_vpc_ids(vpc_ids, region_name=None):
+    """Find which of several Virtual Private Clouds still exist.
+
+    The Ids are matched with a filter, so an Id that does not exist is left
+    out rather than failing the call.
+
+    Args:
+        vpc_ids: A list of strings containing the Virtual Private Cloud Ids.
+        region_name: A string containing the AWS region, None to use the
+        default region.
+
+    Returns:
+        A list of strings containing the Ids in vpc_ids that exist, in the
+        same order.
+    """
+    existing = set()
+    if vpc_ids:
+        for page in _paginate_in_vpcs("describe_vpcs", vpc_ids, region_name):
+            existing.update(vpc["VpcId"] for vpc in page["Vpcs"])
+
+    return [vpc_id for vpc_id in vpc_ids if vpc_id in existing]
 
 
+@cached("vpcs")
 def get_vpc(vpc_id):
     """Get a single Virtual Private Cloud.
 
@@ -27,58 +103,83 @@ def get_vpc(vpc_id):
         A dictionary containing the details of the Virtual Private
         Cloud.
     """
-    client = boto3.client("ec2")
+    client = get_client("ec2")
     response = client.describe_vpcs(
         VpcIds=[vpc_id],
     )
     return response["Vpcs"][0]
 
 
-def get_security_groups(vpc_id):
+def get_security_groups(vpc_id, filters=None):
     """Get all Security Groups linked to a Virtual Private Cloud.
 
     Args:
         vpc_id: A string containing the Virtual Private Cloud Id.
+        filters: A list of dictionaries containing extra EC2 Filters.
 
     Returns:
         A list of dictionaries containing the details of the Security Groups.
     """
-    sgs = []
+    return get_security_groups_in_vpcs([vpc_id], filters=filters)
 
-    client = boto3.client("ec2")
-    paginator = client.get_paginator("describe_security_groups")
-    parameters = {
-        "Filters": [
-            {"Name": "vpc-id", "Values": [vpc_id]},
-        ]
-    }
-    page_iterator = paginator.paginate(**parameters)
-    for page in page_iterator:
+
+@cached("security_groups")
+def get_security_groups_in_vpcs(vpc_ids=None, region_name=None, filters=None):
+    """Get all Security Groups linked to several Virtual Private Clouds.
+
+    Args:
+        vpc_ids: A list of strings containing the Virtual Private Cloud Ids,
+        None to get the Security Groups in every Virtual Private Cloud in the
+        region.
+        region_name: A string containing the AWS region, None to use the
+        default region.
+        filters: A list of dictionaries containing extra EC2 Filters, see
+        scope_filters.
+
+    Returns:
+        A list of dictionaries containing the details of the Security Groups.
+    """
+    sgs = []
+    for page in _paginate_in_vpcs(
+        "describe_security_groups", vpc_ids, region_name, filters
+    ):
         sgs += page["SecurityGroups"]
 
     return sgs
 
 
-def get_subnets(vpc_id):
+def get_subnets(vpc_id, filters=None):
     """Get all Subnets linked to a Virtual Private Cloud.
 
     Args:
         vpc_id: A string containing the Virtual Private Cloud Id.
+        filters: A list of dictionaries containing extra EC2 Filters.
 
     Returns:
         A list of dictionaries containing the details of the Subnets.
     """
-    subnets = []
+    return get_subnets_in_vpcs([vpc_id], filters=filters)
 
-    client = boto3.client("ec2")
-    paginator = client.get_paginator("describe_subnets")
-    parameters = {
-        "Filters": [
-            {"Name": "vpc-id", "Values": [vpc_id]},
-        ]
-    }
-    page_iterator = paginator.paginate(**parameters)
-    for page in page_iterator:
+
+@cached("subnets")
+def get_subnets_in_vpcs(vpc_ids=None, region_name=None, filters=None):
+    """Get all Subnets linked to several Virtual Private Clouds.
+
+    Args:
+        vpc_ids: A list of strings containing the Virtual Private Cloud Ids,
+        None to get the Subnets in every Virtual Private Cloud in the region.
+        region_name: A string containing the AWS region, None to use the
+        default region.
+        filters: A list of dictionaries containing extra EC2 Filters, see
+        scope_filters.
+
+    Returns:
+        A list of dictionaries containing the details of the Subnets.
+    """
+    subnets = []
+    for page in _paginate_in_vpcs(
+        "describe_subnets", vpc_ids, region_name, filters
+    ):
         subnets += page["Subnets"]
 
     return subnets
@@ -100,32 +201,66 @@ def get_subnet_ids(subnets):
     return subnet_ids
 
 
-def get_instances(vpc_id):
+def get_instances(vpc_id, filters=None):
     """Get all Instances in Virtual Private Cloud.
 
     Args:
         vpc_id: A string containing Virtual Private Cloud Id.
+        filters: A list of dictionaries containing extra EC2 Filters.
 
     Returns:
         A list of dictionaries containing the details of the Instances.
     """
-    instances = []
+    return get_instances_in_vpcs([vpc_id], filters=filters)
 
-    client = boto3.client("ec2")
-    paginator = client.get_paginator("describe_instances")
-    parameters = {
-            "Filters": [
-                {"Name": "vpc-id", "Values": [vpc_id]},
-            ]
-        }
-    page_iterator = paginator.paginate(**parameters)
-    for page in page_iterator:
+
+@cached("instances")
+def get_instances_in_vpcs(vpc_ids=None, region_name=None, filters=None):
+    """Get all Instances in several Virtual Private Clouds.
+
+    Args:
+        vpc_ids: A list of strings containing the Virtual Private Cloud Ids,
+        None to get the Instances in every Virtual Private Cloud in the
+        region.
+        region_name: A string containing the AWS region, None to use the
+        default region.
+        filters: A list of dictionaries containing extra EC2 Filters, see
+        scope_filters.
+
+    Returns:
+        A list of dictionaries containing the details of the Instances.
+    """
+    instances = []
+    for page in _paginate_in_vpcs(
+        "describe_instances", vpc_ids, region_name, filters
+    ):
         for reservations in page["Reservations"]:
             instances += reservations["Instances"]
 
     return instances
 
 
+def group_by_vpc(resources):
+    """Group resources by Virtual Private Cloud in a single pass.
+
+    Args:
+        resources: A list of dictionaries containing the details of resources
+        with a VpcId, such as Security Groups, Subnets or Instances.
+        Resources without a VpcId, such as terminated Instances, are ignored.
+
+    Returns:
+        A dictionary mapping Virtual Private Cloud Ids to lists of
+        dictionaries containing the details of the resources in them.
+    """
+    index = {}
+    for resource in resources:
+        vpc_id = resource.get("VpcId")
+        if vpc_id is not None:
+            index.setdefault(vpc_id, []).append(resource)
+
+    return index
+
+
 def filter_instances_by_subnet(instances, subnet_id):
     """Filter Instances by Subnet.
 
@@ -141,15 +276,20 @@ def filter_instances_by_subnet(instances, subnet_id):
     return list(filter(lambda d: d["SubnetId"] == subnet_id, instances))
 
 
-def get_load_balancers():
+@cached("load_balancers")
+def get_load_balancers(region_name=None):
     """Get all Load Balancers.
 
+    Args:
+        region_name: A string containing the AWS region, None to use the
+        default region.
+
     Returns:
         A list of dictionaries containing the details of the Load Balancers.
     """
     lbs = []
 
-    client = boto3.client("elbv2")
+    client = get_client("elbv2", region_name)
     paginator = client.get_paginator("describe_load_balancers")
     page_iterator = paginator.paginate()
 
@@ -173,6 +313,24 @@ def filter_load_balancers_by_vpc(load_balancers, vpc_id):
     return list(filter(lambda d: d["VpcId"] == vpc_id, load_balancers))
 
 
+def index_load_balancers_by_vpc(load_balancers):
+    """Group Load Balancers by Virtual Private Cloud in a single pass.
+
+    Args:
+        load_balancers: A list of dictionaries containing the details of the
+        Load Balancers to group.
+
+    Returns:
+        A dictionary mapping Virtual Private Cloud Ids to lists of
+        dictionaries containing the details of the Load Balancers in them.
+    """
+    index = {}
+    for load_balancer in load_balancers:
+        index.setdefault(load_balancer["VpcId"], []).append(load_balancer)
+
+    return index
+
+
 def get_load_balancer_arns(load_balancers):
     """Get list of Load Balancer ARNs.
 
@@ -190,16 +348,21 @@ def get_load_balancer_arns(load_balancers):
     return load_balancer_arns
 
 
-def get_auto_scaling_groups():
+@cached("auto_scaling_groups")
+def get_auto_scaling_groups(region_name=None):
     """Get all Auto Scaling Groups.
 
+    Args:
+        region_name: A string containing the AWS region, None to use the
+        default region.
+
     Returns:
         A list of dictionaries containing the details of the Auto Scaling
         Groups.
     """
     asgs = []
 
-    client = boto3.client("autoscaling")
+    client = get_client("autoscaling", region_name)
     paginator = client.get_paginator("describe_auto_scaling_groups")
     page_iterator = paginator.paginate()
 
@@ -221,28 +384,75 @@ def filter_auto_scaling_groups_by_subnets(auto_scaling_groups, subnet_ids):
         A list of dictionaries containing the details of the filtered Auto
         Scaling Groups.
     """
+    subnet_ids = set(subnet_ids)
     filtered_asgs = []
     for asg in auto_scaling_groups:
         asg_subnet_ids = asg["VPCZoneIdentifier"].split(",")
-        if any(id in subnet_ids for id in asg_subnet_ids):
+        if not subnet_ids.isdisjoint(asg_subnet_ids):
             filtered_asgs.append(asg)
 
     return filtered_asgs
 
 
-def get_target_groups(load_balancer_arns):
+def index_subnet_vpcs(subnets):
+    """Map Subnet Ids to the Ids of their Virtual Private Clouds.
+
+    Args:
+        subnets: A list of dictionaries containing the details of the
+        Subnets.
+
+    Returns:
+        A dictionary mapping Subnet Ids to Virtual Private Cloud Ids.
+    """
+    return {subnet["SubnetId"]: subnet["VpcId"] for subnet in subnets}
+
+
+def group_auto_scaling_groups_by_vpc(auto_scaling_groups, subnet_vpc_index):
+    """Group Auto Scaling Groups by Virtual Private Cloud in a single pass.
+
+    An Auto Scaling Group is in every Virtual Private Cloud that one of its
+    Subnets is in.  Subnets missing from subnet_vpc_index are ignored, so
+    the index can cover one, several or all of the Virtual Private Clouds in
+    a region.
+
+    Args:
+        auto_scaling_groups: A list of dictionaries containing the details of
+        the Auto Scaling Groups to group.
+        subnet_vpc_index: A dictionary returned by index_subnet_vpcs.
+
+    Returns:
+        A dictionary mapping Virtual Private Cloud Ids to lists of
+        dictionaries containing the details of the Auto Scaling Groups in
+        them.
+    """
+    index = {}
+    for asg in auto_scaling_groups:
+        vpc_ids = set()
+        for subnet_id in asg["VPCZoneIdentifier"].split(","):
+            vpc_id = subnet_vpc_index.get(subnet_id)
+            if vpc_id is not None and vpc_id not in vpc_ids:
+                vpc_ids.add(vpc_id)
+                index.setdefault(vpc_id, []).append(asg)
+
+    return index
+
+
+@cached("target_groups")
+def get_target_groups(load_balancer_arns, region_name=None):
     """Get all Target Groups linked to a list of Load Balancers.
 
     Args:
         load_balancer_arns: A list of strings containing the Load Balancers
         ARNs.
+        region_name: A string containing the AWS region, None to use the
+        default region.
 
     Returns:
         A list of dictionaries containing the details of the Target Groups.
     """
     target_groups = []
 
-    client = boto3.client("elbv2")
+    client = get_client("elbv2", region_name)
     paginator = client.get_paginator("describe_target_groups")
 
     for arn in load_balancer_arns:
@@ -251,3 +461,125 @@ def get_target_groups(load_balancer_arns):
             target_groups += page["TargetGroups"]
 
     return target_groups
+
+
+@cached("target_groups")
+def get_all_target_groups(region_name=None):
+    """Get all Target Groups with a single paginated call.
+
+    Args:
+        region_name: A string containing the AWS region, None to use the
+        default region.
+
+    Returns:
+        A list of dictionaries containing the details of the Target Groups.
+    """
+    target_groups = []
+
+    client = get_client("elbv2", region_name)
+    paginator = client.get_paginator("describe_target_groups")
+    page_iterator = paginator.paginate()
+
+    for page in page_iterator:
+        target_groups += page["TargetGroups"]
+
+    return target_groups
+
+
+def index_target_groups_by_load_balancer(target_groups):
+    """Group Target Groups by the ARNs of the Load Balancers they are linked
+    to in a single pass.
+
+    Args:
+        target_groups: A list of dictionaries containing the details of the
+        Target Groups to group.
+
+    Returns:
+        A dictionary mapping Load Balancer ARNs to lists of dictionaries
+        containing the details of the Target Groups linked to them.
+    """
+    index = {}
+    for target_group in target_groups:
+        for arn in target_group["LoadBalancerArns"]:
+            index.setdefault(arn, []).append(target_group)
+
+    return index
+
+
+def get_indexed_target_groups(target_group_index, load_balancer_arns):
+    """Get the Target Groups linked to a list of Load Balancers from an index.
+
+    Gives the same Target Groups in the same order as get_target_groups.
+
+    Args:
+        target_group_index: A dictionary returned by
+        index_target_groups_by_load_balancer.
+        load_balancer_arns: A list of strings containing the Load Balancers
+        ARNs.
+
+    Returns:
+        A list of dictionaries containing the details of the Target Groups.
+    """
+    target_groups = []
+    for arn in load_balancer_arns:
+        target_groups += target_group_index.get(arn, [])
+
+    return target_groups
+
+
+def scope_filters(operation_name, scope):
+    """Convert a scope to the EC2 Filters of a describe operation, so
+    resources outside it are filtered out by AWS rather than after they are
+    downloaded.
+
+    Values of the same key match any of them, and a resource must match
+    every key the operation supports.  Keys the operation has no filter for
+    are left out, Security Groups are only scoped by their tags.
+
+    Args:
+        operation_name: A string containing the name of an EC2 describe
+        operation in SCOPE_FILTER_NAMES.
+        scope: A dictionary that may contain lists of "subnet_ids",
+        "availability_zones" and "instance_states", and "tags", a dictionary
+        mapping tag keys to lists of values.
+
+    Returns:
+        A list of dictionaries containing EC2 Filters, None when no filter
+        applies.
+    """
+    filters = []
+    for key, name in SCOPE_FILTER_NAMES[operation_name].items():
+        values = scope.get(key)
+        if values:
+            filters.append({"Name": name, "Values": list(values)})
+    for key, values in sorted(scope.get("tags", {}).items()):
+        filters.append({"Name": f"tag:{key}", "Values": list(values)})
+
+    return filters or None
+
+
+def _paginate_in_vpcs(operation_name, vpc_ids, region_name=None, filters=None):
+    """Paginate an EC2 describe operation filtered by Virtual Private Cloud
+    Ids and filters, making one paginated call per MAX_FILTER_VALUES Ids."""
+    paginator = get_client("ec2", region_name).get_paginator(operation_name)
+    filters = list(filters or [])
+    if vpc_ids is None:
+        if filters:
+            yield from paginator.paginate(Filters=filters)
+        else:
+            yield from paginator.paginate()
+        return
+
+    for chunk in _chunks(vpc_ids, MAX_FILTER_VALUES):
+        parameters = {
+            "Filters": [
+                {"Name": "vpc-id", "Values": chunk},
+                *filters,
+            ]
+        }
+        yield from paginator.paginate(**parameters)
+
+
+def _chunks(values, size):
+    """Split a list into lists of at most size values."""
+    return [values[i:i + size] for i in range(0, len(values), size)]
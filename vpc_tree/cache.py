@@ -0,0 +1,305 @@
+# cache.py
+"""VPC Tree application's persistent cache of the resources fetched from
+Boto3.
+
+Results of the aws_resources get functions are stored in a SQLite database,
+keyed by AWS credentials, region, function name and arguments.  Each type of
+resource has its own time to live, and when the database grows past its
+maximum size the least recently used results are evicted.
+
+The credentials are identified by the profile name and access key Id the
+shared client registry signs calls with, found without calling AWS, so a
+repeat render served from the cache never touches the network.  An access
+key belongs to a single account, so results fetched with one account's
+credentials are never served to another.
+
+The cache is off until enable is called, so importing aws_resources never
+touches the disk.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from . import clients, serialization
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+DEFAULT_TTLS = {
+    "regions": 24 * 60 * 60,
+    "vpcs": 10 * 60,
+    "security_groups": 5 * 60,
+    "subnets": 10 * 60,
+    "instances": 60,
+    "load_balancers": 5 * 60,
+    "auto_scaling_groups": 2 * 60,
+    "target_groups": 5 * 60,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    resource_type TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    value BLOB NOT NULL
+)
+"""
+
+_MISSING = object()
+
+
+def default_cache_path():
+    """Get the path of the cache database in the user's cache directory."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "vpc_tree", "cache.sqlite3")
+
+
+class ResponseCache:
+    """A SQLite backed cache of Boto3 results.
+
+    Attributes:
+        path: A string containing the path of the database file.
+        ttls: A dictionary mapping resource types to their time to live in
+        seconds.
+        max_size: An integer giving the maximum total size of the stored
+        results in bytes.
+        refresh: A boolean set to True to ignore stored results, new results
+        are still stored.
+    """
+
+    def __init__(
+        self, path, ttls=None, max_size=DEFAULT_MAX_SIZE, refresh=False
+    ):
+        """Initializes instance.
+
+        Args:
+            path: A string containing the path of the database file.
+            ttls: A dictionary mapping resource types to their time to live
+            in seconds, merged over DEFAULT_TTLS.
+            max_size: An integer giving the maximum total size of the stored
+            results in bytes.
+            refresh: A boolean set to True to ignore stored results.
+        """
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_size = max_size
+        self.refresh = refresh
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(_SCHEMA)
+        self._connection.commit()
+
+    def get(self, key, resource_type):
+        """Get a stored result.
+
+        Args:
+            key: A string identifying the result.
+            resource_type: A string containing the type of resource, a key of
+            ttls.
+
+        Returns:
+            The stored result, or None if there is no result that is still
+            fresh.
+        """
+        value = self._get(key, resource_type)
+        return None if value is _MISSING else value
+
+    def put(self, key, resource_type, value):
+        """Store a result, evicting old results if the cache is too big.
+
+        Args:
+            key: A string identifying the result.
+            resource_type: A string containing the type of resource.
+            value: The Boto3 data to store.
+        """
+        blob = zlib.compress(serialization.dumps(value).encode())
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, resource_type, now, now, len(blob), blob),
+            )
+            self._evict()
+            self._connection.commit()
+
+    def clear(self):
+        """Remove all stored results."""
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def size(self):
+        """Get the total size of the stored results in bytes."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return row[0]
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    def _get(self, key, resource_type):
+        """Get a stored result, _MISSING if there is no fresh result."""
+        if self.refresh:
+            return _MISSING
+
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT created, value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return _MISSING
+
+            created, blob = row
+            if now - created > self.ttls.get(resource_type, 0):
+                self._connection.execute(
+                    "DELETE FROM responses WHERE key = ?", (key,)
+                )
+                self._connection.commit()
+                return _MISSING
+
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+
+        return serialization.loads(zlib.decompress(blob))
+
+    def _evict(self):
+        """Delete least recently used results until the cache fits in
+        max_size, must be called holding the lock."""
+        total = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_size:
+            return
+
+        rows = self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            self._connection.execute(
+                "DELETE FROM responses WHERE key = ?", (key,)
+            )
+            total -= size
+
+
+_cache = None
+
+
+def enable(path=None, ttls=None, max_size=DEFAULT_MAX_SIZE, refresh=False):
+    """Start caching the results of the aws_resources get functions.
+
+    Args:
+        path: A string containing the path of the database file, None to use
+        default_cache_path.
+        ttls: A dictionary mapping resource types to their time to live in
+        seconds, merged over DEFAULT_TTLS.
+        max_size: An integer giving the maximum total size of the stored
+        results in bytes.
+        refresh: A boolean set to True to ignore stored results.
+    """
+    global _cache
+    disable()
+    _cache = ResponseCache(
+        path or default_cache_path(), ttls, max_size, refresh
+    )
+
+
+def disable():
+    """Stop caching results."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = None
+
+
+def get_cache():
+    """Get the active ResponseCache, None when caching is off."""
+    return _cache
+
+
+def make_key(credentials_id, region_name, api_name, arguments):
+    """Create a cache key.
+
+    Args:
+        credentials_id: A list identifying the AWS credentials, see
+        clients.ClientRegistry.get_credentials_id.
+        region_name: A string containing the AWS region.
+        api_name: A string containing the name of the function called.
+        arguments: A dictionary of the arguments it was called with.
+
+    Returns:
+        A string containing a hash of the normalized key parts.
+    """
+    normalized = json.dumps(
+        [credentials_id, region_name, api_name, arguments],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def cached(resource_type):
+    """Decorator caching the results of an aws_resources get function.
+
+    The region is taken from a region_name argument when the function has
+    one, otherwise from the shared client registry.
+
+    Args:
+        resource_type: A string containing the type of resource the
+        function gets, used to select its time to live.
+    """
+
+    def decorator(function):
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            cache = _cache
+            if cache is None:
+                return function(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            registry = clients.get_registry()
+            region_name = registry.get_region_name(
+                arguments.pop("region_name", None)
+            )
+            key = make_key(
+                registry.get_credentials_id(),
+                region_name,
+                function.__name__,
+                arguments,
+            )
+
+            value = cache._get(key, resource_type)
+            if value is _MISSING:
+                value = function(*args, **kwargs)
+                cache.put(key, resource_type, value)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,116 @@
+# capacity_tree.py
+"""VPC Tree application's Subnet capacity functionality.
+
+Describes how much of each of a Virtual Private Cloud's CIDR blocks its
+Subnets use, how many addresses each Subnet has available, and the free
+CIDR blocks left for new Subnets.
+"""
+
+from .ipv4 import cidr_range, free_cidr_blocks, parse_cidr
+from .ipv4_batch import contained_in
+from .prefix import get_prefix
+from .text_tree import iter_node, iter_tree
+
+
+def _size(cidr_block):
+    """Get the number of addresses in a CIDR block."""
+    first, last = cidr_range(cidr_block)
+    return last - first + 1
+
+
+class CapacityTree:
+    """Generates a text tree representation of the capacity of a Virtual
+    Private Cloud's CIDR blocks.
+
+    Attributes:
+        vpc: A model.VPC instance.
+        subnets_by_block: A dictionary mapping each of the Virtual Private
+        Cloud's CIDR blocks to a list of the model.Subnet instances in it,
+        in numeric CIDR block order.
+    """
+
+    def __init__(self, vpc, subnets):
+        """Initializes instance.
+
+        Args:
+            vpc: A model.VPC instance.
+            subnets: A list of model.Subnet instances in the Virtual Private
+            Cloud.
+        """
+        self.vpc = vpc
+        cidr_blocks = list(vpc.cidr_blocks)
+        subnets = sorted(subnets, key=lambda x: parse_cidr(x.cidr_block))
+        found = contained_in(
+            [parse_cidr(subnet.cidr_block)[0] for subnet in subnets],
+            cidr_blocks,
+        )
+        self.subnets_by_block = {cidr_block: [] for cidr_block in cidr_blocks}
+        for subnet, i in zip(subnets, found):
+            if i >= 0:
+                self.subnets_by_block[cidr_blocks[i]].append(subnet)
+
+    def iter_lines(self, prefix_description):
+        """Generate the lines of a text based tree describing the capacity
+        of the Virtual Private Cloud's CIDR blocks.
+
+        Args:
+            prefix_description: A list of booleans describing a common prefix
+            to be added to all strings is this text tree.
+
+        Yields:
+            Strings containing the lines of the tree.
+        """
+        yield from iter_tree(
+            prefix_description,
+            "Capacity:",
+            list(self.subnets_by_block),
+            self._iter_block_tree,
+        )
+
+    def _iter_block_tree(self, prefix_description, cidr_block):
+        """Generates tree describing a CIDR block of the Virtual Private
+        Cloud."""
+        prefix = get_prefix(prefix_description)
+        subnets = self.subnets_by_block[cidr_block]
+        free_blocks = free_cidr_blocks(
+            cidr_block, (subnet.cidr_block for subnet in subnets)
+        )
+        size = _size(cidr_block)
+        free = sum(map(_size, free_blocks))
+
+        yield (
+            f"{prefix}{cidr_block} : {size} addresses : {size - free} in "
+            f"{len(subnets)} Subnets : {free} free"
+        )
+        yield from iter_tree(
+            prefix_description + [False],
+            "Subnets:",
+            subnets,
+            self._iter_subnet_node,
+        )
+        yield from iter_tree(
+            prefix_description + [True],
+            "Free:",
+            free_blocks,
+            self._iter_free_node,
+        )
+
+    def _iter_subnet_node(self, prefix_description, subnet):
+        """Generates the line describing a Subnet's capacity."""
+        fields = [subnet.subnet_id]
+        if subnet.name is not None:
+            fields.append(subnet.name)
+        fields.append(subnet.cidr_block)
+        size = _size(subnet.cidr_block)
+        available = subnet.available_ip_address_count
+        if available is None:
+            fields.append(f"{size} addresses")
+        else:
+            fields.append(f"{available} of {size} available")
+        yield from iter_node(prefix_description, " : ".join(fields))
+
+    def _iter_free_node(self, prefix_description, cidr_block):
+        """Generates the line describing a free CIDR block."""
+        yield from iter_node(
+            prefix_description, f"{cidr_block} : {_size(cidr_block)} addresses"
+        )
@@ -2,18 +2,198 @@
 """VPC Tree application's Command Line Interface."""
 
 import argparse
+import sys
 
-from . import __version__, vpc_tree
+from . import (
+    __version__,
+    aws_resources,
+    cache,
+    clients,
+    inventory,
+    ratelimit,
+    trace,
+    vpc_tree,
+)
+from .ipv4 import parse_address, parse_cidr
+from .snapshot import SnapshotError
+from .watch import DEFAULT_SLOW_EVERY
+from .fetch import (
+    DEFAULT_MAX_WORKERS,
+    SECTIONS,
+    TARGET_GROUP_MODES,
+    TARGET_GROUPS_BY_REGION,
+)
+
+INSTANCE_STATES = (
+    "pending",
+    "running",
+    "shutting-down",
+    "terminated",
+    "stopping",
+    "stopped",
+)
 
 
 def main():
     """"""
     args = parse_cmd_line_arguments()
+    tracer = None
+    if args.trace is not None or args.timings:
+        tracer = trace.enable()
+    try:
+        run(args)
+    finally:
+        if tracer is not None:
+            if args.trace is not None:
+                tracer.write(args.trace)
+            if args.timings:
+                tracer.write_summary(sys.stderr)
+        limiter = ratelimit.get_limiter()
+        if args.timings and limiter is not None:
+            limiter.write_counters(sys.stderr)
+
+
+def run(args):
+    """Display what the command line arguments ask for."""
     tree = vpc_tree.VPCTree()
-    if args.list_vpcs:
-        tree.display_vpc_list()
+    if args.from_snapshot is not None and args.lookup:
+        try:
+            tree.display_lookup(
+                sys.stdin,
+                args.vpc_ids or None,
+                snapshot_path=args.from_snapshot,
+            )
+        except (OSError, SnapshotError) as error:
+            sys.exit(f"vpc_tree: error: {error}")
+        return
+    if args.from_snapshot is not None and args.port is not None:
+        try:
+            tree.display_reachability(
+                args.port,
+                args.source,
+                args.protocol,
+                args.vpc_ids or None,
+                snapshot_path=args.from_snapshot,
+            )
+        except (OSError, SnapshotError) as error:
+            sys.exit(f"vpc_tree: error: {error}")
+        return
+    if args.from_snapshot is not None and args.diff is not None:
+        try:
+            differs = tree.display_diff(
+                args.diff,
+                args.vpc_ids or None,
+                snapshot_path=args.from_snapshot,
+            )
+        except (OSError, SnapshotError) as error:
+            sys.exit(f"vpc_tree: error: {error}")
+        sys.exit(1 if differs else 0)
+    if args.from_snapshot is not None and args.capacity:
+        try:
+            tree.display_capacity(args.vpc_ids or None, args.from_snapshot)
+        except (OSError, SnapshotError) as error:
+            sys.exit(f"vpc_tree: error: {error}")
+        return
+    if args.from_snapshot is not None:
+        try:
+            tree.display_snapshot_tree(
+                args.from_snapshot,
+                args.vpc_ids or None,
+                args.sections,
+                None if args.scope is None else args.scope["tags"],
+            )
+        except (OSError, SnapshotError) as error:
+            sys.exit(f"vpc_tree: error: {error}")
+        return
+
+    clients.configure(
+        region_name=args.region,
+        profile_name=args.profile,
+        max_pool_connections=max(
+            args.max_workers, clients.DEFAULT_MAX_POOL_CONNECTIONS
+        ),
+    )
+    if not args.no_rate_limit:
+        ratelimit.enable(max_rate=args.max_rate)
+    # Watching polls AWS for changes, so never reads cached responses.
+    if not args.no_cache and args.watch is None:
+        cache.enable(refresh=args.refresh)
+    if args.all_regions or (args.inventory and args.regions is None):
+        region_names = aws_resources.get_regions()
+    else:
+        region_names = args.regions
+
+    if args.inventory is not None:
+        manifest = inventory.write_inventory(
+            args.inventory,
+            region_names,
+            args.max_workers,
+            args.processes,
+            args.target_groups,
+            args.sections,
+        )
+        for region_name, error in manifest["errors"].items():
+            print(f"vpc_tree: error: {region_name}: {error}", file=sys.stderr)
+        if len(manifest["errors"]) > 0:
+            sys.exit(1)
+    elif args.lookup:
+        tree.display_lookup(
+            sys.stdin, None if args.all else args.vpc_ids, args.max_workers
+        )
+    elif args.diff is not None:
+        try:
+            differs = tree.display_diff(
+                args.diff,
+                None if args.all else args.vpc_ids,
+                args.max_workers,
+                args.target_groups,
+            )
+        except (OSError, SnapshotError) as error:
+            sys.exit(f"vpc_tree: error: {error}")
+        sys.exit(1 if differs else 0)
+    elif args.capacity:
+        tree.display_capacity(None if args.all else args.vpc_ids)
+    elif args.watch is not None:
+        try:
+            tree.display_watch(
+                args.vpc_ids[0],
+                args.watch,
+                args.max_workers,
+                args.target_groups,
+                args.sections,
+                args.scope,
+            )
+        except KeyboardInterrupt:
+            pass
+    elif args.port is not None:
+        tree.display_reachability(
+            args.port,
+            args.source,
+            args.protocol,
+            None if args.all else args.vpc_ids,
+            args.max_workers,
+        )
+    elif args.list_vpcs or region_names is not None:
+        if not tree.display_vpc_list(region_names, args.max_workers):
+            sys.exit(1)
+    elif len(args.vpc_ids) == 1:
+        tree.display_vpc_tree(
+            args.vpc_ids[0],
+            args.max_workers,
+            args.target_groups,
+            args.save_snapshot,
+            args.sections,
+            args.scope,
+        )
     else:
-        tree.display_vpc_tree(args.vpc_id)
+        tree.display_vpcs_tree(
+            None if args.all else args.vpc_ids,
+            args.max_workers,
+            args.target_groups,
+            args.save_snapshot,
+            args.sections,
+            args.scope,
+        )
 
 
 def parse_cmd_line_arguments():
@@ -32,10 +212,432 @@ def parse_cmd_line_arguments():
         help="Generate a list of VPCs",
     )
     parser.add_argument(
-        "vpc_id",
+        "--region",
+        help="AWS region to use instead of the configured default",
+    )
+    regions_group = parser.add_mutually_exclusive_group()
+    regions_group.add_argument(
+        "--all-regions",
+        action="store_true",
+        help="List the VPCs in every region enabled for the account",
+    )
+    regions_group.add_argument(
+        "--regions",
+        type=region_list,
+        metavar="REGION,...",
+        help="List the VPCs, or with --inventory write the trees of the "
+        "VPCs, in a comma separated list of regions",
+    )
+    parser.add_argument(
+        "--inventory",
+        metavar="DIR",
+        help="Write a tree file for every VPC in every region, or the "
+        "--regions given, to a directory with a manifest.json of timings "
+        "and line counts",
+    )
+    parser.add_argument(
+        "--lookup",
+        action="store_true",
+        help="Read IPv4 addresses from standard input, one per line, and "
+        "print the Subnet and Instance each belongs to in the VPCs given, "
+        "--all or --from-snapshot",
+    )
+    parser.add_argument(
+        "--diff",
+        metavar="OLD_SNAPSHOT",
+        help="Print only the added, removed and changed parts of the trees of "
+        "the VPCs given, --all or --from-snapshot, compared with an older "
+        "snapshot file written by --save-snapshot, exiting with status 1 if "
+        "anything changed",
+    )
+    parser.add_argument(
+        "--watch",
+        type=positive_float,
+        metavar="SECONDS",
+        help="Print the tree of the VPC given, then poll it every SECONDS "
+        "and print only what changed, fetching the region wide Load "
+        "Balancers, Auto Scaling Groups and Target Groups every "
+        f"{DEFAULT_SLOW_EVERY} polls",
+    )
+    parser.add_argument(
+        "--capacity",
+        action="store_true",
+        help="Print the addresses available in each Subnet and the free CIDR "
+        "blocks left in each CIDR block of the VPCs given, --all or "
+        "--from-snapshot",
+    )
+    parser.add_argument(
+        "--port",
+        type=port_number,
+        metavar="PORT",
+        help="With --from, print the Instances whose Security Groups allow "
+        "traffic to this port from the source, in the VPCs given, --all or "
+        "--from-snapshot",
+    )
+    parser.add_argument(
+        "--from",
+        dest="source",
+        type=reachability_source,
+        metavar="CIDR|ADDRESS|SG_ID",
+        help="Source of the traffic --port is queried for, a CIDR block, an "
+        "IPv4 address or a Security Group Id",
+    )
+    parser.add_argument(
+        "--protocol",
+        default="tcp",
+        help="Protocol of the traffic --port is queried for (default tcp)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=positive_int,
+        metavar="N",
+        help="Number of processes generating --inventory trees (default one "
+        "per CPU)",
+    )
+    parser.add_argument(
+        "--profile",
+        help="AWS profile to use instead of the configured default",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=positive_int,
+        default=DEFAULT_MAX_WORKERS,
+        metavar="N",
+        help="Maximum number of AWS calls to make at the same time "
+        f"(default {DEFAULT_MAX_WORKERS}, 1 fetches one after another)",
+    )
+    parser.add_argument(
+        "--max-rate",
+        type=positive_float,
+        default=ratelimit.DEFAULT_MAX_RATE,
+        metavar="N",
+        help="Maximum AWS calls per second to each service in each region, "
+        "reduced automatically while AWS is throttling calls (default "
+        f"{ratelimit.DEFAULT_MAX_RATE:g})",
+    )
+    parser.add_argument(
+        "--no-rate-limit",
+        action="store_true",
+        help="Do not limit the rate of AWS calls",
+    )
+    parser.add_argument(
+        "--target-groups",
+        choices=TARGET_GROUP_MODES,
+        default=TARGET_GROUPS_BY_REGION,
+        help="Fetch all Target Groups in the region with one paginated call "
+        "or make one call per Load Balancer (default "
+        f"{TARGET_GROUPS_BY_REGION})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the cache of AWS responses",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Fetch everything from AWS and update the cache",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Write a Chrome trace event file recording every AWS call and "
+        "how long each section of the tree took to generate",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print a table summarising AWS call and generation timings to "
+        "standard error",
+    )
+    sections_group = parser.add_mutually_exclusive_group()
+    sections_group.add_argument(
+        "--only",
+        type=section_list,
+        metavar="SECTION,...",
+        help="Display only these sections of the tree, and only fetch the "
+        f"resources they need, from {','.join(SECTIONS)}",
+    )
+    sections_group.add_argument(
+        "--skip",
+        type=section_list,
+        metavar="SECTION,...",
+        help="Do not display, or fetch the resources of, these sections of "
+        "the tree",
+    )
+    parser.add_argument(
+        "--subnet",
+        type=id_list,
+        metavar="SUBNET_ID,...",
+        help="Only display these Subnets and the Instances in them",
+    )
+    parser.add_argument(
+        "--az",
+        type=id_list,
+        metavar="ZONE,...",
+        help="Only display the Subnets and Instances in these Availability "
+        "Zones",
+    )
+    parser.add_argument(
+        "--state",
+        type=state_list,
+        metavar="STATE,...",
+        help="Only display Instances in these states, from "
+        f"{','.join(INSTANCE_STATES)}",
+    )
+    parser.add_argument(
+        "--tag",
+        type=tag_filter,
+        action="append",
+        metavar="KEY=VALUE",
+        help="Only display Security Groups, Subnets and Instances with this "
+        "tag, repeat for several values of a key or several keys, also "
+        "applies to --from-snapshot",
+    )
+    snapshot_group = parser.add_mutually_exclusive_group()
+    snapshot_group.add_argument(
+        "--save-snapshot",
+        metavar="FILE",
+        help="Save the fetched resources to a snapshot file",
+    )
+    snapshot_group.add_argument(
+        "--from-snapshot",
+        metavar="FILE",
+        help="Display the VPCs saved in a snapshot file instead of fetching "
+        "them from AWS",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Generate trees of every VPC in the region",
+    )
+    parser.add_argument(
+        "vpc_ids",
         metavar="VPC_ID",
-        nargs="?",
-        help="Generate a tree of the Virtual Private Cloud's structure",
+        nargs="*",
+        help="Generate a tree of the Virtual Private Cloud's structure, "
+        "several are fetched together",
     )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    args.vpc_ids = list(dict.fromkeys(args.vpc_ids))
+    regions = args.all_regions or args.regions
+    if regions and (args.vpc_ids or args.all):
+        parser.error("--all-regions and --regions list VPCs, omit VPC_ID")
+    if args.inventory is not None and (
+        args.vpc_ids or args.all or args.list_vpcs or args.from_snapshot
+    ):
+        parser.error(
+            "--inventory writes every VPC, omit VPC_ID, --all, --list-vpcs "
+            "and --from-snapshot"
+        )
+    if args.all and args.vpc_ids:
+        parser.error("--all displays every VPC, omit VPC_ID")
+    if args.lookup and (
+        args.list_vpcs or regions or args.inventory or args.save_snapshot
+    ):
+        parser.error(
+            "--lookup searches VPCs, omit --list-vpcs, --regions, "
+            "--all-regions, --inventory and --save-snapshot"
+        )
+    if (args.port is None) != (args.source is None):
+        parser.error("--port and --from must be given together")
+    if args.port is not None and (
+        args.lookup
+        or args.list_vpcs
+        or regions
+        or args.inventory
+        or args.save_snapshot
+    ):
+        parser.error(
+            "--port and --from query VPCs, omit --lookup, --list-vpcs, "
+            "--regions, --all-regions, --inventory and --save-snapshot"
+        )
+    if args.capacity and (
+        args.lookup
+        or args.port is not None
+        or args.list_vpcs
+        or regions
+        or args.inventory
+        or args.save_snapshot
+    ):
+        parser.error(
+            "--capacity displays VPCs, omit --lookup, --port, --list-vpcs, "
+            "--regions, --all-regions, --inventory and --save-snapshot"
+        )
+    listing = args.list_vpcs or regions
+    selected = args.all or args.vpc_ids or args.inventory
+    if not (listing or selected or args.from_snapshot):
+        parser.error("give a VPC_ID, --all or --list-vpcs")
+    args.sections = SECTIONS
+    if args.only is not None:
+        args.sections = tuple(s for s in SECTIONS if s in args.only)
+    elif args.skip is not None:
+        args.sections = tuple(s for s in SECTIONS if s not in args.skip)
+        if len(args.sections) == 0:
+            parser.error("--skip leaves no sections to display")
+    if args.sections != SECTIONS and args.save_snapshot is not None:
+        parser.error("--save-snapshot saves every section, omit --only/--skip")
+    args.scope = make_scope(args)
+    if args.from_snapshot is not None:
+        if args.subnet or args.az or args.state:
+            parser.error("--from-snapshot can only be scoped with --tag")
+    elif args.scope is not None and not (args.vpc_ids or args.all):
+        parser.error("--subnet, --az, --state and --tag scope VPC trees")
+    if args.scope is not None and args.save_snapshot is not None:
+        parser.error(
+            "--save-snapshot saves every resource, omit --subnet, --az, "
+            "--state and --tag"
+        )
+    if args.diff is not None and (
+        args.lookup
+        or args.port is not None
+        or args.capacity
+        or args.list_vpcs
+        or regions
+        or args.inventory
+        or args.save_snapshot
+        or args.sections != SECTIONS
+        or args.scope is not None
+    ):
+        parser.error(
+            "--diff compares whole VPC trees, omit --lookup, --port, "
+            "--capacity, --list-vpcs, --regions, --all-regions, --inventory, "
+            "--save-snapshot, --only, --skip and scopes"
+        )
+    if args.watch is not None and (
+        len(args.vpc_ids) != 1
+        or args.lookup
+        or args.port is not None
+        or args.capacity
+        or args.diff is not None
+        or args.list_vpcs
+        or args.inventory
+        or args.save_snapshot
+        or args.from_snapshot
+    ):
+        parser.error(
+            "--watch polls one VPC, give a single VPC_ID and omit --lookup, "
+            "--port, --capacity, --diff, --list-vpcs, --inventory, "
+            "--save-snapshot and --from-snapshot"
+        )
+    return args
+
+
+def make_scope(args):
+    """Make the scope of the resources to fetch from the command line
+    arguments, see aws_resources.scope_filters, None if there is none."""
+    scope = {}
+    for key, values in (
+        ("subnet_ids", args.subnet),
+        ("availability_zones", args.az),
+        ("instance_states", args.state),
+    ):
+        if values is not None:
+            scope[key] = values
+    if args.tag is not None:
+        tags = {}
+        for key, value in args.tag:
+            tags.setdefault(key, []).append(value)
+        scope["tags"] = tags
+    return scope or None
+
+
+def positive_int(value):
+    """Convert command line argument to an integer greater than zero."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: '{value}'")
+    return number
+
+
+def positive_float(value):
+    """Convert command line argument to a number greater than zero."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid float value: '{value}'")
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be more than 0: '{value}'")
+    return number
+
+
+def port_number(value):
+    """Convert command line argument to a port number."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if not 0 <= number <= 65535:
+        raise argparse.ArgumentTypeError(
+            f"must be between 0 and 65535: '{value}'"
+        )
+    return number
+
+
+def reachability_source(value):
+    """Convert command line argument to a Security Group Id, CIDR block or
+    IPv4 address, checking CIDR blocks and addresses are valid."""
+    if value.startswith("sg-"):
+        return value
+    try:
+        if "/" in value:
+            parse_cidr(value)
+        else:
+            parse_address(value)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+    return value
+
+
+def section_list(value):
+    """Convert command line argument to a list of tree sections."""
+    sections = [name.strip() for name in value.split(",") if name.strip()]
+    if len(sections) == 0:
+        raise argparse.ArgumentTypeError(f"no sections given: '{value}'")
+    for section in sections:
+        if section not in SECTIONS:
+            raise argparse.ArgumentTypeError(
+                f"invalid section: '{section}' (choose from "
+                f"{', '.join(SECTIONS)})"
+            )
+    return sections
+
+
+def id_list(value):
+    """Convert command line argument to a list of Ids or names."""
+    ids = [name.strip() for name in value.split(",") if name.strip()]
+    if len(ids) == 0:
+        raise argparse.ArgumentTypeError(f"none given: '{value}'")
+    return ids
+
+
+def state_list(value):
+    """Convert command line argument to a list of Instance states."""
+    states = id_list(value)
+    for state in states:
+        if state not in INSTANCE_STATES:
+            raise argparse.ArgumentTypeError(
+                f"invalid state: '{state}' (choose from "
+                f"{', '.join(INSTANCE_STATES)})"
+            )
+    return states
+
+
+def tag_filter(value):
+    """Convert command line argument to a (key, value) tuple."""
+    key, separator, tag_value = value.partition("=")
+    if not separator or not key:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE: '{value}'")
+    return key, tag_value
+
+
+def region_list(value):
+    """Convert command line argument to a list of region names."""
+    region_names = [name.strip() for name in value.split(",") if name.strip()]
+    if len(region_names) == 0:
+        raise argparse.ArgumentTypeError(f"no regions given: '{value}'")
+    return region_names
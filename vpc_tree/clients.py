@@ -0,0 +1,273 @@
+# clients.py
+"""VPC Tree application's registry of shared Boto3 clients.
+
+Creating a Boto3 client loads the service model, resolves the endpoint and
+creates a connection pool, so each client is created once and shared by all
+the functions fetching resources.  Boto3 clients are thread safe once
+created, but sessions are not, so creating clients is done under a lock.
+
+Boto3 is imported when the first client is created, so trees can be
+rendered from a snapshot without Boto3 installed.
+
+Client hooks are functions called with every client as it is created, so
+features such as tracing can register handlers for the client's events.
+"""
+
+import threading
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+
+# Standard mode retries with exponential backoff and jitter, and stops
+# retrying when too many calls are failing rather than adding to the load.
+DEFAULT_RETRIES = {"mode": "standard", "max_attempts": 8}
+
+THROTTLING_ERROR_CODES = frozenset(
+    [
+        "Throttling",
+        "ThrottlingException",
+        "ThrottledException",
+        "RequestThrottledException",
+        "TooManyRequestsException",
+        "ProvisionedThroughputExceededException",
+        "TransactionInProgressException",
+        "RequestLimitExceeded",
+        "BandwidthLimitExceeded",
+        "LimitExceededException",
+        "RequestThrottled",
+        "SlowDown",
+        "PriorRequestNotComplete",
+        "EC2ThrottledException",
+    ]
+)
+
+_client_hooks = []
+
+
+class ClientRegistry:
+    """Creates and shares Boto3 clients keyed by service, region and profile.
+
+    Attributes:
+        region_name: A string containing the default AWS region, None to use
+        the region from the AWS configuration.
+        profile_name: A string containing the default AWS profile, None to use
+        the default profile.
+        max_pool_connections: An integer giving the maximum number of HTTP
+        connections each client keeps open.
+    """
+
+    def __init__(
+        self,
+        region_name=None,
+        profile_name=None,
+        max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+    ):
+        """Initializes instance.
+
+        Args:
+            region_name: A string containing the default AWS region.
+            profile_name: A string containing the default AWS profile.
+            max_pool_connections: An integer giving the maximum number of HTTP
+            connections each client keeps open.
+        """
+        self.region_name = region_name
+        self.profile_name = profile_name
+        self.max_pool_connections = max_pool_connections
+        self._sessions = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get_client(self, service_name, region_name=None, profile_name=None):
+        """Get the shared client for a service.
+
+        Args:
+            service_name: A string containing the name of the AWS service.
+            region_name: A string containing the AWS region, None to use the
+            registry's region.
+            profile_name: A string containing the AWS profile, None to use the
+            registry's profile.
+
+        Returns:
+            A Boto3 client.
+        """
+        region_name = region_name or self.region_name
+        profile_name = profile_name or self.profile_name
+        key = (service_name, region_name, profile_name)
+
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._create_client(*key)
+                    self._clients[key] = client
+
+        return client
+
+    def get_region_name(self, region_name=None, profile_name=None):
+        """Get the region a client would use.
+
+        Args:
+            region_name: A string containing the AWS region, None to use the
+            registry's region.
+            profile_name: A string containing the AWS profile, None to use the
+            registry's profile.
+
+        Returns:
+            A string containing the AWS region, None if no region is set.
+        """
+        region_name = region_name or self.region_name
+        if region_name is not None:
+            return region_name
+
+        with self._lock:
+            session = self._get_session(profile_name or self.profile_name)
+            return session.region_name
+
+    def get_credentials_id(self, profile_name=None):
+        """Identify the credentials a profile's clients sign calls with,
+        without calling AWS.
+
+        An access key belongs to a single AWS account, so results fetched
+        with different accounts' credentials are told apart.
+
+        Args:
+            profile_name: A string containing the AWS profile, None to use the
+            registry's profile.
+
+        Returns:
+            A list containing the profile name and access key Id, the access
+            key Id None when there are no credentials.
+        """
+        profile_name = profile_name or self.profile_name
+        with self._lock:
+            credentials = self._get_session(profile_name).get_credentials()
+        access_key = None if credentials is None else credentials.access_key
+        return [profile_name, access_key]
+
+    def _get_session(self, profile_name):
+        """Get the session for a profile, must be called holding the lock."""
+        session = self._sessions.get(profile_name)
+        if session is None:
+            import boto3
+
+            session = boto3.session.Session(profile_name=profile_name)
+            self._sessions[profile_name] = session
+        return session
+
+    def _create_client(self, service_name, region_name, profile_name):
+        """Create a client, must be called holding the lock."""
+        from botocore.config import Config
+
+        session = self._get_session(profile_name)
+        config = Config(
+            max_pool_connections=self.max_pool_connections,
+            retries=DEFAULT_RETRIES,
+        )
+        client = session.client(
+            service_name, region_name=region_name, config=config
+        )
+        for hook in _client_hooks:
+            hook(client)
+        return client
+
+    def apply_hook(self, hook):
+        """Call a client hook with every client already created.
+
+        Args:
+            hook: A function taking a Boto3 client.
+        """
+        with self._lock:
+            for client in self._clients.values():
+                hook(client)
+
+
+_registry = ClientRegistry()
+
+
+def configure(
+    region_name=None,
+    profile_name=None,
+    max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+):
+    """Replace the shared registry with one using new settings.
+
+    Args:
+        region_name: A string containing the default AWS region.
+        profile_name: A string containing the default AWS profile.
+        max_pool_connections: An integer giving the maximum number of HTTP
+        connections each client keeps open.
+    """
+    global _registry
+    _registry = ClientRegistry(
+        region_name, profile_name, max_pool_connections
+    )
+
+
+def get_registry():
+    """Get the shared ClientRegistry."""
+    return _registry
+
+
+def set_registry(registry):
+    """Replace the shared registry.
+
+    Args:
+        registry: A ClientRegistry, or an object with the same methods such
+        as one handing out stubbed clients.
+    """
+    global _registry
+    _registry = registry
+
+
+def add_client_hook(hook):
+    """Add a function to call with every client the registries create.
+
+    The hook is also called with the clients the shared registry has
+    already created.
+
+    Args:
+        hook: A function taking a Boto3 client.
+    """
+    _client_hooks.append(hook)
+    apply_hook = getattr(_registry, "apply_hook", None)
+    if apply_hook is not None:
+        apply_hook(hook)
+
+
+def remove_client_hook(hook):
+    """Stop calling a client hook with new clients.
+
+    Args:
+        hook: A function added by add_client_hook.
+    """
+    _client_hooks.remove(hook)
+
+
+def is_throttling_response(response):
+    """Check whether a botocore needs-retry response was throttled.
+
+    Args:
+        response: The response passed to botocore's needs-retry event, a
+        tuple of the HTTP response and parsed response, or None.
+
+    Returns:
+        True if the parsed response has a throttling error code.
+    """
+    if response is None:
+        return False
+    code = response[1].get("Error", {}).get("Code")
+    return code in THROTTLING_ERROR_CODES
+
+
+def get_client(service_name, region_name=None):
+    """Get a client from the shared registry.
+
+    Args:
+        service_name: A string containing the name of the AWS service.
+        region_name: A string containing the AWS region, None to use the
+        registry's region.
+
+    Returns:
+        A Boto3 client.
+    """
+    return _registry.get_client(service_name, region_name)
@@ -0,0 +1,644 @@
+# fetch.py
+"""VPC Tree application's functionality to fetch all the resources in a
+Virtual Private Cloud concurrently.
+
+The Boto3 calls needed to describe a Virtual Private Cloud are mostly
+independent of each other, so they are submitted to a bounded thread pool.
+The two real dependencies are respected by submitting the dependent task
+after the tasks it needs and waiting on their futures...
+- Target Groups need the ARNs of the Load Balancers in the VPC.
+- Auto Scaling Groups are filtered by the Ids of the Subnets in the VPC.
+
+Target Groups can be fetched in two ways...
+- TARGET_GROUPS_BY_REGION fetches every Target Group in the region with one
+  paginated call, at the same time as the Load Balancers, then joins them to
+  the Load Balancers with an index on their ARNs.
+- TARGET_GROUPS_BY_LOAD_BALANCER makes one paginated call for each Load
+  Balancer in the VPC after the Load Balancers have been fetched.
+
+The thread pool takes tasks in the order they were submitted, so by the time
+a dependent task starts the tasks it waits on have already started. This
+means the fetch can not deadlock, even with a single worker.
+
+Several Virtual Private Clouds are fetched together.  The region wide Load
+Balancers, Auto Scaling Groups and Target Groups are fetched once, and the
+Security Groups, Subnets and Instances with filters covering every Virtual
+Private Cloud.  Each resource type is then grouped by Virtual Private Cloud
+in a single pass.
+
+Only the resources needed by the sections of the tree being displayed are
+fetched, see plan_fetch.  Auto Scaling Groups still need the Subnets and
+Target Groups the Load Balancers, even when those sections are not shown.
+
+A scope, see aws_resources.scope_filters, narrows the Security Groups,
+Subnets and Instances fetched with EC2 Filters applied by AWS.
+
+Every resource is projected onto the compact classes in model as the last
+step of fetching it, so the Boto3 dictionaries are not kept.
+
+Listing the Virtual Private Clouds in several regions uses the same bounded
+thread pool, one paginated call per region, yielding each region as soon as
+it completes.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from . import aws_resources, model
+from .model import MODEL_CLASSES
+
+DEFAULT_MAX_WORKERS = 6
+
+TARGET_GROUPS_BY_REGION = "region"
+TARGET_GROUPS_BY_LOAD_BALANCER = "load-balancer"
+TARGET_GROUP_MODES = (TARGET_GROUPS_BY_REGION, TARGET_GROUPS_BY_LOAD_BALANCER)
+
+# The sections of a tree, in the order they are displayed.
+SECTIONS = ("sgs", "subnets", "lbs", "asgs", "tgs")
+
+# The VPCResources attributes displayed by each section.
+SECTION_RESOURCES = {
+    "sgs": ("security_groups",),
+    "subnets": ("subnets", "instances"),
+    "lbs": ("load_balancers",),
+    "asgs": ("auto_scaling_groups",),
+    "tgs": ("target_groups",),
+}
+
+# The VPCResources attributes each attribute is derived from.
+RESOURCE_DEPENDENCIES = {
+    "auto_scaling_groups": ("subnets",),
+    "target_groups": ("load_balancers",),
+}
+
+RESOURCE_NAMES = (
+    "security_groups",
+    "subnets",
+    "instances",
+    "load_balancers",
+    "auto_scaling_groups",
+    "target_groups",
+)
+
+# The VPCResources attributes fetched with EC2 describe operations that can
+# be scoped, the aws_resources function fetching them and the operation.
+_SCOPED_FUNCTIONS = (
+    ("security_groups", "get_security_groups", "describe_security_groups"),
+    ("subnets", "get_subnets", "describe_subnets"),
+    ("instances", "get_instances", "describe_instances"),
+)
+
+
+class VPCResources:
+    """The AWS resources linked to a Virtual Private Cloud.
+
+    Attributes:
+        vpc: A model.VPC instance.
+        security_groups: A list of model.SecurityGroup instances.
+        subnets: A list of model.Subnet instances.
+        instances: A list of model.Instance instances.
+        load_balancers: A list of model.LoadBalancer instances in the Virtual
+        Private Cloud.
+        auto_scaling_groups: A list of model.AutoScalingGroup instances in the
+        Virtual Private Cloud's Subnets.
+        target_groups: A list of model.TargetGroup instances linked to the
+        Load Balancers.
+
+    Resources that were not fetched, because no section displaying them was
+    selected, are None.
+    """
+
+    def __init__(
+        self,
+        vpc,
+        security_groups,
+        subnets,
+        instances,
+        load_balancers,
+        auto_scaling_groups,
+        target_groups,
+    ):
+        """Initializes instance."""
+        self.vpc = vpc
+        self.security_groups = security_groups
+        self.subnets = subnets
+        self.instances = instances
+        self.load_balancers = load_balancers
+        self.auto_scaling_groups = auto_scaling_groups
+        self.target_groups = target_groups
+
+
+class PendingVPCResources:
+    """The AWS resources linked to a Virtual Private Cloud while they are
+    still being fetched.
+
+    Has the same attributes as VPCResources.  Reading an attribute waits
+    for that resource to be fetched, so a tree can be rendered section by
+    section as the resources arrive.
+    """
+
+    def __init__(self, futures):
+        """Initializes instance.
+
+        Args:
+            futures: A dictionary mapping the VPCResources attribute names to
+            Futures, as returned by submit_vpc_resources.
+        """
+        self._futures = futures
+
+    def __getattr__(self, name):
+        """Wait for and return the resources fetched for attribute name."""
+        try:
+            future = self.__dict__["_futures"][name]
+        except KeyError:
+            raise AttributeError(name)
+        return future.result()
+
+    def result(self):
+        """Wait for every resource and return them as a VPCResources."""
+        resources = dict.fromkeys(RESOURCE_NAMES)
+        for name, future in self._futures.items():
+            resources[name] = future.result()
+        return VPCResources(**resources)
+
+
+@contextmanager
+def fetching_vpc_resources(
+    vpc_id,
+    max_workers=DEFAULT_MAX_WORKERS,
+    target_group_mode=TARGET_GROUPS_BY_REGION,
+    sections=SECTIONS,
+    scope=None,
+):
+    """Context manager fetching all the resources in a Virtual Private Cloud
+    in the background.
+
+    Args:
+        vpc_id: A string containing the Virtual Private Cloud Id.
+        max_workers: An integer giving the maximum number of Boto3 calls to
+        make at the same time.  1 fetches the resources one after another.
+        target_group_mode: One of TARGET_GROUP_MODES selecting how Target
+        Groups are fetched.
+        sections: A collection of SECTIONS to fetch the resources of.
+        scope: A dictionary scoping the resources fetched, see
+        aws_resources.scope_filters, None to fetch all of them.
+
+    Yields:
+        A PendingVPCResources instance.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        yield PendingVPCResources(
+            submit_vpc_resources(
+                executor, vpc_id, target_group_mode, sections, scope
+            )
+        )
+    except BaseException:
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+
+
+def fetch_vpc_resources(
+    vpc_id,
+    max_workers=DEFAULT_MAX_WORKERS,
+    target_group_mode=TARGET_GROUPS_BY_REGION,
+    sections=SECTIONS,
+    scope=None,
+):
+    """Fetch all the resources in a Virtual Private Cloud.
+
+    Args:
+        vpc_id: A string containing the Virtual Private Cloud Id.
+        max_workers: An integer giving the maximum number of Boto3 calls to
+        make at the same time.  1 fetches the resources one after another.
+        target_group_mode: One of TARGET_GROUP_MODES selecting how Target
+        Groups are fetched.
+        sections: A collection of SECTIONS to fetch the resources of.
+        scope: A dictionary scoping the resources fetched, see
+        aws_resources.scope_filters, None to fetch all of them.
+
+    Returns:
+        A VPCResources instance.
+    """
+    with fetching_vpc_resources(
+        vpc_id, max_workers, target_group_mode, sections, scope
+    ) as resources:
+        return resources.result()
+
+
+@contextmanager
+def fetching_vpcs_resources(
+    vpc_ids=None,
+    max_workers=DEFAULT_MAX_WORKERS,
+    target_group_mode=TARGET_GROUPS_BY_REGION,
+    region_name=None,
+    sections=SECTIONS,
+    scope=None,
+):
+    """Context manager fetching all the resources in several Virtual Private
+    Clouds in the background.
+
+    Args:
+        vpc_ids: A list of strings containing the Virtual Private Cloud Ids,
+        None to fetch every Virtual Private Cloud in the region.
+        max_workers: An integer giving the maximum number of Boto3 calls to
+        make at the same time.  1 fetches the resources one after another.
+        target_group_mode: One of TARGET_GROUP_MODES selecting how Target
+        Groups are fetched.
+        region_name: A string containing the AWS region, None to use the
+        default region.
+        sections: A collection of SECTIONS to fetch the resources of.
+        scope: A dictionary scoping the resources fetched, see
+        aws_resources.scope_filters, None to fetch all of them.
+
+    Yields:
+        An iterator of PendingVPCResources instances, one for each Virtual
+        Private Cloud in the order of vpc_ids.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        yield iter_pending_vpcs(
+            submit_vpcs_resources(
+                executor,
+                vpc_ids,
+                target_group_mode,
+                region_name,
+                sections,
+                scope,
+            ),
+            vpc_ids,
+        )
+    except BaseException:
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+
+
+def iter_region_vpcs(region_names, max_workers=DEFAULT_MAX_WORKERS):
+    """Fetch the Virtual Private Clouds in several regions concurrently.
+
+    Args:
+        region_names: A list of strings containing the AWS regions.
+        max_workers: An integer giving the maximum number of regions to fetch
+        at the same time.
+
+    Yields:
+        Tuples of the region name, a list of dictionaries containing its
+        Virtual Private Clouds and None, or the region name, None and the
+        exception raised fetching them, in the order the regions complete.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(aws_resources.get_vpcs, region_name): region_name
+            for region_name in region_names
+        }
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is None:
+                yield futures[future], future.result(), None
+            else:
+                yield futures[future], None, error
+    except BaseException:
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+
+
+def plan_fetch(sections=SECTIONS):
+    """Plan which resources to fetch to display sections of a tree.
+
+    Args:
+        sections: A collection of SECTIONS to display.
+
+    Returns:
+        A frozenset of the VPCResources attribute names the sections display
+        and the attributes they are derived from.
+
+    Raises:
+        ValueError: One of the sections is not in SECTIONS.
+    """
+    planned = set()
+    needed = []
+    for section in sections:
+        if section not in SECTION_RESOURCES:
+            raise ValueError(f"{section} is not a section")
+        needed.extend(SECTION_RESOURCES[section])
+
+    while needed:
+        name = needed.pop()
+        if name not in planned:
+            planned.add(name)
+            needed.extend(RESOURCE_DEPENDENCIES.get(name, ()))
+
+    return frozenset(planned)
+
+
+def submit_vpc_resources(
+    executor,
+    vpc_id,
+    target_group_mode=TARGET_GROUPS_BY_REGION,
+    sections=SECTIONS,
+    scope=None,
+):
+    """Submit the tasks to fetch the resources in a Virtual Private Cloud.
+
+    Args:
+        executor: A concurrent.futures.Executor to submit the tasks to.
+        vpc_id: A string containing the Virtual Private Cloud Id.
+        target_group_mode: One of TARGET_GROUP_MODES selecting how Target
+        Groups are fetched.
+        sections: A collection of SECTIONS to fetch the resources of.
+        scope: A dictionary scoping the resources fetched, see
+        aws_resources.scope_filters, None to fetch all of them.
+
+    Returns:
+        A dictionary mapping "vpc" and the VPCResources attribute names in
+        plan_fetch(sections) to Futures.
+    """
+    plan = plan_fetch(sections)
+    resources = {}
+    vpc = executor.submit(aws_resources.get_vpc, vpc_id)
+    for name, function, operation_name in _SCOPED_FUNCTIONS:
+        if name in plan:
+            resources[name] = executor.submit(
+                getattr(aws_resources, function),
+                vpc_id,
+                _scope_filters(operation_name, scope),
+            )
+    if "load_balancers" in plan:
+        all_load_balancers = executor.submit(aws_resources.get_load_balancers)
+    if "auto_scaling_groups" in plan:
+        all_auto_scaling_groups = executor.submit(
+            aws_resources.get_auto_scaling_groups
+        )
+    by_region = target_group_mode == TARGET_GROUPS_BY_REGION
+    if "target_groups" in plan and by_region:
+        all_target_groups = executor.submit(
+            aws_resources.get_all_target_groups
+        )
+
+    if "load_balancers" in plan:
+        resources["load_balancers"] = executor.submit(
+            _filter_load_balancers, all_load_balancers, vpc_id
+        )
+    if "auto_scaling_groups" in plan:
+        resources["auto_scaling_groups"] = executor.submit(
+            _filter_auto_scaling_groups,
+            all_auto_scaling_groups,
+            resources["subnets"],
+            vpc_id,
+        )
+    if "target_groups" in plan and by_region:
+        resources["target_groups"] = executor.submit(
+            _join_target_groups, all_target_groups, resources["load_balancers"]
+        )
+    elif "target_groups" in plan:
+        resources["target_groups"] = executor.submit(
+            _get_target_groups, resources["load_balancers"]
+        )
+
+    projected = {"vpc": executor.submit(_project_one, model.VPC, vpc)}
+    for name, future in resources.items():
+        projected[name] = executor.submit(
+            _project, MODEL_CLASSES[name], future
+        )
+    return projected
+
+
+def submit_vpcs_resources(
+    executor,
+    vpc_ids=None,
+    target_group_mode=TARGET_GROUPS_BY_REGION,
+    region_name=None,
+    sections=SECTIONS,
+    scope=None,
+):
+    """Submit the tasks to fetch the resources in several Virtual Private
+    Clouds.
+
+    Args:
+        executor: A concurrent.futures.Executor to submit the tasks to.
+        vpc_ids: A list of strings containing the Virtual Private Cloud Ids,
+        None to fetch every Virtual Private Cloud in the region.
+        target_group_mode: One of TARGET_GROUP_MODES selecting how Target
+        Groups are fetched.
+        region_name: A string containing the AWS region, None to use the
+        default region.
+        sections: A collection of SECTIONS to fetch the resources of.
+        scope: A dictionary scoping the resources fetched, see
+        aws_resources.scope_filters, None to fetch all of them.
+
+    Returns:
+        A dictionary mapping "vpcs" to a Future of the list of Virtual
+        Private Clouds, and the VPCResources attribute names in
+        plan_fetch(sections) to Futures of dictionaries mapping Virtual
+        Private Cloud Ids to resources.
+    """
+    plan = plan_fetch(sections)
+    fetched = {}
+    vpcs = executor.submit(aws_resources.get_vpcs, region_name, vpc_ids)
+    for name, function, operation_name in _SCOPED_FUNCTIONS:
+        if name in plan:
+            fetched[name] = executor.submit(
+                getattr(aws_resources, f"{function}_in_vpcs"),
+                vpc_ids,
+                region_name,
+                _scope_filters(operation_name, scope),
+            )
+    if "load_balancers" in plan:
+        all_load_balancers = executor.submit(
+            aws_resources.get_load_balancers, region_name
+        )
+    if "auto_scaling_groups" in plan:
+        all_auto_scaling_groups = executor.submit(
+            aws_resources.get_auto_scaling_groups, region_name
+        )
+    by_region = target_group_mode == TARGET_GROUPS_BY_REGION
+    if "target_groups" in plan and by_region:
+        all_target_groups = executor.submit(
+            aws_resources.get_all_target_groups, region_name
+        )
+
+    grouped = {
+        name: executor.submit(_group, future)
+        for name, future in fetched.items()
+    }
+    if "load_balancers" in plan:
+        grouped["load_balancers"] = executor.submit(
+            _group_load_balancers, all_load_balancers
+        )
+    if "auto_scaling_groups" in plan:
+        grouped["auto_scaling_groups"] = executor.submit(
+            _group_auto_scaling_groups,
+            all_auto_scaling_groups,
+            fetched["subnets"],
+        )
+    if "target_groups" in plan and by_region:
+        grouped["target_groups"] = executor.submit(
+            _group_target_groups, all_target_groups, grouped["load_balancers"]
+        )
+    elif "target_groups" in plan:
+        grouped["target_groups"] = executor.submit(
+            _get_grouped_target_groups, grouped["load_balancers"], region_name
+        )
+
+    projected = {"vpcs": executor.submit(_project, model.VPC, vpcs)}
+    for name, future in grouped.items():
+        projected[name] = executor.submit(
+            _project_grouped, MODEL_CLASSES[name], future
+        )
+    return projected
+
+
+class _VPCPart:
+    """The resources belonging to one Virtual Private Cloud in a Future of
+    resources grouped by Virtual Private Cloud."""
+
+    def __init__(self, future, vpc_id):
+        """Initializes instance."""
+        self._future = future
+        self._vpc_id = vpc_id
+
+    def result(self):
+        """Wait for the grouped resources and return this VPC's."""
+        return self._future.result().get(self._vpc_id, [])
+
+
+def iter_pending_vpcs(futures, vpc_ids=None):
+    """Split the Futures from submit_vpcs_resources into a
+    PendingVPCResources for each Virtual Private Cloud.
+
+    Args:
+        futures: A dictionary returned by submit_vpcs_resources.
+        vpc_ids: The list of Virtual Private Cloud Ids passed to
+        submit_vpcs_resources, giving the order to yield them in, None to
+        yield them in the order AWS returned them.
+
+    Yields:
+        PendingVPCResources instances.
+    """
+    vpcs = futures["vpcs"].result()
+    if vpc_ids is not None:
+        order = {vpc_id: i for i, vpc_id in enumerate(vpc_ids)}
+        vpcs = sorted(vpcs, key=lambda vpc: order[vpc.vpc_id])
+
+    for vpc in vpcs:
+        vpc_future = Future()
+        vpc_future.set_result(vpc)
+        vpc_futures = {"vpc": vpc_future}
+        for name, future in futures.items():
+            if name != "vpcs":
+                vpc_futures[name] = _VPCPart(future, vpc.vpc_id)
+        yield PendingVPCResources(vpc_futures)
+
+
+def _scope_filters(operation_name, scope):
+    """Get the EC2 Filters scoping an operation, None without a scope."""
+    if scope is None:
+        return None
+    return aws_resources.scope_filters(operation_name, scope)
+
+
+def _project_one(model_class, resource):
+    """Project the result of resource onto model_class."""
+    return model_class.from_boto3(resource.result())
+
+
+def _project(model_class, resources):
+    """Project the result of resources onto model_class."""
+    return model.project(model_class, resources.result())
+
+
+def _project_grouped(model_class, grouped_resources):
+    """Project the result of grouped_resources, a dictionary mapping Virtual
+    Private Cloud Ids to resources, onto model_class."""
+    return {
+        vpc_id: model.project(model_class, resources)
+        for vpc_id, resources in grouped_resources.result().items()
+    }
+
+
+def _group(resources):
+    """Group the result of resources by Virtual Private Cloud."""
+    return aws_resources.group_by_vpc(resources.result())
+
+
+def _group_load_balancers(all_load_balancers):
+    """Group the result of all_load_balancers by Virtual Private Cloud."""
+    return aws_resources.index_load_balancers_by_vpc(
+        all_load_balancers.result()
+    )
+
+
+def _group_auto_scaling_groups(all_auto_scaling_groups, subnets):
+    """Group the result of all_auto_scaling_groups by the Virtual Private
+    Clouds of the result of subnets."""
+    return aws_resources.group_auto_scaling_groups_by_vpc(
+        all_auto_scaling_groups.result(),
+        aws_resources.index_subnet_vpcs(subnets.result()),
+    )
+
+
+def _group_target_groups(all_target_groups, load_balancers):
+    """Join the result of all_target_groups to the result of load_balancers,
+    grouped by Virtual Private Cloud."""
+    index = aws_resources.index_target_groups_by_load_balancer(
+        all_target_groups.result()
+    )
+    return {
+        vpc_id: aws_resources.get_indexed_target_groups(
+            index, aws_resources.get_load_balancer_arns(vpc_load_balancers)
+        )
+        for vpc_id, vpc_load_balancers in load_balancers.result().items()
+    }
+
+
+def _get_grouped_target_groups(load_balancers, region_name):
+    """Get the Target Groups linked to the result of load_balancers, grouped
+    by Virtual Private Cloud."""
+    return {
+        vpc_id: aws_resources.get_target_groups(
+            aws_resources.get_load_balancer_arns(vpc_load_balancers),
+            region_name,
+        )
+        for vpc_id, vpc_load_balancers in load_balancers.result().items()
+    }
+
+
+def _filter_load_balancers(all_load_balancers, vpc_id):
+    """Filter the result of all_load_balancers by vpc_id."""
+    index = aws_resources.index_load_balancers_by_vpc(
+        all_load_balancers.result()
+    )
+    return index.get(vpc_id, [])
+
+
+def _filter_auto_scaling_groups(all_auto_scaling_groups, subnets, vpc_id):
+    """Filter the result of all_auto_scaling_groups by the result of
+    subnets."""
+    index = aws_resources.group_auto_scaling_groups_by_vpc(
+        all_auto_scaling_groups.result(),
+        aws_resources.index_subnet_vpcs(subnets.result()),
+    )
+    return index.get(vpc_id, [])
+
+
+def _get_target_groups(load_balancers):
+    """Get the Target Groups linked to the result of load_balancers."""
+    load_balancer_arns = aws_resources.get_load_balancer_arns(
+        load_balancers.result()
+    )
+    return aws_resources.get_target_groups(load_balancer_arns)
+
+
+def _join_target_groups(all_target_groups, load_balancers):
+    """Join the result of all_target_groups to the result of load_balancers."""
+    index = aws_resources.index_target_groups_by_load_balancer(
+        all_target_groups.result()
+    )
+    load_balancer_arns = aws_resources.get_load_balancer_arns(
+        load_balancers.result()
+    )
+    return aws_resources.get_indexed_target_groups(index, load_balancer_arns)
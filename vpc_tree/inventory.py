@@ -0,0 +1,181 @@
+# inventory.py
+"""VPC Tree application's account wide inventory of Virtual Private Clouds.
+
+Every Virtual Private Cloud in every region is fetched on a bounded thread
+pool, each region as in fetch.fetching_vpcs_resources, and written as a tree
+to its own file in an output directory...
+    <output_dir>/<region>/<vpc_id>.txt
+    <output_dir>/manifest.json
+
+Generating the tree of a large Virtual Private Cloud is CPU bound, so the
+trees are generated on a pool of processes, starting as soon as each
+region's resources have been fetched.  The processes are started with the
+spawn method because the fetching threads are already running when they
+start.
+
+The manifest records how long each region took to fetch and how many lines
+each tree has and how long it took to generate.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from datetime import datetime, timezone
+
+from . import __version__, fetch
+from .fetch import DEFAULT_MAX_WORKERS, SECTIONS, TARGET_GROUPS_BY_REGION
+from .vpc_tree import VPCTree
+
+MANIFEST_NAME = "manifest.json"
+
+
+def write_inventory(
+    output_dir,
+    region_names,
+    max_workers=DEFAULT_MAX_WORKERS,
+    processes=None,
+    target_group_mode=TARGET_GROUPS_BY_REGION,
+    sections=SECTIONS,
+):
+    """Write a tree file for every Virtual Private Cloud in several regions.
+
+    A region that can not be fetched, or a Virtual Private Cloud whose tree
+    can not be written, is recorded in the manifest's errors, by region or
+    by "<region>/<vpc_id>", without stopping the others.
+
+    Args:
+        output_dir: A string containing the path of the directory to write
+        the tree files and manifest to.
+        region_names: A list of strings containing the AWS regions.
+        max_workers: An integer giving the maximum number of Boto3 calls to
+        make at the same time.
+        processes: An integer giving the number of processes generating
+        trees, None to use one per CPU.
+        target_group_mode: One of fetch.TARGET_GROUP_MODES selecting how
+        Target Groups are fetched.
+        sections: A collection of fetch.SECTIONS to write, only their
+        resources are fetched.
+
+    Returns:
+        A dictionary containing the manifest.
+    """
+    start = time.perf_counter()
+    manifest = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "vpc_tree_version": __version__,
+        "regions": {},
+        "vpcs": [],
+        "errors": {},
+    }
+    os.makedirs(output_dir, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as renderers:
+            fetched = {}
+            for region_name in region_names:
+                futures = fetch.submit_vpcs_resources(
+                    executor, None, target_group_mode, region_name, sections
+                )
+                region = executor.submit(_collect_region, futures, start)
+                fetched[region] = region_name
+
+            rendered = {}
+            for region in as_completed(fetched):
+                region_name = fetched[region]
+                try:
+                    vpcs_resources, fetch_seconds = region.result()
+                except Exception as error:
+                    manifest["errors"][region_name] = str(error)
+                    continue
+
+                manifest["regions"][region_name] = {
+                    "vpcs": len(vpcs_resources),
+                    "fetch_seconds": fetch_seconds,
+                }
+                os.makedirs(
+                    os.path.join(output_dir, region_name), exist_ok=True
+                )
+                for resources in vpcs_resources:
+                    file_name = os.path.join(
+                        region_name, f"{resources.vpc.vpc_id}.txt"
+                    )
+                    render = renderers.submit(
+                        render_vpc_file,
+                        os.path.join(output_dir, file_name),
+                        resources,
+                        sections,
+                    )
+                    rendered[render] = (
+                        region_name,
+                        resources.vpc.vpc_id,
+                        file_name,
+                    )
+
+            for render in as_completed(rendered):
+                region_name, vpc_id, file_name = rendered[render]
+                try:
+                    result = render.result()
+                except Exception as error:
+                    manifest["errors"][f"{region_name}/{vpc_id}"] = str(error)
+                    continue
+
+                manifest["vpcs"].append(
+                    {
+                        "region": region_name,
+                        "vpc_id": vpc_id,
+                        "file": file_name,
+                        **result,
+                    }
+                )
+
+    manifest["vpcs"].sort(key=lambda x: (x["region"], x["vpc_id"]))
+    manifest["seconds"] = time.perf_counter() - start
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as file:
+        json.dump(manifest, file, indent=2)
+
+    return manifest
+
+
+def render_vpc_file(path, resources, sections=SECTIONS):
+    """Write the tree of a Virtual Private Cloud to a file.
+
+    Runs in the process pool, so must be importable at module level.
+
+    Args:
+        path: A string containing the path of the file to write.
+        resources: A VPCResources instance containing the Virtual Private
+        Cloud and the resources linked to it.
+        sections: A collection of fetch.SECTIONS to write.
+
+    Returns:
+        A dictionary containing the number of lines written and the seconds
+        taken to generate them.
+    """
+    start = time.perf_counter()
+    lines = 0
+    with open(path, "w") as file:
+        for line in VPCTree().iter_vpc_lines(resources, sections):
+            file.write(line)
+            file.write("\n")
+            lines += 1
+
+    return {"lines": lines, "render_seconds": time.perf_counter() - start}
+
+
+def _collect_region(futures, start):
+    """Wait for the Futures from fetch.submit_vpcs_resources, returning the
+    VPCResources of the region and the seconds from start until the last
+    of its resources was fetched."""
+    vpcs_resources = [
+        pending.result() for pending in fetch.iter_pending_vpcs(futures)
+    ]
+    return vpcs_resources, time.perf_counter() - start
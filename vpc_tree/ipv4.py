@@ -0,0 +1,152 @@
+# ipv4.py
+"""Helper functions to work with the IPv4 addresses and CIDR blocks in the
+data structures returned by Boto3."""
+
+
+def address_to_int(address):
+    """Convert an IPv4 address to an integer.
+
+    Sorting addresses by this integer puts them in numeric order, where
+    sorting the strings puts "10.0.0.10" before "10.0.0.9".
+
+    Args:
+        address: A string containing an IPv4 address in dotted decimal.
+
+    Returns:
+        An integer between 0 and 2**32 - 1.
+    """
+    a, b, c, d = address.split(".")
+    return (int(a) << 24) | (int(b) << 16) | (int(c) << 8) | int(d)
+
+
+def parse_address(text):
+    """Convert an IPv4 address to an integer, checking it is valid.
+
+    Args:
+        text: A string containing an IPv4 address in dotted decimal.
+
+    Returns:
+        An integer between 0 and 2**32 - 1.
+
+    Raises:
+        ValueError: text is not an IPv4 address.
+    """
+    parts = text.split(".")
+    if len(parts) != 4:
+        raise ValueError(f"invalid IPv4 address: '{text}'")
+    address = 0
+    for part in parts:
+        if not part.isdigit() or len(part) > 3 or int(part) > 255:
+            raise ValueError(f"invalid IPv4 address: '{text}'")
+        address = (address << 8) | int(part)
+    return address
+
+
+def parse_cidr(cidr_block):
+    """Convert an IPv4 CIDR block to its network address and prefix length.
+
+    Args:
+        cidr_block: A string containing an IPv4 CIDR block, such as
+        "10.0.1.0/24".
+
+    Returns:
+        A tuple of the network address as an integer, with any host bits
+        cleared, and the prefix length as an integer.
+
+    Raises:
+        ValueError: cidr_block is not an IPv4 CIDR block.
+    """
+    address, separator, prefix_length = cidr_block.partition("/")
+    if not separator or not prefix_length.isdigit():
+        raise ValueError(f"invalid IPv4 CIDR block: '{cidr_block}'")
+    prefix_length = int(prefix_length)
+    if prefix_length > 32:
+        raise ValueError(f"invalid IPv4 CIDR block: '{cidr_block}'")
+    mask = (0xFFFFFFFF << (32 - prefix_length)) & 0xFFFFFFFF
+    return parse_address(address) & mask, prefix_length
+
+
+def int_to_address(address):
+    """Convert an integer to an IPv4 address.
+
+    Args:
+        address: An integer between 0 and 2**32 - 1.
+
+    Returns:
+        A string containing the address in dotted decimal.
+    """
+    return (
+        f"{address >> 24}.{(address >> 16) & 255}."
+        f"{(address >> 8) & 255}.{address & 255}"
+    )
+
+
+def cidr_range(cidr_block):
+    """Get the first and last address of an IPv4 CIDR block.
+
+    Args:
+        cidr_block: A string containing an IPv4 CIDR block.
+
+    Returns:
+        A tuple of the first and last addresses as integers.
+
+    Raises:
+        ValueError: cidr_block is not an IPv4 CIDR block.
+    """
+    network, prefix_length = parse_cidr(cidr_block)
+    return network, network | (0xFFFFFFFF >> prefix_length)
+
+
+def range_to_cidr_blocks(first, last):
+    """Split a range of IPv4 addresses into the fewest CIDR blocks.
+
+    Each block is the largest aligned block starting at the first address
+    not yet covered, so a range needs at most 62 blocks.
+
+    Args:
+        first: An integer giving the first address of the range.
+        last: An integer giving the last address of the range.
+
+    Returns:
+        A list of strings containing IPv4 CIDR blocks, in address order.
+    """
+    blocks = []
+    while first <= last:
+        size = first & -first if first else 1 << 32
+        while size > last - first + 1:
+            size >>= 1
+        blocks.append(f"{int_to_address(first)}/{33 - size.bit_length()}")
+        first += size
+    return blocks
+
+
+def free_cidr_blocks(cidr_block, allocated_blocks):
+    """Find the CIDR blocks in a CIDR block not covered by allocated blocks.
+
+    The allocated blocks are sorted and swept once, so the time taken
+    depends on the number of blocks, not the number of addresses.
+
+    Args:
+        cidr_block: A string containing an IPv4 CIDR block.
+        allocated_blocks: An iterable of strings containing IPv4 CIDR
+        blocks, those outside cidr_block are ignored.
+
+    Returns:
+        A list of strings containing the free IPv4 CIDR blocks, in address
+        order.
+
+    Raises:
+        ValueError: One of the blocks is not an IPv4 CIDR block.
+    """
+    first, last = cidr_range(cidr_block)
+    free = []
+    cursor = first
+    for start, end in sorted(map(cidr_range, allocated_blocks)):
+        if start > last:
+            break
+        if start > cursor:
+            free += range_to_cidr_blocks(cursor, start - 1)
+        cursor = max(cursor, end + 1)
+    if cursor <= last:
+        free += range_to_cidr_blocks(cursor, last)
+    return free
@@ -0,0 +1,100 @@
+# ipv4_batch.py
+"""VPC Tree application's batch operations on many IPv4 addresses at once.
+
+Addresses are packed into integers once, then matched against CIDR blocks
+in one pass.  NumPy is used when it is installed, holding the
+addresses in uint32 arrays and finding the CIDR block containing each with
+searchsorted over the sorted network addresses.  Without NumPy the same
+algorithm runs on lists with the bisect module, giving identical results.
+"""
+
+from bisect import bisect_right
+
+from .ipv4 import address_to_int, parse_cidr
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+HAVE_NUMPY = numpy is not None
+
+
+def _numpy(use_numpy):
+    """Check whether to use NumPy, raising ImportError if asked to when it
+    is not installed."""
+    if use_numpy is None:
+        return HAVE_NUMPY
+    if use_numpy and not HAVE_NUMPY:
+        raise ImportError("NumPy is not installed")
+    return use_numpy
+
+
+def pack_addresses(addresses):
+    """Convert IPv4 addresses to integers.
+
+    Args:
+        addresses: An iterable of strings containing IPv4 addresses in
+        dotted decimal.
+
+    Returns:
+        A list of integers between 0 and 2**32 - 1.
+    """
+    return [address_to_int(address) for address in addresses]
+
+
+def contained_in(addresses, cidr_blocks, use_numpy=None):
+    """Find the CIDR block containing each of many IPv4 addresses.
+
+    The CIDR blocks must not overlap, as the CIDR blocks of the Subnets in
+    a Virtual Private Cloud never do.
+
+    Args:
+        addresses: A list of integers containing IPv4 addresses, see
+        pack_addresses.
+        cidr_blocks: A list of strings containing IPv4 CIDR blocks.
+        use_numpy: True to use NumPy, False to not, None to use it when it
+        is installed.
+
+    Returns:
+        A list giving the index into cidr_blocks of the block containing each
+        address, -1 for addresses outside every block.
+
+    Raises:
+        ValueError: One of cidr_blocks is not an IPv4 CIDR block.
+    """
+    networks = []
+    lasts = []
+    for cidr_block in cidr_blocks:
+        network, prefix_length = parse_cidr(cidr_block)
+        networks.append(network)
+        lasts.append(network | (0xFFFFFFFF >> prefix_length))
+    order = sorted(range(len(networks)), key=networks.__getitem__)
+    starts = [networks[i] for i in order]
+    ends = [lasts[i] for i in order]
+
+    if _numpy(use_numpy):
+        return _numpy_contained_in(addresses, starts, ends, order)
+
+    found = []
+    for address in addresses:
+        i = bisect_right(starts, address) - 1
+        found.append(order[i] if i >= 0 and address <= ends[i] else -1)
+    return found
+
+
+def _numpy_contained_in(addresses, starts, ends, order):
+    """Find the CIDR block containing each address with NumPy."""
+    addresses = numpy.array(addresses, dtype=numpy.uint32)
+    starts = numpy.array(starts, dtype=numpy.uint32)
+    ends = numpy.array(ends, dtype=numpy.uint32)
+    order = numpy.array(order, dtype=numpy.int64)
+
+    found = numpy.full(len(addresses), -1, dtype=numpy.int64)
+    if len(starts) == 0:
+        return found.tolist()
+    i = numpy.searchsorted(starts, addresses, side="right") - 1
+    inside = i >= 0
+    inside[inside] = addresses[inside] <= ends[i[inside]]
+    found[inside] = order[i[inside]]
+    return found.tolist()
@@ -1,26 +1,30 @@
 # lb_tree.py
 """VPC Tree application's Load Balancer functionality."""
 
+from operator import attrgetter
+
 from .prefix import get_prefix
-from .text_tree import add_node, add_tree
+from .text_tree import cache_item_function, iter_node, iter_tree
 
 
 class LBTree:
     """Generates a text tree representation of AWS Load Balancers.
 
     Attributes:
-        load_balancers: A list of dictionaries containing Load Balancers from
-        Boto3.
+        load_balancers: A list of model.LoadBalancer instances.
+        render_cache: A text_tree.RenderCache reusing the lines of unchanged
+        Load Balancers, None to generate every line.
     """
 
-    def __init__(self, load_balancers):
+    def __init__(self, load_balancers, render_cache=None):
         """Initializes instance.
 
         Args:
-            load_balancers: A list of dictionaries containing Load Balancers
-            from Boto3.
+            load_balancers: A list of model.LoadBalancer instances.
+            render_cache: A text_tree.RenderCache, None to not cache lines.
         """
         self.load_balancers = load_balancers
+        self.render_cache = render_cache
 
     def generate(self, text_tree, prefix_description):
         """Generate a text based tree describing the Load Balancers.
@@ -30,41 +34,50 @@ class LBTree:
             prefix_description: A list of booleans describing a common prefix
             to be added to all strings is this text tree.
         """
-        add_tree(
-            text_tree,
+        text_tree.extend(self.iter_lines(prefix_description))
+
+    def iter_lines(self, prefix_description):
+        """Generate the lines of a text based tree describing the Load
+        Balancers.
+
+        Args:
+            prefix_description: A list of booleans describing a common prefix
+            to be added to all strings is this text tree.
+
+        Yields:
+            Strings containing the lines of the tree.
+        """
+        yield from iter_tree(
             prefix_description,
             "Load Balancers:",
             self.load_balancers,
-            self._add_lb_tree,
+            cache_item_function(
+                self.render_cache, self._iter_lb_tree, attrgetter("arn")
+            ),
         )
 
-    def _add_lb_tree(self, text_tree, prefix_description, lb):
-        """Adds tree describing Load Balancer to text_tree."""
-        arn = lb["LoadBalancerArn"]
-        name = lb["LoadBalancerName"]
-        text_tree.append(f"{get_prefix(prefix_description)}{arn} : {name}")
+    def _iter_lb_tree(self, prefix_description, lb):
+        """Generates tree describing Load Balancer."""
+        arn = lb.arn
+        name = lb.name
+        yield f"{get_prefix(prefix_description)}{arn} : {name}"
 
-        add_tree(
-            text_tree,
+        yield from iter_tree(
             prefix_description + [False],
             "Availability Zones:",
-            lb["AvailabilityZones"],
-            self._add_az_node,
+            lb.availability_zones,
+            self._iter_az_node,
         )
 
-        add_tree(
-            text_tree,
+        yield from iter_tree(
             prefix_description + [True],
             "Security Groups:",
-            lb["SecurityGroups"],
-            add_node,
+            lb.security_group_ids,
+            iter_node,
         )
 
-    def _add_az_node(self, text_tree, prefix_description, az):
-        """Adds details of Availability Zone linked to a Load Balancer to
-        text_tree."""
-        zone = az["ZoneName"]
-        subnet_id = az["SubnetId"]
-        text_tree.append(
-            f"{get_prefix(prefix_description)}{zone} : {subnet_id}"
-        )
+    def _iter_az_node(self, prefix_description, az):
+        """Generates details of Availability Zone linked to a Load
+        Balancer."""
+        zone, subnet_id = az
+        yield f"{get_prefix(prefix_description)}{zone} : {subnet_id}"
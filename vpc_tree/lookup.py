@@ -0,0 +1,280 @@
+# lookup.py
+"""VPC Tree application's lookup of the Subnets and Instances IPv4 addresses
+belong to.
+
+The Subnets' CIDR blocks are stored in a binary radix trie, each node one
+bit of the address, so finding the prefixes matching an address follows at
+most 32 nodes however many Subnets there are.  Instances are
+found with a dictionary keyed by their private IP address.
+
+Subnets in different Virtual Private Clouds can have the same or
+overlapping CIDR blocks, so an address can belong to a Subnet in each of
+them.  The Subnets of every Virtual Private Cloud share one trie, each value
+tagged with its Virtual Private Cloud, and the longest match is kept for
+each Virtual Private Cloud.
+
+Many addresses read at once are matched in a batch instead, against each
+Virtual Private Cloud's Subnets with ipv4_batch.contained_in.
+"""
+
+from .ipv4 import parse_address, parse_cidr
+from .ipv4_batch import contained_in
+
+# The indexes of the parts of a trie node, a list so the lookup loop is a few
+# list indexing operations per bit.
+_ZERO = 0
+_ONE = 1
+_VALUES = 2
+
+
+class CIDRTrie:
+    """A binary radix trie mapping IPv4 CIDR blocks to values, finding the
+    prefixes matching an address and the blocks overlapping a block."""
+
+    def __init__(self):
+        """Initializes instance."""
+        self._root = [None, None, None]
+        self._size = 0
+
+    def __len__(self):
+        """Get the number of values in the trie."""
+        return self._size
+
+    def insert(self, cidr_block, value):
+        """Add a value for a CIDR block.
+
+        Args:
+            cidr_block: A string containing an IPv4 CIDR block.
+            value: The value to add, a CIDR block can have several.
+
+        Raises:
+            ValueError: cidr_block is not an IPv4 CIDR block.
+        """
+        network, prefix_length = parse_cidr(cidr_block)
+        node = self._root
+        for shift in range(31, 31 - prefix_length, -1):
+            bit = (network >> shift) & 1
+            child = node[bit]
+            if child is None:
+                child = node[bit] = [None, None, None]
+            node = child
+
+        if node[_VALUES] is None:
+            node[_VALUES] = []
+        node[_VALUES].append(value)
+        self._size += 1
+
+    def matches(self, address):
+        """Get the values of every CIDR block containing an address.
+
+        Args:
+            address: An integer containing an IPv4 address, see
+            ipv4.parse_address.
+
+        Returns:
+            A list of values, those of shorter CIDR blocks first, empty when
+            no CIDR block contains the address.
+        """
+        node = self._root
+        values = list(node[_VALUES] or ())
+        shift = 31
+        while shift >= 0:
+            node = node[(address >> shift) & 1]
+            if node is None:
+                break
+            if node[_VALUES] is not None:
+                values += node[_VALUES]
+            shift -= 1
+
+        return values
+
+    def overlapping(self, cidr_block):
+        """Get the values of the CIDR blocks overlapping a CIDR block, those
+        containing it and those inside it.
+
+        Args:
+            cidr_block: A string containing an IPv4 CIDR block.
+
+        Returns:
+            A list of values.
+
+        Raises:
+            ValueError: cidr_block is not an IPv4 CIDR block.
+        """
+        network, prefix_length = parse_cidr(cidr_block)
+        values = []
+        node = self._root
+        for shift in range(31, 31 - prefix_length, -1):
+            if node[_VALUES] is not None:
+                values += node[_VALUES]
+            node = node[(network >> shift) & 1]
+            if node is None:
+                return values
+
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            if node[_VALUES] is not None:
+                values += node[_VALUES]
+            nodes.extend(c for c in node[:_VALUES] if c is not None)
+        return values
+
+
+class Match:
+    """A Subnet, and Instance if any, an address belongs to.
+
+    Attributes:
+        vpc: A model.VPC instance.
+        subnet: A model.Subnet instance.
+        instance: A model.Instance instance, None if no Instance in the
+        Virtual Private Cloud has the address.
+    """
+
+    __slots__ = ("vpc", "subnet", "instance")
+
+    def __init__(self, vpc, subnet, instance):
+        """Initializes instance."""
+        self.vpc = vpc
+        self.subnet = subnet
+        self.instance = instance
+
+
+class LookupIndex:
+    """Finds the Subnets and Instances IPv4 addresses belong to, in one or
+    more Virtual Private Clouds."""
+
+    def __init__(self, vpcs_resources):
+        """Initializes instance.
+
+        Args:
+            vpcs_resources: An iterable of VPCResources instances, only their
+            vpc, subnets and instances are used.
+        """
+        self._subnets = CIDRTrie()
+        self._vpc_subnets = []
+        self._instances = {}
+        for vpc_index, resources in enumerate(vpcs_resources):
+            vpc = resources.vpc
+            self._vpc_subnets.append((vpc, resources.subnets))
+            for subnet in resources.subnets:
+                self._subnets.insert(
+                    subnet.cidr_block, (vpc_index, vpc, subnet)
+                )
+            for instance in resources.instances:
+                if instance.private_ip_address is not None:
+                    address = parse_address(instance.private_ip_address)
+                    self._instances[(vpc.vpc_id, address)] = instance
+
+    def lookup(self, address):
+        """Find the Subnets and Instances an address belongs to.
+
+        Args:
+            address: An integer containing an IPv4 address, see
+            ipv4.parse_address.
+
+        Returns:
+            A list of Matches, one for each Virtual Private Cloud with a
+            Subnet containing the address, in the order the Virtual Private
+            Clouds were given, empty if there are none.
+        """
+        # Longer CIDR blocks come later, replacing shorter ones in the same
+        # Virtual Private Cloud.
+        longest = {}
+        for vpc_index, vpc, subnet in self._subnets.matches(address):
+            longest[vpc_index] = (vpc, subnet)
+
+        return [
+            Match(vpc, subnet, self._instances.get((vpc.vpc_id, address)))
+            for _, (vpc, subnet) in sorted(longest.items())
+        ]
+
+    def lookup_many(self, addresses):
+        """Find the Subnets and Instances many addresses belong to, matching
+        every address against each Virtual Private Cloud's Subnets in one
+        batch, see ipv4_batch.contained_in.
+
+        Args:
+            addresses: A list of integers containing IPv4 addresses, see
+            ipv4.parse_address.
+
+        Returns:
+            A list with a list of Matches for each address, the same as
+            lookup gives.
+        """
+        matches = [[] for _ in addresses]
+        for vpc, subnets in self._vpc_subnets:
+            found = contained_in(
+                addresses, [subnet.cidr_block for subnet in subnets]
+            )
+            for i, (address, subnet_index) in enumerate(zip(addresses, found)):
+                if subnet_index >= 0:
+                    instance = self._instances.get((vpc.vpc_id, address))
+                    matches[i].append(
+                        Match(vpc, subnets[subnet_index], instance)
+                    )
+        return matches
+
+    def iter_lookup_lines(self, lines, batch_size=1):
+        """Describe the Subnet and Instance of each address in a stream of
+        lines, one address per line.
+
+        Args:
+            lines: An iterable of strings, blank lines are skipped.
+            batch_size: An integer giving the number of addresses to read
+            before answering them together with lookup_many, 1 to answer
+            each address as soon as its line is read.
+
+        Yields:
+            Strings describing where each address belongs, a line for each
+            Virtual Private Cloud it belongs to, or that it was not found or
+            is not a valid address.
+        """
+        batch = []
+        for line in lines:
+            text = line.strip()
+            if not text:
+                continue
+            try:
+                address = parse_address(text)
+            except ValueError:
+                address = None
+            batch.append((text, address))
+            if len(batch) >= batch_size:
+                yield from self._iter_batch_lines(batch)
+                batch = []
+        yield from self._iter_batch_lines(batch)
+
+    def _iter_batch_lines(self, batch):
+        """Describe a batch of (text, address) tuples, address None when the
+        text is not a valid address."""
+        addresses = [address for _, address in batch if address is not None]
+        if len(addresses) == 1:
+            found = iter([self.lookup(addresses[0])])
+        else:
+            found = iter(self.lookup_many(addresses))
+
+        for text, address in batch:
+            if address is None:
+                yield f"{text} : invalid address"
+                continue
+            matches = next(found)
+            if len(matches) == 0:
+                yield f"{text} : not found"
+            for match in matches:
+                yield f"{text} : {_describe_match(match)}"
+
+
+def _describe_match(match):
+    """Describe where an address belongs as fields separated by " : "."""
+    subnet = match.subnet
+    fields = [match.vpc.vpc_id, subnet.subnet_id]
+    if subnet.name is not None:
+        fields.append(subnet.name)
+    fields += [subnet.availability_zone, subnet.cidr_block]
+
+    instance = match.instance
+    if instance is not None:
+        fields.append(instance.instance_id)
+        if instance.name is not None:
+            fields.append(instance.name)
+    return " : ".join(fields)
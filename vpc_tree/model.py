@@ -0,0 +1,738 @@
+# model.py
+"""VPC Tree application's compact model of AWS resources.
+
+Boto3 describes each resource with a dictionary holding every field AWS
+returns, often nested several levels deep, but a tree only shows a handful
+of them.  Each resource is projected onto a model class holding just the
+fields VPC Tree uses, in __slots__ so instances have no __dict__.  Strings
+that repeat across resources, such as Availability Zones, AMI Ids, Instance
+types and Security Group Ids, are interned so every resource shares one
+copy.
+
+Each model class has from_boto3, projecting a Boto3 dictionary, and
+to_boto3, giving back a Boto3 shaped dictionary holding just the projected
+fields, so projected resources can be cached and saved to snapshots and
+projected again later.
+"""
+
+from operator import attrgetter
+from sys import intern
+
+from .ipv4 import address_to_int
+
+
+def _intern(value):
+    """Intern a string, passing None through."""
+    return None if value is None else intern(value)
+
+
+def _tags(resource):
+    """Project the Tags of a Boto3 resource dictionary to a dictionary
+    mapping keys to values, built once so each lookup is a dictionary
+    lookup."""
+    tags = resource.get("Tags") or ()
+    return {intern(tag["Key"]): tag["Value"] for tag in tags}
+
+
+def _boto3_tags(tags):
+    """Convert a dictionary of tags back to Boto3 Tags."""
+    return [{"Key": key, "Value": value} for key, value in tags.items()]
+
+
+class Model:
+    """Base class of the model classes, comparing and describing instances
+    by the values of their slots."""
+
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """Give each class with slots a getter of their values, so instances
+        are compared by comparing two tuples."""
+        super().__init_subclass__(**kwargs)
+        if cls.__slots__:
+            cls._slot_values = attrgetter(*cls.__slots__)
+
+    def __eq__(self, other):
+        """Compare the values of every slot."""
+        if type(self) is not type(other):
+            return NotImplemented
+        return self._slot_values(self) == self._slot_values(other)
+
+    def __repr__(self):
+        """Describe the values of every slot."""
+        values = ", ".join(
+            f"{name}={getattr(self, name)!r}" for name in self.__slots__
+        )
+        return f"{type(self).__name__}({values})"
+
+
+class Tagged(Model):
+    """Base class of the model classes of resources with tags, which have a
+    tags slot and a resource_id property.  Each resource has its own tags
+    dictionary, even when it is empty, so changing one resource's tags
+    never changes another's."""
+
+    __slots__ = ()
+
+    @property
+    def name(self):
+        """The value of the Name tag, None if there is none."""
+        return self.tags.get("Name")
+
+
+class VPC(Tagged):
+    """A Virtual Private Cloud.
+
+    Attributes:
+        vpc_id: A string containing the Virtual Private Cloud Id.
+        cidr_block: A string containing the primary IPv4 CIDR block.
+        tags: A dictionary mapping tag keys to values.
+        secondary_cidr_blocks: A tuple of strings containing the other IPv4
+        CIDR blocks associated with the Virtual Private Cloud.
+        name: A string containing the Name tag, None if it has none.
+        cidr_blocks: A tuple of every IPv4 CIDR block, primary first.
+    """
+
+    __slots__ = ("vpc_id", "cidr_block", "tags", "secondary_cidr_blocks")
+
+    def __init__(
+        self, vpc_id, cidr_block, tags=None, secondary_cidr_blocks=()
+    ):
+        """Initializes instance."""
+        self.vpc_id = vpc_id
+        self.cidr_block = cidr_block
+        self.tags = {} if tags is None else tags
+        self.secondary_cidr_blocks = secondary_cidr_blocks
+
+    @property
+    def resource_id(self):
+        """The Id used to index the resource's tags."""
+        return self.vpc_id
+
+    @property
+    def cidr_blocks(self):
+        """Every IPv4 CIDR block, primary first."""
+        return (self.cidr_block, *self.secondary_cidr_blocks)
+
+    @classmethod
+    def from_boto3(cls, vpc):
+        """Project a Virtual Private Cloud dictionary from Boto3."""
+        cidr_block = vpc["CidrBlock"]
+        return cls(
+            intern(vpc["VpcId"]),
+            cidr_block,
+            _tags(vpc),
+            tuple(
+                association["CidrBlock"]
+                for association in vpc.get("CidrBlockAssociationSet", ())
+                if association["CidrBlock"] != cidr_block
+                and association.get("CidrBlockState", {}).get("State")
+                == "associated"
+            ),
+        )
+
+    def to_boto3(self):
+        """Convert to a Boto3 shaped dictionary."""
+        vpc = {
+            "VpcId": self.vpc_id,
+            "CidrBlock": self.cidr_block,
+            "Tags": _boto3_tags(self.tags),
+        }
+        if self.secondary_cidr_blocks:
+            vpc["CidrBlockAssociationSet"] = [
+                {
+                    "CidrBlock": cidr_block,
+                    "CidrBlockState": {"State": "associated"},
+                }
+                for cidr_block in self.cidr_blocks
+            ]
+        return vpc
+
+
+class Permission(Model):
+    """An ingress or egress permission of a Security Group.
+
+    Attributes:
+        ip_protocol: A string containing the protocol, "-1" for all.
+        from_port: An integer giving the first port, None for all protocols.
+        to_port: An integer giving the last port, None for all protocols.
+        ip_ranges: A tuple of strings containing IPv4 CIDR blocks.
+        group_ids: A tuple of strings containing Security Group Ids.
+        ipv6_ranges: A tuple of strings containing IPv6 CIDR blocks.
+        prefix_list_ids: A tuple of strings containing managed prefix list
+        Ids.
+    """
+
+    __slots__ = (
+        "ip_protocol",
+        "from_port",
+        "to_port",
+        "ip_ranges",
+        "group_ids",
+        "ipv6_ranges",
+        "prefix_list_ids",
+    )
+
+    def __init__(
+        self,
+        ip_protocol,
+        from_port,
+        to_port,
+        ip_ranges,
+        group_ids,
+        ipv6_ranges=(),
+        prefix_list_ids=(),
+    ):
+        """Initializes instance."""
+        self.ip_protocol = ip_protocol
+        self.from_port = from_port
+        self.to_port = to_port
+        self.ip_ranges = ip_ranges
+        self.group_ids = group_ids
+        self.ipv6_ranges = ipv6_ranges
+        self.prefix_list_ids = prefix_list_ids
+
+    @classmethod
+    def from_boto3(cls, permission):
+        """Project an IpPermissions dictionary from Boto3."""
+        return cls(
+            intern(permission["IpProtocol"]),
+            permission.get("FromPort"),
+            permission.get("ToPort"),
+            tuple(
+                intern(ip_range["CidrIp"])
+                for ip_range in permission.get("IpRanges", ())
+            ),
+            tuple(
+                intern(pair["GroupId"])
+                for pair in permission.get("UserIdGroupPairs", ())
+            ),
+            tuple(
+                intern(ip_range["CidrIpv6"])
+                for ip_range in permission.get("Ipv6Ranges", ())
+            ),
+            tuple(
+                intern(prefix_list["PrefixListId"])
+                for prefix_list in permission.get("PrefixListIds", ())
+            ),
+        )
+
+    def to_boto3(self):
+        """Convert to a Boto3 shaped dictionary."""
+        permission = {"IpProtocol": self.ip_protocol}
+        if self.from_port is not None:
+            permission["FromPort"] = self.from_port
+        if self.to_port is not None:
+            permission["ToPort"] = self.to_port
+        permission["IpRanges"] = [{"CidrIp": cidr} for cidr in self.ip_ranges]
+        permission["UserIdGroupPairs"] = [
+            {"GroupId": group_id} for group_id in self.group_ids
+        ]
+        permission["Ipv6Ranges"] = [
+            {"CidrIpv6": cidr} for cidr in self.ipv6_ranges
+        ]
+        permission["PrefixListIds"] = [
+            {"PrefixListId": prefix_list_id}
+            for prefix_list_id in self.prefix_list_ids
+        ]
+        return permission
+
+
+class SecurityGroup(Tagged):
+    """A Security Group.
+
+    Attributes:
+        group_id: A string containing the Security Group Id.
+        group_name: A string containing the Security Group name.
+        vpc_id: A string containing the Virtual Private Cloud Id.
+        ingress: A tuple of Permissions.
+        egress: A tuple of Permissions.
+        tags: A dictionary mapping tag keys to values.
+        name: A string containing the Name tag, None if it has none.
+    """
+
+    __slots__ = (
+        "group_id",
+        "group_name",
+        "vpc_id",
+        "ingress",
+        "egress",
+        "tags",
+    )
+
+    def __init__(
+        self, group_id, group_name, vpc_id, ingress, egress, tags=None
+    ):
+        """Initializes instance."""
+        self.group_id = group_id
+        self.group_name = group_name
+        self.vpc_id = vpc_id
+        self.ingress = ingress
+        self.egress = egress
+        self.tags = {} if tags is None else tags
+
+    @property
+    def resource_id(self):
+        """The Id used to index the resource's tags."""
+        return self.group_id
+
+    @classmethod
+    def from_boto3(cls, sg):
+        """Project a Security Group dictionary from Boto3."""
+        return cls(
+            intern(sg["GroupId"]),
+            sg["GroupName"],
+            _intern(sg.get("VpcId")),
+            tuple(map(Permission.from_boto3, sg["IpPermissions"])),
+            tuple(map(Permission.from_boto3, sg["IpPermissionsEgress"])),
+            _tags(sg),
+        )
+
+    def to_boto3(self):
+        """Convert to a Boto3 shaped dictionary."""
+        return {
+            "GroupId": self.group_id,
+            "GroupName": self.group_name,
+            "VpcId": self.vpc_id,
+            "IpPermissions": [p.to_boto3() for p in self.ingress],
+            "IpPermissionsEgress": [p.to_boto3() for p in self.egress],
+            "Tags": _boto3_tags(self.tags),
+        }
+
+
+class Subnet(Tagged):
+    """A Subnet.
+
+    Attributes:
+        subnet_id: A string containing the Subnet Id.
+        vpc_id: A string containing the Virtual Private Cloud Id.
+        availability_zone: A string containing the Availability Zone.
+        cidr_block: A string containing the IPv4 CIDR block.
+        tags: A dictionary mapping tag keys to values.
+        available_ip_address_count: An integer giving the number of unused
+        private IPv4 addresses, None if unknown.
+        name: A string containing the Name tag, None if it has none.
+    """
+
+    __slots__ = (
+        "subnet_id",
+        "vpc_id",
+        "availability_zone",
+        "cidr_block",
+        "tags",
+        "available_ip_address_count",
+    )
+
+    def __init__(
+        self,
+        subnet_id,
+        vpc_id,
+        availability_zone,
+        cidr_block,
+        tags=None,
+        available_ip_address_count=None,
+    ):
+        """Initializes instance."""
+        self.subnet_id = subnet_id
+        self.vpc_id = vpc_id
+        self.availability_zone = availability_zone
+        self.cidr_block = cidr_block
+        self.tags = {} if tags is None else tags
+        self.available_ip_address_count = available_ip_address_count
+
+    @property
+    def resource_id(self):
+        """The Id used to index the resource's tags."""
+        return self.subnet_id
+
+    @classmethod
+    def from_boto3(cls, subnet):
+        """Project a Subnet dictionary from Boto3."""
+        return cls(
+            intern(subnet["SubnetId"]),
+            _intern(subnet.get("VpcId")),
+            intern(subnet["AvailabilityZone"]),
+            subnet["CidrBlock"],
+            _tags(subnet),
+            subnet.get("AvailableIpAddressCount"),
+        )
+
+    def to_boto3(self):
+        """Convert to a Boto3 shaped dictionary."""
+        subnet = {
+            "SubnetId": self.subnet_id,
+            "VpcId": self.vpc_id,
+            "AvailabilityZone": self.availability_zone,
+            "CidrBlock": self.cidr_block,
+            "Tags": _boto3_tags(self.tags),
+        }
+        if self.available_ip_address_count is not None:
+            subnet["AvailableIpAddressCount"] = self.available_ip_address_count
+        return subnet
+
+
+class Instance(Tagged):
+    """An EC2 Instance.
+
+    Attributes:
+        instance_id: A string containing the Instance Id.
+        image_id: A string containing the AMI Id.
+        instance_type: A string containing the Instance type.
+        state: A string containing the name of the Instance's state.
+        private_ip_address: A string containing the private IPv4 address,
+        None if it has none.
+        subnet_id: A string containing the Subnet Id.
+        vpc_id: A string containing the Virtual Private Cloud Id.
+        security_group_ids: A tuple of strings containing Security Group Ids.
+        tags: A dictionary mapping tag keys to values.
+        name: A string containing the Name tag, None if it has none.
+    """
+
+    __slots__ = (
+        "instance_id",
+        "image_id",
+        "instance_type",
+        "state",
+        "private_ip_address",
+        "subnet_id",
+        "vpc_id",
+        "security_group_ids",
+        "tags",
+    )
+
+    def __init__(
+        self,
+        instance_id,
+        image_id,
+        instance_type,
+        state,
+        private_ip_address,
+        subnet_id,
+        vpc_id,
+        security_group_ids,
+        tags=None,
+    ):
+        """Initializes instance."""
+        self.instance_id = instance_id
+        self.image_id = image_id
+        self.instance_type = instance_type
+        self.state = state
+        self.private_ip_address = private_ip_address
+        self.subnet_id = subnet_id
+        self.vpc_id = vpc_id
+        self.security_group_ids = security_group_ids
+        self.tags = {} if tags is None else tags
+
+    @property
+    def resource_id(self):
+        """The Id used to index the resource's tags."""
+        return self.instance_id
+
+    @classmethod
+    def from_boto3(cls, instance):
+        """Project an Instance dictionary from Boto3."""
+        return cls(
+            instance["InstanceId"],
+            intern(instance["ImageId"]),
+            intern(instance["InstanceType"]),
+            intern(instance["State"]["Name"]),
+            instance.get("PrivateIpAddress"),
+            _intern(instance.get("SubnetId")),
+            _intern(instance.get("VpcId")),
+            tuple(
+                intern(sg["GroupId"])
+                for sg in instance.get("SecurityGroups", ())
+            ),
+            _tags(instance),
+        )
+
+    def to_boto3(self):
+        """Convert to a Boto3 shaped dictionary."""
+        instance = {
+            "InstanceId": self.instance_id,
+            "ImageId": self.image_id,
+            "InstanceType": self.instance_type,
+            "State": {"Name": self.state},
+        }
+        for key, value in (
+            ("PrivateIpAddress", self.private_ip_address),
+            ("SubnetId", self.subnet_id),
+            ("VpcId", self.vpc_id),
+        ):
+            if value is not None:
+                instance[key] = value
+        instance["SecurityGroups"] = [
+            {"GroupId": group_id} for group_id in self.security_group_ids
+        ]
+        instance["Tags"] = _boto3_tags(self.tags)
+        return instance
+
+
+class LoadBalancer(Model):
+    """An Elastic Load Balancing v2 Load Balancer.
+
+    Attributes:
+        arn: A string containing the Load Balancer ARN.
+        name: A string containing the Load Balancer name.
+        vpc_id: A string containing the Virtual Private Cloud Id.
+        availability_zones: A tuple of (zone name, Subnet Id) tuples.
+        security_group_ids: A tuple of strings containing Security Group Ids.
+    """
+
+    __slots__ = (
+        "arn",
+        "name",
+        "vpc_id",
+        "availability_zones",
+        "security_group_ids",
+    )
+
+    def __init__(
+        self, arn, name, vpc_id, availability_zones, security_group_ids
+    ):
+        """Initializes instance."""
+        self.arn = arn
+        self.name = name
+        self.vpc_id = vpc_id
+        self.availability_zones = availability_zones
+        self.security_group_ids = security_group_ids
+
+    @classmethod
+    def from_boto3(cls, lb):
+        """Project a Load Balancer dictionary from Boto3."""
+        return cls(
+            intern(lb["LoadBalancerArn"]),
+            lb["LoadBalancerName"],
+            _intern(lb.get("VpcId")),
+            tuple(
+                (intern(az["ZoneName"]), intern(az["SubnetId"]))
+                for az in lb["AvailabilityZones"]
+            ),
+            tuple(map(intern, lb.get("SecurityGroups", ()))),
+        )
+
+    def to_boto3(self):
+        """Convert to a Boto3 shaped dictionary."""
+        return {
+            "LoadBalancerArn": self.arn,
+            "LoadBalancerName": self.name,
+            "VpcId": self.vpc_id,
+            "AvailabilityZones": [
+                {"ZoneName": zone, "SubnetId": subnet_id}
+                for zone, subnet_id in self.availability_zones
+            ],
+            "SecurityGroups": list(self.security_group_ids),
+        }
+
+
+class AutoScalingGroup(Model):
+    """An Auto Scaling Group.
+
+    Attributes:
+        arn: A string containing the Auto Scaling Group ARN.
+        name: A string containing the Auto Scaling Group name.
+        min_size: An integer giving the minimum number of Instances.
+        max_size: An integer giving the maximum number of Instances.
+        launch_configuration_name: A string containing the name of the
+        Launch Configuration, None if it has none.
+        launch_template_id: A string containing the Launch Template Id, None
+        if it has none.
+        mixed_instances_launch_template_id: A string containing the Launch
+        Template Id of the Mixed Instances Policy, None if it has none.
+        subnet_ids: A tuple of strings containing Subnet Ids.
+        instance_ids: A tuple of strings containing Instance Ids.
+        load_balancer_names: A tuple of strings containing Classic Load
+        Balancer names.
+        target_group_arns: A tuple of strings containing Target Group ARNs.
+    """
+
+    __slots__ = (
+        "arn",
+        "name",
+        "min_size",
+        "max_size",
+        "launch_configuration_name",
+        "launch_template_id",
+        "mixed_instances_launch_template_id",
+        "subnet_ids",
+        "instance_ids",
+        "load_balancer_names",
+        "target_group_arns",
+    )
+
+    def __init__(
+        self,
+        arn,
+        name,
+        min_size,
+        max_size,
+        launch_configuration_name,
+        launch_template_id,
+        mixed_instances_launch_template_id,
+        subnet_ids,
+        instance_ids,
+        load_balancer_names,
+        target_group_arns,
+    ):
+        """Initializes instance."""
+        self.arn = arn
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.launch_configuration_name = launch_configuration_name
+        self.launch_template_id = launch_template_id
+        self.mixed_instances_launch_template_id = (
+            mixed_instances_launch_template_id
+        )
+        self.subnet_ids = subnet_ids
+        self.instance_ids = instance_ids
+        self.load_balancer_names = load_balancer_names
+        self.target_group_arns = target_group_arns
+
+    @classmethod
+    def from_boto3(cls, asg):
+        """Project an Auto Scaling Group dictionary from Boto3."""
+        launch_template_id = None
+        if "LaunchTemplate" in asg:
+            launch_template_id = asg["LaunchTemplate"]["LaunchTemplateId"]
+
+        mixed_instances_launch_template_id = None
+        if "MixedInstancesPolicy" in asg:
+            mixed_instances_launch_template_id = asg["MixedInstancesPolicy"][
+                "LaunchTemplate"
+            ]["LaunchTemplateSpecification"]["LaunchTemplateId"]
+
+        return cls(
+            asg["AutoScalingGroupARN"],
+            asg["AutoScalingGroupName"],
+            asg["MinSize"],
+            asg["MaxSize"],
+            asg.get("LaunchConfigurationName"),
+            _intern(launch_template_id),
+            _intern(mixed_instances_launch_template_id),
+            tuple(map(intern, asg["VPCZoneIdentifier"].split(","))),
+            tuple(instance["InstanceId"] for instance in asg["Instances"]),
+            tuple(asg["LoadBalancerNames"]),
+            tuple(map(intern, asg["TargetGroupARNs"])),
+        )
+
+    def to_boto3(self):
+        """Convert to a Boto3 shaped dictionary."""
+        asg = {
+            "AutoScalingGroupARN": self.arn,
+            "AutoScalingGroupName": self.name,
+            "MinSize": self.min_size,
+            "MaxSize": self.max_size,
+        }
+        if self.launch_configuration_name is not None:
+            asg["LaunchConfigurationName"] = self.launch_configuration_name
+        if self.launch_template_id is not None:
+            asg["LaunchTemplate"] = {
+                "LaunchTemplateId": self.launch_template_id
+            }
+        if self.mixed_instances_launch_template_id is not None:
+            asg["MixedInstancesPolicy"] = {
+                "LaunchTemplate": {
+                    "LaunchTemplateSpecification": {
+                        "LaunchTemplateId": (
+                            self.mixed_instances_launch_template_id
+                        )
+                    }
+                }
+            }
+        asg["VPCZoneIdentifier"] = ",".join(self.subnet_ids)
+        asg["Instances"] = [
+            {"InstanceId": instance_id} for instance_id in self.instance_ids
+        ]
+        asg["LoadBalancerNames"] = list(self.load_balancer_names)
+        asg["TargetGroupARNs"] = list(self.target_group_arns)
+        return asg
+
+
+class TargetGroup(Model):
+    """An Elastic Load Balancing v2 Target Group.
+
+    Attributes:
+        arn: A string containing the Target Group ARN.
+        name: A string containing the Target Group name.
+        load_balancer_arns: A tuple of strings containing the ARNs of the Load
+        Balancers the Target Group is linked to.
+    """
+
+    __slots__ = ("arn", "name", "load_balancer_arns")
+
+    def __init__(self, arn, name, load_balancer_arns):
+        """Initializes instance."""
+        self.arn = arn
+        self.name = name
+        self.load_balancer_arns = load_balancer_arns
+
+    @classmethod
+    def from_boto3(cls, target_group):
+        """Project a Target Group dictionary from Boto3."""
+        return cls(
+            intern(target_group["TargetGroupArn"]),
+            target_group["TargetGroupName"],
+            tuple(map(intern, target_group["LoadBalancerArns"])),
+        )
+
+    def to_boto3(self):
+        """Convert to a Boto3 shaped dictionary."""
+        return {
+            "TargetGroupArn": self.arn,
+            "TargetGroupName": self.name,
+            "LoadBalancerArns": list(self.load_balancer_arns),
+        }
+
+
+# The model class of each VPCResources attribute.
+MODEL_CLASSES = {
+    "vpc": VPC,
+    "security_groups": SecurityGroup,
+    "subnets": Subnet,
+    "instances": Instance,
+    "load_balancers": LoadBalancer,
+    "auto_scaling_groups": AutoScalingGroup,
+    "target_groups": TargetGroup,
+}
+
+
+def project(model_class, resources):
+    """Project a list of Boto3 dictionaries onto a model class.
+
+    Args:
+        model_class: One of the model classes.
+        resources: A list of dictionaries containing resources from Boto3.
+
+    Returns:
+        A list of model_class instances.
+    """
+    return [model_class.from_boto3(resource) for resource in resources]
+
+
+def group_instances_by_subnet(instances):
+    """Group Instances by Subnet in a single pass.
+
+    Args:
+        instances: A list of Instances to group.
+
+    Returns:
+        A dictionary mapping Subnet Ids to lists of Instances in them, sorted
+        by private IP address in numeric order, Instances without one last.
+    """
+    index = {}
+    for instance in instances:
+        index.setdefault(instance.subnet_id, []).append(instance)
+
+    for subnet_instances in index.values():
+        subnet_instances.sort(key=_private_ip_order)
+
+    return index
+
+
+def _private_ip_order(instance):
+    """Sort key putting Instances in numeric private IP address order."""
+    ip = instance.private_ip_address
+    if ip is None:
+        return (1, 0)
+    return (0, address_to_int(ip))
@@ -21,6 +21,10 @@ Examples.
 - [True, False]      = "   ├──"
 - [True, True]       = "   └──"
 - [True, True, True] = "      └──"
+
+Every line of a tree needs a prefix, but a tree only has a few distinct
+prefixes, so each prefix string is built once and then looked up by the
+tuple of its booleans.
 """
 
 ELBOW = "└──"
@@ -28,6 +32,8 @@ TEE = "├──"
 PIPE = "│  "
 SPACE = "   "
 
+_prefixes = {}
+
 
 def elbow_or_tee(last_leaf_node):
     """Selects ELBOW or TEE.
@@ -56,7 +62,26 @@ def space_or_pipe(last_sub_tree):
 
 
 def get_prefix(prefix_description):
-    """Selects PIPE or SPACE.
+    """Get the prefix string described by a list of booleans.
+
+    Args:
+        prefix_description: A list booleans describing the structure of a
+        prefix string
+
+    Returns:
+        A string representing the prefix described by prefix_description.
+    """
+    key = tuple(prefix_description)
+    prefix = _prefixes.get(key)
+    if prefix is None:
+        prefix = build_prefix(key)
+        _prefixes[key] = prefix
+
+    return prefix
+
+
+def build_prefix(prefix_description):
+    """Build the prefix string described by a list of booleans.
 
     Args:
         prefix_description: A list booleans describing the structure of a
@@ -0,0 +1,275 @@
+# ratelimit.py
+"""VPC Tree application's adaptive rate limiting of AWS calls.
+
+Fetching concurrently makes it easy to exceed the AWS API request rates,
+and Boto3 retries throttled calls per client without any coordination
+between the threads making them, which can turn into a storm of retries.
+
+A RateLimiter shares one token bucket between every call to the same service
+in the same region.  Every HTTP request, including retries, takes a token
+before it is sent.  The bucket's rate is halved when a response is
+throttled and ramps back up by a fixed step per second of successful calls,
+so throughput degrades smoothly instead of collapsing into retries.
+
+The RateLimiter registers handlers for the botocore events of every shared
+client through a client hook, so the functions in aws_resources are limited
+without any changes to them.
+"""
+
+import threading
+import time
+
+from . import clients
+from .clients import is_throttling_response
+
+DEFAULT_MAX_RATE = 20.0
+DEFAULT_MIN_RATE = 0.5
+DEFAULT_BURST = 20
+
+# The rate is multiplied by DECREASE_FACTOR when a call is throttled, at most
+# once per DECREASE_COOLDOWN seconds so a burst of throttled responses to
+# calls already in flight only counts once.
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN = 1.0
+
+# Calls per second added to the rate for each second of successful calls.
+INCREASE_PER_SECOND = 1.0
+
+
+class TokenBucket:
+    """An adaptive token bucket limiting the rate of calls.
+
+    Attributes:
+        rate: A float giving the current calls per second.
+        min_rate: A float giving the lowest rate throttling can cut to.
+        max_rate: A float giving the highest rate successes can ramp up to.
+        burst: An integer giving the number of tokens the bucket holds.
+        counters: A dictionary counting the calls, throttled calls, calls
+        that waited for a token and the seconds spent waiting.
+    """
+
+    def __init__(
+        self,
+        max_rate=DEFAULT_MAX_RATE,
+        min_rate=DEFAULT_MIN_RATE,
+        burst=DEFAULT_BURST,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """Initializes instance.
+
+        Args:
+            max_rate: A float giving the starting and highest calls per
+            second.
+            min_rate: A float giving the lowest calls per second.
+            burst: An integer giving the number of tokens the bucket holds.
+            clock: A function returning the time in seconds.
+            sleep: A function sleeping for a number of seconds.
+        """
+        self.rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.max_rate = max_rate
+        self.burst = burst
+        self.counters = {
+            "calls": 0,
+            "throttles": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+        }
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._last_decrease = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting until one is available.
+
+        Tokens are reserved under the lock, so waiting callers are released
+        in turn at the bucket's rate rather than all at once.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            self.counters["calls"] += 1
+            wait = 0.0
+            if self._tokens < 0:
+                wait = -self._tokens / self.rate
+                self.counters["waits"] += 1
+                self.counters["wait_seconds"] += wait
+
+        if wait > 0:
+            self._sleep(wait)
+
+    def throttled(self):
+        """Cut the rate after a throttled call."""
+        with self._lock:
+            self.counters["throttles"] += 1
+            now = self._clock()
+            last = self._last_decrease
+            if last is not None and now - last < DECREASE_COOLDOWN:
+                return
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+            self._last_decrease = now
+
+    def succeeded(self):
+        """Ramp the rate back up after a successful call."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(
+                    self.max_rate, self.rate + INCREASE_PER_SECOND / self.rate
+                )
+
+    def _refill(self):
+        """Add the tokens earned since the last update, must be called
+        holding the lock."""
+        now = self._clock()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+
+class RateLimiter:
+    """Shares a TokenBucket between the calls to each service and region.
+
+    Attributes:
+        max_rate: A float giving the starting and highest calls per second
+        of each bucket.
+        min_rate: A float giving the lowest calls per second of each bucket.
+        burst: An integer giving the number of tokens each bucket holds.
+    """
+
+    def __init__(
+        self,
+        max_rate=DEFAULT_MAX_RATE,
+        min_rate=DEFAULT_MIN_RATE,
+        burst=DEFAULT_BURST,
+    ):
+        """Initializes instance.
+
+        Args:
+            max_rate: A float giving the starting and highest calls per
+            second of each bucket.
+            min_rate: A float giving the lowest calls per second of each
+            bucket.
+            burst: An integer giving the number of tokens each bucket holds.
+        """
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, service_name, region_name):
+        """Get the shared TokenBucket for a service and region.
+
+        Args:
+            service_name: A string containing the name of the AWS service.
+            region_name: A string containing the AWS region.
+
+        Returns:
+            A TokenBucket.
+        """
+        key = (service_name, region_name)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.max_rate, self.min_rate, self.burst)
+                self._buckets[key] = bucket
+            return bucket
+
+    def instrument(self, client):
+        """Register handlers limiting the calls made by a client.
+
+        Args:
+            client: A Boto3 client.
+        """
+        bucket = self.get_bucket(
+            client.meta.service_model.service_name, client.meta.region_name
+        )
+
+        def before_send(**kwargs):
+            bucket.acquire()
+
+        def needs_retry(response, **kwargs):
+            if is_throttling_response(response):
+                bucket.throttled()
+
+        def after_call(http_response, parsed, **kwargs):
+            # after-call also fires for error responses, which must not
+            # ramp the rate up.
+            if http_response.status_code < 300 and "Error" not in parsed:
+                bucket.succeeded()
+
+        events = client.meta.events
+        events.register("before-send.*.*", before_send)
+        events.register("needs-retry.*.*", needs_retry)
+        events.register("after-call.*.*", after_call)
+
+    def counters(self):
+        """Get the counters of every bucket.
+
+        Returns:
+            A dictionary mapping (service, region) tuples to dictionaries
+            containing the bucket's counters and current rate.
+        """
+        with self._lock:
+            buckets = dict(self._buckets)
+
+        return {
+            key: {**bucket.counters, "rate": bucket.rate}
+            for key, bucket in buckets.items()
+        }
+
+    def write_counters(self, file):
+        """Write the counters as a table.
+
+        Args:
+            file: A text file to write the table to.
+        """
+        file.write(
+            f"{'service':<12} {'region':<16} {'calls':>6} {'throttle':>8} "
+            f"{'waits':>6} {'wait s':>8} {'rate/s':>7}\n"
+        )
+        for (service, region), counters in sorted(self.counters().items()):
+            file.write(
+                f"{service:<12} {str(region):<16} {counters['calls']:>6} "
+                f"{counters['throttles']:>8} {counters['waits']:>6} "
+                f"{counters['wait_seconds']:>8.2f} {counters['rate']:>7.1f}\n"
+            )
+
+
+_limiter = None
+
+
+def enable(
+    max_rate=DEFAULT_MAX_RATE,
+    min_rate=DEFAULT_MIN_RATE,
+    burst=DEFAULT_BURST,
+):
+    """Start limiting the calls of every client the shared registry creates.
+
+    Args:
+        max_rate: A float giving the starting and highest calls per second
+        of each service and region.
+        min_rate: A float giving the lowest calls per second of each service
+        and region.
+        burst: An integer giving the number of calls each service and region
+        can make at once.
+
+    Returns:
+        The RateLimiter.
+    """
+    global _limiter
+    _limiter = RateLimiter(max_rate, min_rate, burst)
+    clients.add_client_hook(_limiter.instrument)
+    return _limiter
+
+
+def get_limiter():
+    """Get the active RateLimiter, None when rate limiting is off."""
+    return _limiter
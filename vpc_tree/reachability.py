@@ -0,0 +1,407 @@
+# reachability.py
+"""VPC Tree application's queries of which Instances can receive traffic
+on a port from a source, answered from the Security Groups' ingress rules.
+
+Each source of each ingress permission is a rule.  Rules are indexed three
+ways so a query never walks every rule.
+
+- By port range, in an interval tree per protocol, so the rules allowing a
+  port are found in time proportional to the depth of the tree and the
+  number of rules found.
+- By source CIDR block, in a lookup.CIDRTrie, so the rules whose CIDR block
+  overlaps the queried source are found by following its bits.
+- By source Security Group, in a dictionary, so rules referencing a group
+  through UserIdGroupPairs are resolved to the Instances in that group.
+
+A rule allows the source when its CIDR block overlaps the source, the
+source is the Security Group it references, or an Instance in the Security
+Group it references has a private IP address inside the source.
+
+Sources are IPv4, so rules allowing an IPv6 CIDR block or a managed prefix
+list, whose CIDR blocks are not fetched, can not be checked.  They are kept
+apart, and the Instances they allow the port to are reported as unknown
+rather than left out silently.
+"""
+
+from bisect import bisect_left, bisect_right
+
+from .ipv4 import parse_address, parse_cidr
+from .lookup import CIDRTrie
+
+ALL_PROTOCOLS = "-1"
+ALL_PORTS = (0, 65535)
+
+# The protocol names AWS uses for numbered protocols.
+_PROTOCOL_NAMES = {"1": "icmp", "6": "tcp", "17": "udp"}
+
+
+class IntervalTree:
+    """A static centred interval tree of closed integer intervals, finding
+    the intervals containing a point."""
+
+    def __init__(self, intervals):
+        """Initializes instance.
+
+        Args:
+            intervals: An iterable of (start, end, value) tuples.
+        """
+        intervals = list(intervals)
+        self._size = len(intervals)
+        self._root = self._build(intervals)
+
+    def __len__(self):
+        """Get the number of intervals in the tree."""
+        return self._size
+
+    def _build(self, intervals):
+        """Build the node holding the intervals containing the median
+        endpoint, with the intervals before and after it in its children."""
+        if len(intervals) == 0:
+            return None
+        points = sorted(p for start, end, _ in intervals for p in (start, end))
+        centre = points[len(points) // 2]
+        before = [i for i in intervals if i[1] < centre]
+        after = [i for i in intervals if i[0] > centre]
+        over = [i for i in intervals if i[0] <= centre <= i[1]]
+        return (
+            centre,
+            sorted(over, key=lambda i: i[0]),
+            sorted(over, key=lambda i: i[1], reverse=True),
+            self._build(before),
+            self._build(after),
+        )
+
+    def stab(self, point):
+        """Get the values of the intervals containing a point.
+
+        Args:
+            point: An integer.
+
+        Returns:
+            A list of values.
+        """
+        values = []
+        node = self._root
+        while node is not None:
+            centre, by_start, by_end, before, after = node
+            if point < centre:
+                for start, _, value in by_start:
+                    if start > point:
+                        break
+                    values.append(value)
+                node = before
+            elif point > centre:
+                for _, end, value in by_end:
+                    if end < point:
+                        break
+                    values.append(value)
+                node = after
+            else:
+                values += [value for _, _, value in by_start]
+                break
+        return values
+
+
+def source_cidr(source):
+    """Get the CIDR block of a CIDR block or IPv4 address source."""
+    return source if "/" in source else f"{source}/32"
+
+
+class Rule:
+    """One source of an ingress permission of a Security Group.
+
+    Attributes:
+        group_id: A string containing the Id of the Security Group.
+        ip_protocol: A string containing the protocol, "-1" for all.
+        from_port: An integer giving the first port allowed.
+        to_port: An integer giving the last port allowed.
+        source: A string containing the IPv4 or IPv6 CIDR block, Security
+        Group Id or prefix list Id allowed.
+        network: An integer giving the network address of an IPv4 CIDR
+        block, None for any other source.
+        prefix_length: An integer giving the prefix length of an IPv4 CIDR
+        block, None for any other source.
+    """
+
+    __slots__ = (
+        "group_id",
+        "ip_protocol",
+        "from_port",
+        "to_port",
+        "source",
+        "network",
+        "prefix_length",
+    )
+
+    def __init__(self, group_id, ip_protocol, from_port, to_port, source):
+        """Initializes instance."""
+        self.group_id = group_id
+        self.ip_protocol = ip_protocol
+        self.from_port = from_port
+        self.to_port = to_port
+        self.source = source
+        if source.startswith(("sg-", "pl-")) or ":" in source:
+            self.network = self.prefix_length = None
+        else:
+            self.network, self.prefix_length = parse_cidr(source)
+
+    def sort_key(self):
+        """Order rules by Security Group, protocol, ports and source."""
+        return (
+            self.group_id,
+            self.ip_protocol,
+            self.from_port,
+            self.to_port,
+            self.source,
+        )
+
+    def allows(self, protocol, port):
+        """Check the rule allows a protocol and port."""
+        return (
+            self.ip_protocol == ALL_PROTOCOLS or self.ip_protocol == protocol
+        ) and self.from_port <= port <= self.to_port
+
+    def overlaps(self, network, prefix_length):
+        """Check the rule's CIDR block contains, or is inside, a CIDR
+        block."""
+        shorter = min(self.prefix_length, prefix_length)
+        mask = (0xFFFFFFFF << (32 - shorter)) & 0xFFFFFFFF
+        return (self.network ^ network) & mask == 0
+
+    def describe(self):
+        """Describe the rule, such as "sg-01 tcp 5432 from 10.0.0.0/8"."""
+        if self.ip_protocol == ALL_PROTOCOLS:
+            allowed = "all"
+        elif (self.from_port, self.to_port) == ALL_PORTS:
+            allowed = f"{self.ip_protocol} all"
+        elif self.from_port == self.to_port:
+            allowed = f"{self.ip_protocol} {self.from_port}"
+        else:
+            allowed = f"{self.ip_protocol} {self.from_port}-{self.to_port}"
+        return f"{self.group_id} {allowed} from {self.source}"
+
+
+def normalise_protocol(ip_protocol):
+    """Convert a protocol number AWS may return to its name."""
+    return _PROTOCOL_NAMES.get(ip_protocol, ip_protocol)
+
+
+def _port_range(permission):
+    """Get the first and last port of a permission, all of them for all
+    protocols or a port of -1."""
+    if permission.ip_protocol == ALL_PROTOCOLS:
+        return ALL_PORTS
+    from_port, to_port = permission.from_port, permission.to_port
+    if from_port is None or from_port < 0:
+        return ALL_PORTS
+    if to_port is None or to_port < 0:
+        return from_port, ALL_PORTS[1]
+    return from_port, to_port
+
+
+class ReachabilityIndex:
+    """Finds the Instances that can receive traffic on a port from a
+    source, in one or more Virtual Private Clouds."""
+
+    def __init__(self, vpcs_resources):
+        """Initializes instance.
+
+        Args:
+            vpcs_resources: An iterable of VPCResources instances, only their
+            vpc, security_groups and instances are used.
+        """
+        self._all_protocols = []
+        by_protocol = {}
+        self._cidrs = CIDRTrie()
+        self._groups = {}
+        # The rules whose sources can not be checked.
+        self._unknown = []
+        self._members = {}
+        addresses = []
+
+        for resources in vpcs_resources:
+            vpc_id = resources.vpc.vpc_id
+            for group in resources.security_groups:
+                for permission in group.ingress:
+                    self._add_permission(
+                        group.group_id, permission, by_protocol
+                    )
+            for instance in resources.instances:
+                for group_id in instance.security_group_ids:
+                    self._members.setdefault(group_id, []).append(
+                        (vpc_id, instance)
+                    )
+                if instance.private_ip_address is not None:
+                    addresses.append(
+                        (
+                            parse_address(instance.private_ip_address),
+                            instance.security_group_ids,
+                        )
+                    )
+
+        self._ports = {
+            protocol: IntervalTree(intervals)
+            for protocol, intervals in by_protocol.items()
+        }
+        addresses.sort(key=lambda entry: entry[0])
+        self._addresses = [address for address, _ in addresses]
+        self._address_groups = [group_ids for _, group_ids in addresses]
+
+    def _add_permission(self, group_id, permission, by_protocol):
+        """Add a rule for each source of an ingress permission."""
+        protocol = normalise_protocol(permission.ip_protocol)
+        from_port, to_port = _port_range(permission)
+        rules = []
+        for cidr_block in permission.ip_ranges:
+            rule = Rule(group_id, protocol, from_port, to_port, cidr_block)
+            self._cidrs.insert(cidr_block, rule)
+            rules.append(rule)
+        for source_id in permission.group_ids:
+            rule = Rule(group_id, protocol, from_port, to_port, source_id)
+            self._groups.setdefault(source_id, []).append(rule)
+            rules.append(rule)
+        for source in permission.ipv6_ranges + permission.prefix_list_ids:
+            self._unknown.append(
+                Rule(group_id, protocol, from_port, to_port, source)
+            )
+
+        if protocol == ALL_PROTOCOLS:
+            self._all_protocols += rules
+        else:
+            by_protocol.setdefault(protocol, []).extend(
+                (from_port, to_port, rule) for rule in rules
+            )
+
+    def query(self, port, source, protocol="tcp"):
+        """Find the Instances that can receive traffic on a port from a
+        source.
+
+        Args:
+            port: An integer giving the destination port.
+            source: A string containing a Security Group Id, an IPv4 CIDR
+            block or an IPv4 address.
+            protocol: A string containing the protocol, such as "tcp".
+
+        Returns:
+            A list of (vpc_id, instance, rules) tuples, ordered by Virtual
+            Private Cloud and Instance Id, rules being a list of the Rules
+            allowing the traffic.
+
+        Raises:
+            ValueError: source is not a Security Group Id, CIDR block or
+            address.
+        """
+        protocol = normalise_protocol(protocol)
+        by_port = self._all_protocols
+        tree = self._ports.get(protocol)
+        if tree is not None:
+            by_port = by_port + tree.stab(port)
+
+        network, prefix_length, group_ids = self._parse_source(source)
+        by_source = []
+        if network is not None:
+            by_source += self._cidrs.overlapping(source_cidr(source))
+        for group_id in sorted(group_ids):
+            by_source += self._groups.get(group_id, ())
+
+        # Walk whichever index found fewer rules, checking the other
+        # condition rule by rule, rather than intersecting two large sets.
+        if len(by_port) <= len(by_source):
+            allowed = [
+                rule
+                for rule in by_port
+                if (
+                    rule.source in group_ids
+                    if rule.network is None
+                    else network is not None
+                    and rule.overlaps(network, prefix_length)
+                )
+            ]
+        else:
+            allowed = [r for r in by_source if r.allows(protocol, port)]
+        return self._group_instances(allowed)
+
+    def query_unknown(self, port, protocol="tcp"):
+        """Find the Instances that rules with IPv6 CIDR block or prefix list
+        sources allow traffic to on a port, from sources that can not be
+        checked.
+
+        Args:
+            port: An integer giving the destination port.
+            protocol: A string containing the protocol, such as "tcp".
+
+        Returns:
+            A list of (vpc_id, instance, rules) tuples, as query gives.
+        """
+        protocol = normalise_protocol(protocol)
+        return self._group_instances(
+            [rule for rule in self._unknown if rule.allows(protocol, port)]
+        )
+
+    def _group_instances(self, allowed):
+        """Get the (vpc_id, instance, rules) tuples of the Instances in the
+        Security Groups of some rules."""
+        by_group = {}
+        for rule in allowed:
+            by_group.setdefault(rule.group_id, []).append(rule)
+
+        # Groups are visited in order, so an Instance's rules end up sorted
+        # by Security Group without sorting them per Instance.
+        reachable = {}
+        for group_id in sorted(by_group):
+            rules = sorted(by_group[group_id], key=Rule.sort_key)
+            for vpc_id, instance in self._members.get(group_id, ()):
+                key = (vpc_id, instance.instance_id)
+                if key in reachable:
+                    reachable[key][2].extend(rules)
+                else:
+                    reachable[key] = (vpc_id, instance, list(rules))
+
+        return [reachable[key] for key in sorted(reachable)]
+
+    def _parse_source(self, source):
+        """Get the network address and prefix length of a CIDR block or
+        address, None for a Security Group, and the set of Security Group
+        Ids the source is, or has Instances inside it."""
+        if source.startswith("sg-"):
+            return None, None, {source}
+
+        network, prefix_length = parse_cidr(source_cidr(source))
+        last = network | (0xFFFFFFFF >> prefix_length)
+        start = bisect_left(self._addresses, network)
+        end = bisect_right(self._addresses, last)
+        group_ids = {
+            group_id
+            for group_ids in self._address_groups[start:end]
+            for group_id in group_ids
+        }
+        return network, prefix_length, group_ids
+
+    def iter_query_lines(self, port, source, protocol="tcp"):
+        """Describe the Instances that can receive traffic on a port from a
+        source, see query.
+
+        Yields:
+            Strings containing the Virtual Private Cloud Id, Instance Id,
+            Name if any and private IP address of each Instance, and the
+            rules allowing the traffic.  Then the same for the Instances
+            rules with IPv6 or prefix list sources allow the port to, with
+            "unknown" before the rules, see query_unknown.
+        """
+        for vpc_id, instance, rules in self.query(port, source, protocol):
+            yield _describe_result(vpc_id, instance, rules)
+        for vpc_id, instance, rules in self.query_unknown(port, protocol):
+            yield _describe_result(vpc_id, instance, rules, "unknown")
+
+
+def _describe_result(vpc_id, instance, rules, status=None):
+    """Describe an Instance and the rules allowing traffic to it as fields
+    separated by " : "."""
+    fields = [vpc_id, instance.instance_id]
+    if instance.name is not None:
+        fields.append(instance.name)
+    fields.append(instance.private_ip_address or "no address")
+    if status is not None:
+        fields.append(status)
+    fields.append(", ".join(rule.describe() for rule in rules))
+    return " : ".join(fields)
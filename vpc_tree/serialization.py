@@ -0,0 +1,53 @@
+# serialization.py
+"""Helper functions to convert the data structures returned by Boto3 to and
+from JSON.
+
+Boto3 returns timestamps such as an Instance's LaunchTime as datetime
+objects, which JSON has no type for.  They are stored as an object with a
+single "__datetime__" key holding the ISO 8601 string.
+"""
+
+import json
+from datetime import datetime
+
+DATETIME_KEY = "__datetime__"
+
+
+def dumps(value):
+    """Convert Boto3 data to a compact JSON string.
+
+    Args:
+        value: A list, dictionary or other value returned by Boto3.
+
+    Returns:
+        A string containing JSON.
+    """
+    return json.dumps(value, separators=(",", ":"), default=_encode)
+
+
+def loads(text):
+    """Convert a JSON string created by dumps back to Boto3 data.
+
+    Args:
+        text: A string or bytes containing JSON.
+
+    Returns:
+        The list, dictionary or other value that was converted by dumps.
+    """
+    return json.loads(text, object_hook=_decode)
+
+
+def _encode(value):
+    """Convert values the json module does not support."""
+    if isinstance(value, datetime):
+        return {DATETIME_KEY: value.isoformat()}
+    raise TypeError(
+        f"Object of type {type(value).__name__} is not JSON serializable"
+    )
+
+
+def _decode(dictionary):
+    """Convert dictionaries created by _encode back to their values."""
+    if len(dictionary) == 1 and DATETIME_KEY in dictionary:
+        return datetime.fromisoformat(dictionary[DATETIME_KEY])
+    return dictionary
@@ -1,26 +1,30 @@
 # sg_tree.py
 """VPC Tree application's Security Group functionality."""
 
+from operator import attrgetter
+
 from .prefix import get_prefix
-from .text_tree import add_tree
+from .text_tree import cache_item_function, iter_node, iter_tree
 
 
 class SGTree:
     """Generates a text tree representation of AWS Security Groups.
 
     Attributes:
-        security_groups: A list of dictionaries containing Security Groups
-        from Boto3.
+        security_groups: A list of model.SecurityGroup instances.
+        render_cache: A text_tree.RenderCache reusing the lines of unchanged
+        Security Groups, None to generate every line.
     """
 
-    def __init__(self, security_groups):
+    def __init__(self, security_groups, render_cache=None):
         """Initializes instance.
 
         Args:
-            security_groups: A list of dictionaries containing Security Groups
-            from Boto3.
+            security_groups: A list of model.SecurityGroup instances.
+            render_cache: A text_tree.RenderCache, None to not cache lines.
         """
         self.security_groups = security_groups
+        self.render_cache = render_cache
 
     def generate(self, text_tree, prefix_description):
         """Generate a text based tree describing the Security Groups.
@@ -30,77 +34,75 @@ class SGTree:
             prefix_description: A list of booleans describing a common prefix
             to be added to all strings is this text tree.
         """
-        add_tree(
-            text_tree,
+        text_tree.extend(self.iter_lines(prefix_description))
+
+    def iter_lines(self, prefix_description):
+        """Generate the lines of a text based tree describing the Security
+        Groups.
+
+        Args:
+            prefix_description: A list of booleans describing a common prefix
+            to be added to all strings is this text tree.
+
+        Yields:
+            Strings containing the lines of the tree.
+        """
+        yield from iter_tree(
             prefix_description,
             "Security Groups:",
             self.security_groups,
-            self._add_sg_tree,
+            cache_item_function(
+                self.render_cache, self._iter_sg_tree, attrgetter("group_id")
+            ),
         )
 
-    def _add_sg_tree(self, text_tree, prefix_description, sg):
-        """Adds tree describing Security Group to text_tree."""
-        id = sg["GroupId"]
-        name = sg["GroupName"]
-        text_tree.append(f"{get_prefix(prefix_description)}{id} : {name}")
+    def _iter_sg_tree(self, prefix_description, sg):
+        """Generates tree describing Security Group."""
+        id = sg.group_id
+        name = sg.group_name
+        yield f"{get_prefix(prefix_description)}{id} : {name}"
 
-        add_tree(
-            text_tree,
+        yield from iter_tree(
             prefix_description + [False],
             "Ingress Permissions:",
-            sg["IpPermissions"],
-            self._add_permission_tree,
+            sg.ingress,
+            self._iter_permission_tree,
         )
 
-        add_tree(
-            text_tree,
+        yield from iter_tree(
             prefix_description + [True],
             "Egress Permissions:",
-            sg["IpPermissionsEgress"],
-            self._add_permission_tree,
+            sg.egress,
+            self._iter_permission_tree,
         )
 
-    def _add_permission_tree(self, text_tree, prefix_description, permission):
-        """Adds tree describing Security Group Permission to text_tree."""
+    def _iter_permission_tree(self, prefix_description, permission):
+        """Generates tree describing Security Group Permission."""
         prefix = get_prefix(prefix_description)
-        protocol = permission["IpProtocol"]
+        protocol = permission.ip_protocol
         if protocol != "-1":
-            from_port = permission["FromPort"]
-            to_port = permission["ToPort"]
-            text_tree.append(f"{prefix}{protocol} : {from_port} : {to_port}")
+            from_port = permission.from_port
+            to_port = permission.to_port
+            yield f"{prefix}{protocol} : {from_port} : {to_port}"
         else:
-            text_tree.append(f"{prefix}All")
+            yield f"{prefix}All"
 
-        ip_ranges = permission["IpRanges"]
-        user_id_group_pairs = permission["UserIdGroupPairs"]
+        ip_ranges = permission.ip_ranges
+        group_ids = permission.group_ids
 
         if len(ip_ranges) > 0:
-            is_last_sub_tree = len(user_id_group_pairs) == 0
-            add_tree(
-                text_tree,
+            is_last_sub_tree = len(group_ids) == 0
+            yield from iter_tree(
                 prefix_description + [is_last_sub_tree],
                 "IP Ranges:",
                 ip_ranges,
-                self._add_ip_range_node,
+                iter_node,
             )
 
-        if len(user_id_group_pairs) > 0:
-            add_tree(
-                text_tree,
+        if len(group_ids) > 0:
+            yield from iter_tree(
                 prefix_description + [True],
                 "Security Groups:",
-                user_id_group_pairs,
-                self._add_sg_node,
+                group_ids,
+                iter_node,
             )
-
-    def _add_ip_range_node(self, text_tree, prefix_description, ip_range):
-        """Adds IP Range of Permission to text_tree."""
-        text_tree.append(
-            f"{get_prefix(prefix_description)}{ip_range['CidrIp']}"
-        )
-
-    def _add_sg_node(self, text_tree, prefix_description, group_pair):
-        """Adds Security Group Id of Permission to text_tree."""
-        text_tree.append(
-            f"{get_prefix(prefix_description)}{group_pair['GroupId']}"
-        )
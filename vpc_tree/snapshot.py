@@ -0,0 +1,211 @@
+# snapshot.py
+"""VPC Tree application's functionality to save the resources fetched for
+Virtual Private Clouds to a snapshot file and load them again later.
+
+A snapshot is a gzip compressed JSON lines file.  The first line is a
+header...
+    {"format": "vpc_tree.snapshot", "version": 1, "created": "..."}
+Every other line is a record holding one resource...
+    {"vpc_id": "vpc-...", "type": "subnets", "data": {...}}
+The "vpc" record for a Virtual Private Cloud comes right before the records
+of the resources linked to it.
+
+Records hold the fields of the compact model classes in Boto3's shape.
+Snapshots are read one line at a time, each record projected onto its model
+class as it is read, and iter_snapshot yields each Virtual Private Cloud as
+soon as its records end, so reading never holds more than one Virtual
+Private Cloud's resources in memory, and neither Boto3 nor AWS credentials
+are needed to render a tree from one.
+"""
+
+import gzip
+import zlib
+from datetime import datetime, timezone
+
+from . import __version__, serialization
+from .fetch import VPCResources
+from .model import MODEL_CLASSES
+
+SNAPSHOT_FORMAT = "vpc_tree.snapshot"
+SNAPSHOT_VERSION = 1
+
+RESOURCE_TYPES = (
+    "security_groups",
+    "subnets",
+    "instances",
+    "load_balancers",
+    "auto_scaling_groups",
+    "target_groups",
+)
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a snapshot this version can read."""
+
+
+def save_snapshot(path, vpcs_resources):
+    """Save the resources of Virtual Private Clouds to a snapshot file.
+
+    Args:
+        path: A string containing the path of the snapshot file.
+        vpcs_resources: An iterable of VPCResources instances.
+    """
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "vpc_tree_version": __version__,
+    }
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        file.write(serialization.dumps(header) + "\n")
+        for resources in vpcs_resources:
+            for record in _records(resources):
+                file.write(serialization.dumps(record) + "\n")
+
+
+def iter_records(path):
+    """Read the records in a snapshot file one at a time.
+
+    Args:
+        path: A string containing the path of the snapshot file.
+
+    Yields:
+        Tuples of the Virtual Private Cloud Id, resource type and a
+        dictionary containing the resource from Boto3.
+
+    Raises:
+        SnapshotError: The file is not a snapshot, its version is not
+        supported, or it is truncated or corrupt.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        lines = _iter_lines(file)
+        _check_header(next(lines, ""))
+        for number, line in enumerate(lines, 2):
+            try:
+                record = serialization.loads(line)
+                vpc_id, resource_type = record["vpc_id"], record["type"]
+                data = record["data"]
+            except (ValueError, KeyError, TypeError):
+                raise SnapshotError(f"line {number} is not a snapshot record")
+            yield vpc_id, resource_type, data
+
+
+def iter_snapshot(path, vpc_ids=None):
+    """Read the resources of Virtual Private Clouds from a snapshot file one
+    Virtual Private Cloud at a time.
+
+    Args:
+        path: A string containing the path of the snapshot file.
+        vpc_ids: A collection of strings containing the Ids of the Virtual
+        Private Clouds to read, None to read all of them.
+
+    Yields:
+        VPCResources instances, in the order they were saved, each as soon
+        as the records of the next Virtual Private Cloud start.
+
+    Raises:
+        SnapshotError: The file is not a snapshot, its version is not
+        supported, it is truncated or corrupt, or a record is not right
+        after the "vpc" record of its Virtual Private Cloud.
+    """
+    # The Id of the Virtual Private Cloud whose records are being read, and
+    # its resources, None when it was not selected.
+    current_id = None
+    resources = None
+    for vpc_id, resource_type, data in iter_records(path):
+        if resource_type == "vpc":
+            if resources is not None:
+                yield resources
+            current_id = vpc_id
+            resources = None
+            if vpc_ids is None or vpc_id in vpc_ids:
+                resources = VPCResources(
+                    _project(resource_type, data),
+                    **{name: [] for name in RESOURCE_TYPES},
+                )
+            continue
+
+        if vpc_id != current_id:
+            raise SnapshotError(
+                f"{resource_type} record of {vpc_id} is not after its vpc "
+                "record"
+            )
+        if resources is not None:
+            getattr(resources, resource_type).append(
+                _project(resource_type, data)
+            )
+
+    if resources is not None:
+        yield resources
+
+
+def load_snapshot(path, vpc_ids=None):
+    """Load the resources of Virtual Private Clouds from a snapshot file.
+
+    Args:
+        path: A string containing the path of the snapshot file.
+        vpc_ids: A collection of strings containing the Ids of the Virtual
+        Private Clouds to load, None to load all of them.
+
+    Returns:
+        A dictionary mapping Virtual Private Cloud Ids to VPCResources
+        instances, in the order they were saved.
+
+    Raises:
+        SnapshotError: See iter_snapshot.
+    """
+    return {
+        resources.vpc.vpc_id: resources
+        for resources in iter_snapshot(path, vpc_ids)
+    }
+
+
+def _records(resources):
+    """Create the snapshot records describing a VPCResources instance."""
+    vpc_id = resources.vpc.vpc_id
+    yield {"vpc_id": vpc_id, "type": "vpc", "data": resources.vpc.to_boto3()}
+    for resource_type in RESOURCE_TYPES:
+        for resource in getattr(resources, resource_type):
+            data = resource.to_boto3()
+            yield {"vpc_id": vpc_id, "type": resource_type, "data": data}
+
+
+def _iter_lines(file):
+    """Read the lines of a gzip compressed snapshot, raising SnapshotError
+    when it is not gzip compressed text, or is truncated or corrupt."""
+    read = False
+    try:
+        for line in file:
+            read = True
+            yield line
+    except (EOFError, gzip.BadGzipFile, UnicodeDecodeError, zlib.error):
+        if not read:
+            raise SnapshotError("not a VPC Tree snapshot")
+        raise SnapshotError("snapshot is truncated or corrupt")
+
+
+def _project(resource_type, data):
+    """Project the data of a record onto its model class, raising
+    SnapshotError when it does not fit."""
+    model_class = MODEL_CLASSES.get(resource_type)
+    if model_class is None:
+        raise SnapshotError(f"unknown record type {resource_type}")
+    try:
+        return model_class.from_boto3(data)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise SnapshotError(f"{resource_type} record is not valid")
+
+
+def _check_header(line):
+    """Raise SnapshotError unless line is a supported snapshot header."""
+    try:
+        header = serialization.loads(line)
+    except ValueError:
+        header = None
+
+    if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError("not a VPC Tree snapshot")
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(
+            f"unsupported snapshot version {header.get('version')}"
+        )
@@ -1,10 +1,12 @@
 # subnet_tree.ph
 """VPC Tree application's Subnet functionality."""
 
+from operator import attrgetter
+
+from .ipv4 import parse_cidr
+from .model import group_instances_by_subnet
 from .prefix import get_prefix
-from .tags import get_tag_value
-from .text_tree import add_tree
-from .aws_resources import filter_instances_by_subnet
+from .text_tree import cache_item_function, iter_node, iter_tree
 
 
 class SubnetTree:
@@ -12,19 +14,26 @@ class SubnetTree:
     Instances.
 
     Attributes:
-        subnets: A list of dictionaries containing Subnets from Boto3.
-        instances: A list of dictionaries containing Instances from Boto3.
+        subnets: A list of model.Subnet instances.
+        instances: A list of model.Instance instances.
+        instances_by_subnet: A dictionary mapping Subnet Ids to lists of
+        the Instances in them, sorted by private IP address.
+        render_cache: A text_tree.RenderCache reusing the lines of unchanged
+        Subnets and Instances, None to generate every line.
     """
 
-    def __init__(self, subnets, instances):
+    def __init__(self, subnets, instances, render_cache=None):
         """Initializes instance.
 
         Args:
-            subnets: A list of dictionaries containing Subnets from Boto3.
-            instances: A list of dictionaries containing Instances from Boto3.
+            subnets: A list of model.Subnet instances.
+            instances: A list of model.Instance instances.
+            render_cache: A text_tree.RenderCache, None to not cache lines.
         """
         self.subnets = subnets
         self.instances = instances
+        self.instances_by_subnet = group_instances_by_subnet(instances)
+        self.render_cache = render_cache
 
     def generate(self, text_tree, prefix_description):
         """Generate a text based tree describing the Subnets and Instances.
@@ -34,71 +43,84 @@ class SubnetTree:
             prefix_description: A list of booleans describing a common prefix
             to be added to all strings is this text tree.
         """
+        text_tree.extend(self.iter_lines(prefix_description))
+
+    def iter_lines(self, prefix_description):
+        """Generate the lines of a text based tree describing the Subnets and
+        Instances.
+
+        Args:
+            prefix_description: A list of booleans describing a common prefix
+            to be added to all strings is this text tree.
+
+        Yields:
+            Strings containing the lines of the tree.
+        """
         self.subnets = sorted(
-            self.subnets, key=lambda x: x["CidrBlock"]
+            self.subnets, key=lambda x: parse_cidr(x.cidr_block)
         )
 
-        add_tree(
-            text_tree,
+        yield from iter_tree(
             prefix_description,
             "Subnets:",
             self.subnets,
-            self._add_subnet_tree,
+            cache_item_function(
+                self.render_cache,
+                self._iter_subnet_tree,
+                attrgetter("subnet_id"),
+                self._subnet_content,
+            ),
         )
 
-    def _add_subnet_tree(self, text_tree, prefix_description, subnet):
-        """Adds tree describing Subnet to text_tree."""
+    def _subnet_content(self, subnet):
+        """Get the Subnet and the Instances in it, which its lines depend
+        on."""
+        return subnet, self.instances_by_subnet.get(subnet.subnet_id, [])
+
+    def _iter_subnet_tree(self, prefix_description, subnet):
+        """Generates tree describing Subnet."""
         prefix = get_prefix(prefix_description)
-        id = subnet["SubnetId"]
-        name = get_tag_value(subnet, "Name")
-        az = subnet["AvailabilityZone"]
-        cidr = subnet["CidrBlock"]
+        id = subnet.subnet_id
+        name = subnet.name
+        az = subnet.availability_zone
+        cidr = subnet.cidr_block
 
         if name is None:
-            text_tree.append(f"{prefix}{id} : {az} : {cidr}")
+            yield f"{prefix}{id} : {az} : {cidr}"
         else:
-            text_tree.append(f"{prefix}{id} : {name} : {az} : {cidr}")
+            yield f"{prefix}{id} : {name} : {az} : {cidr}"
 
-        instances = filter_instances_by_subnet(self.instances, id)
+        instances = self.instances_by_subnet.get(id, [])
         if len(instances) > 0:
-            instances = sorted(instances, key=lambda x: x["PrivateIpAddress"])
-            add_tree(
-                text_tree,
+            yield from iter_tree(
                 prefix_description + [True],
                 "Instances:",
                 instances,
-                self._add_instance_tree,
+                cache_item_function(
+                    self.render_cache,
+                    self._iter_instance_tree,
+                    attrgetter("instance_id"),
+                ),
             )
 
-    def _add_instance_tree(self, text_tree, prefix_description, instance):
-        """Adds tree describing Instance in Subnet to text_tree."""
+    def _iter_instance_tree(self, prefix_description, instance):
+        """Generates tree describing Instance in Subnet."""
         prefix = get_prefix(prefix_description)
-        id = instance["InstanceId"]
-        name = get_tag_value(instance, "Name")
-        image = instance["ImageId"]
-        type = instance["InstanceType"]
-        state = instance["State"]["Name"]
-        ip = instance["PrivateIpAddress"]
+        id = instance.instance_id
+        name = instance.name
+        image = instance.image_id
+        type = instance.instance_type
+        state = instance.state
+        ip = instance.private_ip_address
 
         if name is None:
-            text_tree.append(
-                f"{prefix}{id} : {image} : {type} : {state} : {ip}"
-            )
+            yield f"{prefix}{id} : {image} : {type} : {state} : {ip}"
         else:
-            text_tree.append(
-                f"{prefix}{id} : {name} : {image} : {type} : {state} : {ip}"
-            )
+            yield f"{prefix}{id} : {name} : {image} : {type} : {state} : {ip}"
 
-        add_tree(
-            text_tree,
+        yield from iter_tree(
             prefix_description + [True],
             "SecurityGroups:",
-            instance["SecurityGroups"],
-            self._add_sg_node,
-        )
-
-    def _add_sg_node(self, text_tree, prefix_description, security_group):
-        """Adds Id of Security Group linked to Instance to text_tree."""
-        text_tree.append(
-            f"{get_prefix(prefix_description)}{security_group['GroupId']}"
+            instance.security_group_ids,
+            iter_node,
         )
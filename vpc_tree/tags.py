@@ -1,6 +1,13 @@
 # tags.py
 """Helper functions to access information in AWS resource Tags in the data
-structures returned by Boto3."""
+structures returned by Boto3, and an inverted index of the tags of model
+resources.
+
+Model resources hold their tags in a dictionary built once when they are
+projected, so looking up one of their tags is a dictionary lookup.  A
+TagIndex maps each (key, value) tag to the Ids of the resources carrying it,
+so the resources with a tag can be found without scanning every resource.
+"""
 
 
 def get_tag(resource, key):
@@ -40,3 +47,77 @@ def get_tag_value(resource, key):
         return tag["Value"]
     else:
         return None
+
+
+class TagIndex:
+    """An inverted index from (key, value) tags to resource Ids."""
+
+    def __init__(self):
+        """Initializes instance."""
+        self._index = {}
+
+    def add(self, resource_id, tags):
+        """Index the tags of a resource.
+
+        Args:
+            resource_id: A string containing the Id of the resource.
+            tags: A dictionary mapping the resource's tag keys to values.
+        """
+        for tag in tags.items():
+            self._index.setdefault(tag, set()).add(resource_id)
+
+    def get(self, key, value):
+        """Get the Ids of the resources with a tag.
+
+        Args:
+            key: A string containing the tag's key.
+            value: A string containing the tag's value.
+
+        Returns:
+            A set of strings containing resource Ids, empty if no resource
+            has the tag.
+        """
+        return self._index.get((key, value), set())
+
+    def match(self, tags):
+        """Get the Ids of the resources matching tags, as EC2 tag filters
+        do.
+
+        Args:
+            tags: A dictionary mapping tag keys to lists of values, a
+            resource matches a key when it has any of the values and must
+            match every key.
+
+        Returns:
+            A set of strings containing resource Ids.
+        """
+        matched = None
+        for key, values in tags.items():
+            ids = set()
+            for value in values:
+                ids |= self.get(key, value)
+            matched = ids if matched is None else matched & ids
+        return set() if matched is None else matched
+
+    def keys(self):
+        """Get the tag keys in the index.
+
+        Returns:
+            A sorted list of strings containing the tag keys.
+        """
+        return sorted({key for key, _ in self._index})
+
+
+def index_tags(resources):
+    """Build a TagIndex of model resources.
+
+    Args:
+        resources: An iterable of model.Tagged instances.
+
+    Returns:
+        A TagIndex.
+    """
+    index = TagIndex()
+    for resource in resources:
+        index.add(resource.resource_id, resource.tags)
+    return index
@@ -1,9 +1,157 @@
 # text_tree.py
-"""Helper functions to create a generic text based tree."""
+"""Helper functions to create a generic text based tree.
+
+Trees are generated one line at a time by the iter_ functions, so a tree
+can be written out as it is generated without holding every line in
+memory.  The add_ functions build the same tree in a list of strings.
+
+A RenderCache keeps the lines generated for each item, so a tree generated
+again from mostly unchanged resources only runs the item functions of the
+items that changed.
+"""
 
 from .prefix import get_prefix
 
 
+def iter_tree(prefix_description, heading, items, item_function):
+    """Generate the lines of a tree.
+
+    Args:
+        prefix_description: A list of booleans describing a common prefix to
+        be added to all strings is this text tree.
+        heading: A string containing a heading to give this tree.
+        items: A list of dictionaries containing AWS resources.
+        item_function: a generator function that takes a prefix description
+        and a dictionary from items and yields the lines describing it.  The
+        same prefix description list is passed for every item but the last,
+        so item_function must not modify it.
+
+    Yields:
+        Strings containing the lines of the tree.
+    """
+    yield f"{get_prefix(prefix_description)}{heading}"
+    item_count = len(items)
+    if item_count == 0:
+        return
+
+    more_items_prefix = prefix_description + [False]
+    for i in range(item_count - 1):
+        yield from item_function(more_items_prefix, items[i])
+    yield from item_function(prefix_description + [True], items[-1])
+
+
+def iter_node(prefix_description, string):
+    """Generate the line of a node.
+
+    Args:
+        prefix_description: A list of booleans describing the prefix to be
+        added to this node.
+        string: A string describing the node.
+
+    Yields:
+        A string containing the line of the node.
+    """
+    yield f"{get_prefix(prefix_description)}{string}"
+
+
+class RenderCache:
+    """Caches the lines item functions generate for the items of trees.
+
+    Lines are keyed by the item function, the prefix description and a key
+    identifying the item, such as its Id, and kept with the item's content.
+    They are reused while the content compares equal, so the item function
+    only runs again when the item changed or moved.  Item functions can be
+    nested, an entry remembers the items generated inside it so they are
+    kept while it is reused.
+
+    Attributes:
+        hits: An integer giving the number of items whose lines were reused.
+        misses: An integer giving the number of items generated.
+    """
+
+    def __init__(self):
+        """Initializes instance."""
+        self._entries = {}
+        self._used = {}
+        # The keys generated inside each item being generated, None until
+        # there are any.
+        self._inside = []
+        self.hits = 0
+        self.misses = 0
+
+    def wrap(self, item_function, key_function, content_function=None):
+        """Wrap an item function to reuse the lines cached for an item.
+
+        Args:
+            item_function: A generator function taking a prefix description
+            and an item, see iter_tree.
+            key_function: A function taking an item and returning a hashable
+            key identifying it among the items item_function generates.
+            content_function: A function taking an item and returning
+            everything the lines generated for it depend on, None when they
+            only depend on the item itself.
+
+        Returns:
+            A generator function taking a prefix description and an item.
+        """
+        name = item_function.__qualname__
+
+        def cached_item_function(prefix_description, item):
+            if content_function is None:
+                content = item
+            else:
+                content = content_function(item)
+            key = (name, tuple(prefix_description), key_function(item))
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == content:
+                self.hits += 1
+                self._keep(key, entry)
+            else:
+                self.misses += 1
+                self._inside.append(None)
+                try:
+                    lines = tuple(item_function(prefix_description, item))
+                finally:
+                    inside = self._inside.pop()
+                entry = (content, lines, inside)
+                self._used[key] = entry
+            if self._inside:
+                if self._inside[-1] is None:
+                    self._inside[-1] = [key]
+                else:
+                    self._inside[-1].append(key)
+            yield from entry[1]
+
+        return cached_item_function
+
+    def _keep(self, key, entry):
+        """Keep an entry and the entries of the items inside it."""
+        self._used[key] = entry
+        for inside_key in entry[2] or ():
+            inside_entry = self._entries.get(inside_key)
+            if inside_entry is not None:
+                self._keep(inside_key, inside_entry)
+
+    def sweep(self):
+        """Forget the items that were not generated since the last sweep,
+        call after generating each tree."""
+        self._entries = self._used
+        self._used = {}
+
+
+def cache_item_function(
+    render_cache, item_function, key_function, content_function=None
+):
+    """Wrap an item function with a RenderCache, see RenderCache.wrap.
+
+    Returns:
+        The wrapped item function, item_function when render_cache is None.
+    """
+    if render_cache is None:
+        return item_function
+    return render_cache.wrap(item_function, key_function, content_function)
+
+
 def add_tree(text_tree, prefix_description, heading, items, item_function):
     """Add tree description to a list of strings.
 
@@ -1,26 +1,30 @@
 # tg_tree.py
 """VPC Tree application's Target Group functionality."""
 
+from operator import attrgetter
+
 from .prefix import get_prefix
-from .text_tree import add_node, add_tree
+from .text_tree import cache_item_function, iter_node, iter_tree
 
 
 class TGTree:
     """Generates a text tree representation of AWS Target Groups.
 
     Attributes:
-        target_groups: A list of dictionaries containing Target Groups from
-        Boto3.
+        target_groups: A list of model.TargetGroup instances.
+        render_cache: A text_tree.RenderCache reusing the lines of unchanged
+        Target Groups, None to generate every line.
     """
 
-    def __init__(self, target_groups):
+    def __init__(self, target_groups, render_cache=None):
         """Initializes instance.
 
         Args:
-            target_groups: A list of dictionaries containing Target Groups from
-            Boto3.
+            target_groups: A list of model.TargetGroup instances.
+            render_cache: A text_tree.RenderCache, None to not cache lines.
         """
         self.target_groups = target_groups
+        self.render_cache = render_cache
 
     def generate(self, text_tree, prefix_description):
         """Generate a text based tree describing the Target Groups.
@@ -30,28 +34,40 @@ class TGTree:
             prefix_description: A list of booleans describing a common prefix
             to be added to all strings is this text tree.
         """
+        text_tree.extend(self.iter_lines(prefix_description))
+
+    def iter_lines(self, prefix_description):
+        """Generate the lines of a text based tree describing the Target
+        Groups.
 
-        add_tree(
-            text_tree,
+        Args:
+            prefix_description: A list of booleans describing a common prefix
+            to be added to all strings is this text tree.
+
+        Yields:
+            Strings containing the lines of the tree.
+        """
+        yield from iter_tree(
             prefix_description,
             "Target Groups:",
             self.target_groups,
-            self._add_tg_tree,
+            cache_item_function(
+                self.render_cache, self._iter_tg_tree, attrgetter("arn")
+            ),
         )
 
-    def _add_tg_tree(self, text_tree, prefix_description, target_group):
-        """Adds tree describing Target Group to text_tree."""
-        arn = target_group["TargetGroupArn"]
-        name = target_group["TargetGroupName"]
+    def _iter_tg_tree(self, prefix_description, target_group):
+        """Generates tree describing Target Group."""
+        arn = target_group.arn
+        name = target_group.name
         prefix = get_prefix(prefix_description)
-        text_tree.append(f"{prefix}{arn} : {name}")
+        yield f"{prefix}{arn} : {name}"
 
-        load_balancer_arns = target_group["LoadBalancerArns"]
+        load_balancer_arns = target_group.load_balancer_arns
         if len(load_balancer_arns) > 0:
-            add_tree(
-                text_tree,
+            yield from iter_tree(
                 prefix_description + [True],
                 "Load Balancers:",
                 load_balancer_arns,
-                add_node,
+                iter_node,
             )
@@ -0,0 +1,326 @@
+# trace.py
+"""VPC Tree application's tracing of AWS calls and rendering.
+
+A Tracer hooks into the botocore events of every shared client and records
+one event per API call, with its service, operation, page number, latency,
+retries, throttles and response size.  Spans record how long other steps,
+such as generating each section of a tree, took, and iter_span counts only
+the time spent generating items, not consuming them.
+
+Traces are written in the Chrome trace event format, which opens in
+chrome://tracing or https://ui.perfetto.dev, and can be summarised as a
+table of timings.
+
+Tracing is off until enable is called, and span does nothing while it is
+off.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from . import clients
+from .clients import is_throttling_response
+
+PAGINATION_TOKENS = ("NextToken", "Marker")
+
+_CONTEXT_KEY = "vpc_tree_trace"
+
+
+class Tracer:
+    """Records trace events.
+
+    Attributes:
+        events: A list of dictionaries containing Chrome trace events, with
+        times in microseconds since the Tracer was created.
+    """
+
+    def __init__(self):
+        """Initializes instance."""
+        self.events = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._local = threading.local()
+        self._thread_ids = {}
+
+    def instrument(self, client):
+        """Register handlers recording the API calls made by a client.
+
+        Args:
+            client: A Boto3 client.
+        """
+        events = client.meta.events
+        events.register("before-parameter-build.*.*", self._before_call)
+        events.register("needs-retry.*.*", self._needs_retry)
+        events.register("after-call.*.*", self._after_call)
+        events.register("after-call-error.*.*", self._after_call_error)
+
+    @contextmanager
+    def span(self, name, category="vpc_tree", **args):
+        """Context manager recording how long its body takes.
+
+        Args:
+            name: A string naming the span.
+            category: A string grouping similar spans.
+            args: Values to show with the span.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_event(name, category, start, time.perf_counter(), args)
+
+    def iter_span(self, name, iterable, category="vpc_tree", **args):
+        """Record how long generating the items of an iterable takes.
+
+        Only the time spent getting each item is counted, not the time
+        the consumer spends between items, so the span starts with the
+        first item and lasts as long as generating them all.
+
+        Args:
+            name: A string naming the span.
+            iterable: An iterable to generate the items of.
+            category: A string grouping similar spans.
+            args: Values to show with the span.
+
+        Yields:
+            The items of iterable.
+        """
+        iterator = iter(iterable)
+        start = time.perf_counter()
+        busy = 0.0
+        try:
+            while True:
+                item_start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    busy += time.perf_counter() - item_start
+                yield item
+        finally:
+            self._add_event(name, category, start, start + busy, args)
+
+    def write(self, path):
+        """Write the trace events to a Chrome trace event JSON file.
+
+        Args:
+            path: A string containing the path of the file.
+        """
+        with self._lock:
+            events = list(self.events)
+            thread_ids = dict(self._thread_ids)
+
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for name, tid in thread_ids.items()
+        ]
+        with open(path, "w") as file:
+            json.dump(
+                {"traceEvents": metadata + events, "displayTimeUnit": "ms"},
+                file,
+            )
+
+    def summary(self):
+        """Summarise the trace events by name.
+
+        Returns:
+            A list of dictionaries, one per category and name, with the
+            count, total and maximum milliseconds, and for API calls the
+            retries, throttles and bytes received.
+        """
+        rows = {}
+        with self._lock:
+            events = list(self.events)
+
+        for event in events:
+            key = (event["cat"], event["name"])
+            row = rows.setdefault(
+                key,
+                {
+                    "category": event["cat"],
+                    "name": event["name"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "retries": 0,
+                    "throttles": 0,
+                    "bytes": 0,
+                },
+            )
+            ms = event["dur"] / 1000
+            row["count"] += 1
+            row["total_ms"] += ms
+            row["max_ms"] = max(row["max_ms"], ms)
+            for counter in ("retries", "throttles", "bytes"):
+                row[counter] += event["args"].get(counter, 0)
+
+        return sorted(rows.values(), key=lambda x: -x["total_ms"])
+
+    def write_summary(self, file):
+        """Write the summary as a table.
+
+        Args:
+            file: A text file to write the table to.
+        """
+        file.write(
+            f"{'name':<44} {'count':>6} {'total ms':>10} {'max ms':>9} "
+            f"{'retries':>7} {'throttle':>8} {'KiB':>8}\n"
+        )
+        for row in self.summary():
+            file.write(
+                f"{row['name']:<44} {row['count']:>6} "
+                f"{row['total_ms']:>10.1f} {row['max_ms']:>9.1f} "
+                f"{row['retries']:>7} {row['throttles']:>8} "
+                f"{row['bytes'] / 1024:>8.1f}\n"
+            )
+
+    def _add_event(self, name, category, start, end, args):
+        """Record a complete event."""
+        thread = threading.current_thread()
+        with self._lock:
+            tid = self._thread_ids.setdefault(
+                thread.name, len(self._thread_ids) + 1
+            )
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start - self._start) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": 1,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+
+    def _page_number(self, operation, params):
+        """Count the pages of the paginated call made on this thread."""
+        pages = getattr(self._local, "pages", None)
+        if pages is None:
+            pages = self._local.pages = {}
+
+        if any(token in params for token in PAGINATION_TOKENS):
+            pages[operation] = pages.get(operation, 0) + 1
+        else:
+            pages[operation] = 1
+        return pages[operation]
+
+    def _before_call(self, params, model, context, **kwargs):
+        """Start recording an API call."""
+        service = model.service_model.service_name
+        context[_CONTEXT_KEY] = {
+            "start": time.perf_counter(),
+            "service": service,
+            "operation": model.name,
+            "page": self._page_number((service, model.name), params),
+            "throttles": 0,
+        }
+
+    def _needs_retry(self, response, request_dict, **kwargs):
+        """Count throttled attempts."""
+        call = request_dict.get("context", {}).get(_CONTEXT_KEY)
+        if call is not None and is_throttling_response(response):
+            call["throttles"] += 1
+
+    def _after_call(self, http_response, parsed, context, **kwargs):
+        """Finish recording an API call that got a response, marking it as
+        an error when the response is one."""
+        metadata = parsed.get("ResponseMetadata", {})
+        size = http_response.headers.get("content-length")
+        if size is None:
+            # Stubbed responses have no body to measure.
+            has_body = http_response.raw is not None
+            size = len(http_response.content) if has_body else 0
+        args = {
+            "retries": metadata.get("RetryAttempts", 0),
+            "bytes": int(size),
+        }
+        status_code = http_response.status_code
+        if status_code >= 300 or "Error" in parsed:
+            error = parsed.get("Error", {}).get("Code")
+            args["error"] = error or f"HTTP {status_code}"
+        self._end_call(context, **args)
+
+    def _after_call_error(self, exception, context, **kwargs):
+        """Finish recording a failed API call."""
+        self._end_call(context, error=type(exception).__name__)
+
+    def _end_call(self, context, **args):
+        """Record the event for an API call."""
+        call = context.get(_CONTEXT_KEY)
+        if call is None:
+            return
+        name = f"{call['service']}.{call['operation']}"
+        args = {
+            "service": call["service"],
+            "operation": call["operation"],
+            "page": call["page"],
+            "throttles": call["throttles"],
+            **args,
+        }
+        self._add_event(name, "aws", call["start"], time.perf_counter(), args)
+
+
+_tracer = None
+
+
+def enable():
+    """Start tracing, instrumenting every client the shared registry
+    creates.
+
+    Returns:
+        The Tracer.
+    """
+    global _tracer
+    _tracer = Tracer()
+    clients.add_client_hook(_tracer.instrument)
+    return _tracer
+
+
+def get_tracer():
+    """Get the active Tracer, None when tracing is off."""
+    return _tracer
+
+
+@contextmanager
+def span(name, category="vpc_tree", **args):
+    """Context manager recording a span with the active Tracer, if any.
+
+    Args:
+        name: A string naming the span.
+        category: A string grouping similar spans.
+        args: Values to show with the span.
+    """
+    if _tracer is None:
+        yield
+    else:
+        with _tracer.span(name, category, **args):
+            yield
+
+
+def iter_span(name, iterable, category="vpc_tree", **args):
+    """Record how long generating the items of an iterable takes with the
+    active Tracer, if any, see Tracer.iter_span.
+
+    Args:
+        name: A string naming the span.
+        iterable: An iterable to generate the items of.
+        category: A string grouping similar spans.
+        args: Values to show with the span.
+
+    Returns:
+        An iterable of the items of iterable.
+    """
+    if _tracer is None:
+        return iterable
+    return _tracer.iter_span(name, iterable, category, **args)
@@ -0,0 +1,339 @@
+# tree_diff.py
+"""VPC Tree application's structural diff of two sets of trees.
+
+Every tree generator builds its lines with text_tree, so the depth of a
+node is the number of prefix parts before its text and the lines of a tree
+can be read back into nodes.  Each node is given a Merkle digest, a hash of
+its text and its children's digests, so two subtrees are identical exactly
+when their digests are, however large they are.
+
+Children are matched first by digest, skipping identical subtrees without
+looking inside them, then by key, the first " : " separated field of their
+text, which is the Id or name of a resource.  Siblings sharing a key, such
+as the permissions of one protocol, are matched by their whole text.  Only
+the added, removed and modified nodes are rendered, in the trees' own
+style, each line marked...
+    "+ " added
+    "- " removed
+    "~ " containing changes
+A node whose text changed is rendered as a removed line then an added line.
+"""
+
+import re
+from hashlib import blake2b
+
+from .prefix import ELBOW, PIPE, SPACE, TEE, get_prefix
+
+_PREFIX = re.compile(
+    "(?:" + "|".join(map(re.escape, (ELBOW, TEE, PIPE, SPACE))) + ")*"
+)
+_PREFIX_PART_LENGTH = len(ELBOW)
+
+ADDED = "+"
+REMOVED = "-"
+MODIFIED = "~"
+
+
+class Node:
+    """A node of a tree.
+
+    Attributes:
+        text: A string containing the text of the node, without its prefix.
+        children: A list of child Nodes.
+        digest: A bytes object hashing the text and the digests of the
+        children, set by parse_trees.
+    """
+
+    __slots__ = ("text", "children", "digest")
+
+    def __init__(self, text):
+        """Initializes instance."""
+        self.text = text
+        self.children = []
+        self.digest = None
+
+    @property
+    def key(self):
+        """The first field of the text, identifying the node among its
+        siblings."""
+        return self.text.split(" : ", 1)[0]
+
+
+def _split_line(line):
+    """Split a line into its depth and text."""
+    end = _PREFIX.match(line).end()
+    return end // _PREFIX_PART_LENGTH, line[end:]
+
+
+def _set_digest(node):
+    """Set the digest of a node from its text and its children's
+    digests."""
+    digest = blake2b(node.text.encode("utf-8"), digest_size=16)
+    for child in node.children:
+        digest.update(child.digest)
+    node.digest = digest.digest()
+
+
+def parse_trees(lines):
+    """Read the lines of trees back into nodes.
+
+    Args:
+        lines: An iterable of strings containing the lines of trees, such as
+        VPCTree.iter_vpc_lines generates, blank lines are skipped.
+
+    Returns:
+        A list of the Nodes at the roots of the trees.
+    """
+    roots = []
+    # The path from a root to the last node read, a node's parent is the
+    # node before it on the path.
+    path = []
+    for line in lines:
+        if not line.strip():
+            continue
+        depth, text = _split_line(line)
+        node = Node(text)
+        while len(path) > depth:
+            _set_digest(path.pop())
+        if len(path) == 0:
+            roots.append(node)
+        else:
+            path[-1].children.append(node)
+        path.append(node)
+
+    while path:
+        _set_digest(path.pop())
+    return roots
+
+
+class TreeParser:
+    """Reads the lines of trees back into nodes again and again, reusing
+    the nodes of the subtrees whose lines are unchanged since the last
+    parse.
+
+    A subtree is reused when its first line is the same string object as
+    before and is followed by the same lines as before, as a
+    text_tree.RenderCache gives for the items that did not change, so only
+    the lines of the changed items are read and hashed again.  The nodes of
+    the last parse are shared, not copied, and never changed.  Keeping track
+    of the subtrees costs more than parse_trees when reading lines once.
+    """
+
+    def __init__(self):
+        """Initializes instance."""
+        self._lines = []
+        # For each line of the last parse, its depth, node, and the number
+        # of lines from it to the end of its subtree, None for blank lines.
+        self._depths = []
+        self._nodes = []
+        self._sizes = []
+
+    def parse(self, lines):
+        """Read the lines of trees back into nodes.
+
+        Args:
+            lines: An iterable of strings containing the lines of trees,
+            such as VPCTree.iter_vpc_lines generates, blank lines are
+            skipped.
+
+        Returns:
+            A list of the Nodes at the roots of the trees.
+        """
+        lines = list(lines)
+        count = len(lines)
+        old_depths, old_nodes, old_sizes = (
+            self._depths,
+            self._nodes,
+            self._sizes,
+        )
+        find_old = {id(line): i for i, line in enumerate(self._lines)}.get
+        depths = [None] * count
+        nodes = [None] * count
+        sizes = [None] * count
+
+        roots = []
+        # The path from a root to the last node read, a node's parent is the
+        # node before it on the path, and the index of each node's line.
+        path = []
+        starts = []
+        i = 0
+        while i < count:
+            line = lines[i]
+            if not line.strip():
+                i += 1
+                continue
+            j = find_old(id(line))
+            if j is not None and self._reusable(lines, i, j):
+                size = old_sizes[j]
+                depth = old_depths[j]
+                node = old_nodes[j]
+                new, old = slice(i, i + size), slice(j, j + size)
+                depths[new] = old_depths[old]
+                nodes[new] = old_nodes[old]
+                sizes[new] = old_sizes[old]
+            else:
+                size = 0
+                depth, text = _split_line(line)
+                node = Node(text)
+                depths[i] = depth
+                nodes[i] = node
+
+            while len(path) > depth:
+                _set_digest(path.pop())
+                start = starts.pop()
+                sizes[start] = i - start
+            if path:
+                path[-1].children.append(node)
+            else:
+                roots.append(node)
+
+            if size == 0:
+                path.append(node)
+                starts.append(i)
+                i += 1
+            else:
+                # The whole subtree was reused, the next line is not inside
+                # it.
+                i += size
+
+        while path:
+            _set_digest(path.pop())
+            start = starts.pop()
+            sizes[start] = count - start
+
+        self._lines = lines
+        self._depths = depths
+        self._nodes = nodes
+        self._sizes = sizes
+        return roots
+
+    def _reusable(self, lines, i, j):
+        """Check the subtree of line j of the last parse is the subtree of
+        line i."""
+        size = self._sizes[j]
+        if lines[slice(i, i + size)] != self._lines[slice(j, j + size)]:
+            return False
+        if i + size == len(lines):
+            return True
+        # A subtree ends at a line no deeper than its root.
+        next_line = lines[i + size]
+        return next_line.strip() != "" and (
+            _split_line(next_line)[0] <= self._depths[j]
+        )
+
+
+def diff_nodes(old_nodes, new_nodes):
+    """Match two lists of sibling nodes.
+
+    Args:
+        old_nodes: A list of Nodes.
+        new_nodes: A list of Nodes.
+
+    Returns:
+        A list of (marker, old_node, new_node) tuples for the nodes that
+        differ, marker being ADDED with old_node None, REMOVED with new_node
+        None or MODIFIED.  Added and modified nodes are in the order of
+        new_nodes, followed by the removed nodes in the order of old_nodes.
+    """
+    by_digest = {}
+    for node in old_nodes:
+        by_digest.setdefault(node.digest, []).append(node)
+    unmatched = []
+    for node in new_nodes:
+        same = by_digest.get(node.digest)
+        if same:
+            same.pop(0)
+        else:
+            unmatched.append(node)
+
+    remaining = [node for nodes in by_digest.values() for node in nodes]
+    remaining_ids = {id(node) for node in remaining}
+    key = _sibling_key(old_nodes, new_nodes)
+    by_key = {}
+    for node in old_nodes:
+        if id(node) in remaining_ids:
+            by_key.setdefault(key(node), []).append(node)
+
+    changes = []
+    for node in unmatched:
+        same_key = by_key.get(key(node))
+        if same_key:
+            changes.append((MODIFIED, same_key.pop(0), node))
+        else:
+            changes.append((ADDED, None, node))
+
+    for node in old_nodes:
+        same_key = by_key.get(key(node))
+        if same_key and same_key[0] is node:
+            changes.append((REMOVED, same_key.pop(0), None))
+    return changes
+
+
+def _sibling_key(old_nodes, new_nodes):
+    """Get a function giving the key to match a node with among its
+    siblings, the whole text of the node when several siblings on either
+    side share its key, such as the permissions of one protocol."""
+    shared = set()
+    for nodes in (old_nodes, new_nodes):
+        seen = set()
+        for node in nodes:
+            node_key = node.key
+            if node_key in seen:
+                shared.add(node_key)
+            seen.add(node_key)
+
+    def key(node):
+        node_key = node.key
+        return node.text if node_key in shared else node_key
+
+    return key
+
+
+def iter_diff_lines(old_roots, new_roots):
+    """Generate the lines of a diff between two sets of trees.
+
+    Args:
+        old_roots: A list of Nodes, see parse_trees.
+        new_roots: A list of Nodes.
+
+    Yields:
+        Strings containing the lines of the added, removed and modified
+        nodes, empty if the trees are identical.
+    """
+    for i, change in enumerate(diff_nodes(old_roots, new_roots)):
+        if i > 0:
+            yield ""
+        yield from _iter_change(change, [])
+
+
+def _iter_change(change, prefix_description):
+    """Generate the lines of one change and the changes beneath it."""
+    marker, old_node, new_node = change
+    if marker == ADDED:
+        yield from _iter_subtree(ADDED, new_node, prefix_description)
+        return
+    if marker == REMOVED:
+        yield from _iter_subtree(REMOVED, old_node, prefix_description)
+        return
+
+    prefix = get_prefix(prefix_description)
+    if old_node.text == new_node.text:
+        yield f"{MODIFIED} {prefix}{new_node.text}"
+    else:
+        yield f"{REMOVED} {prefix}{old_node.text}"
+        yield f"{ADDED} {prefix}{new_node.text}"
+
+    changes = diff_nodes(old_node.children, new_node.children)
+    for i, child_change in enumerate(changes):
+        yield from _iter_change(
+            child_change, prefix_description + [i == len(changes) - 1]
+        )
+
+
+def _iter_subtree(marker, node, prefix_description):
+    """Generate the lines of a whole subtree, each with the same marker."""
+    yield f"{marker} {get_prefix(prefix_description)}{node.text}"
+    for i, child in enumerate(node.children):
+        yield from _iter_subtree(
+            marker, child, prefix_description + [i == len(node.children) - 1]
+        )
@@ -1,45 +1,528 @@
 # vpc_tree.py
 """VPC Tree main module."""
 
-import boto3
+import os
+import stat
+import sys
+import time
+
 from . import (
     asg_tree,
     aws_resources,
+    capacity_tree,
+    fetch,
     lb_tree,
+    lookup,
+    model,
+    reachability,
     sg_tree,
+    snapshot,
     subnet_tree,
     tags,
+    text_tree,
     tg_tree,
+    trace,
+    tree_diff,
+    watch,
+)
+from .fetch import (
+    DEFAULT_MAX_WORKERS,
+    SECTION_RESOURCES,
+    SECTIONS,
+    TARGET_GROUPS_BY_REGION,
 )
 
+# The number of addresses --lookup reads from a file before answering them
+# together in a batch.
+LOOKUP_BATCH_SIZE = 10000
+
+# The trace span name and tree generator class of each section, the class is
+# passed the section's fetch.SECTION_RESOURCES.
+SECTION_TREES = {
+    "sgs": ("sg_tree", sg_tree.SGTree),
+    "subnets": ("subnet_tree", subnet_tree.SubnetTree),
+    "lbs": ("lb_tree", lb_tree.LBTree),
+    "asgs": ("asg_tree", asg_tree.ASGTree),
+    "tgs": ("tg_tree", tg_tree.TGTree),
+}
+
 
 class VPCTree:
     """Provide output for VPCTree command line app."""
 
-    def display_vpc_list(self):
-        """Print a list of all Virtual Private Clouds."""
-        vpcs = self._generate_vpc_list(aws_resources.get_vpcs())
-        for entry in vpcs:
-            print(entry)
+    def display_vpc_list(
+        self, region_names=None, max_workers=DEFAULT_MAX_WORKERS
+    ):
+        """Print a list of all Virtual Private Clouds.
+
+        Args:
+            region_names: A list of strings containing the AWS regions to
+            list concurrently, each line starting with its region, None to
+            list the default region.
+            max_workers: An integer giving the maximum number of regions to
+            fetch at the same time.
 
-    def display_vpc_tree(self, vpc_id):
+        Returns:
+            True if every region was listed, False if any failed, their errors
+            are printed to standard error.
+        """
+        if region_names is None:
+            vpcs = self._generate_vpc_list(aws_resources.get_vpcs())
+            for entry in vpcs:
+                print(entry)
+            return True
+
+        listed = True
+        for region_name, vpcs, error in fetch.iter_region_vpcs(
+            region_names, max_workers
+        ):
+            if error is not None:
+                print(
+                    f"vpc_tree: error: {region_name}: {error}",
+                    file=sys.stderr,
+                )
+                listed = False
+                continue
+            self._write_lines(
+                f"{region_name} : {entry}"
+                for entry in self._generate_vpc_list(vpcs)
+            )
+        return listed
+
+    def display_vpc_tree(
+        self,
+        vpc_id,
+        max_workers=DEFAULT_MAX_WORKERS,
+        target_group_mode=TARGET_GROUPS_BY_REGION,
+        snapshot_path=None,
+        sections=SECTIONS,
+        scope=None,
+    ):
         """Print a tree displaying the resources in a Virtual Private Cloud.
 
         Args:
             vpc_id: A string containing the Id of the Virtual Private Cloud to
             display.
+            max_workers: An integer giving the maximum number of Boto3 calls
+            to make at the same time.
+            target_group_mode: One of fetch.TARGET_GROUP_MODES selecting how
+            Target Groups are fetched.
+            snapshot_path: A string containing the path of a snapshot file to
+            save the fetched resources to, None to not save them.
+            sections: A collection of fetch.SECTIONS to display, only their
+            resources are fetched.
+            scope: A dictionary scoping the Security Groups, Subnets and
+            Instances fetched, see aws_resources.scope_filters, None to
+            display all of them.
+        """
+        with fetch.fetching_vpc_resources(
+            vpc_id, max_workers, target_group_mode, sections, scope
+        ) as resources:
+            self._write_lines(self.iter_vpc_lines(resources, sections))
+            if snapshot_path is not None:
+                snapshot.save_snapshot(snapshot_path, [resources.result()])
+
+    def display_vpcs_tree(
+        self,
+        vpc_ids=None,
+        max_workers=DEFAULT_MAX_WORKERS,
+        target_group_mode=TARGET_GROUPS_BY_REGION,
+        snapshot_path=None,
+        sections=SECTIONS,
+        scope=None,
+    ):
+        """Print trees displaying the resources in several Virtual Private
+        Clouds, fetching the region wide resources once for all of them.
+
+        Args:
+            vpc_ids: A list of strings containing the Ids of the Virtual
+            Private Clouds to display, None to display every Virtual Private
+            Cloud in the region.
+            max_workers: An integer giving the maximum number of Boto3 calls
+            to make at the same time.
+            target_group_mode: One of fetch.TARGET_GROUP_MODES selecting how
+            Target Groups are fetched.
+            snapshot_path: A string containing the path of a snapshot file to
+            save the fetched resources to, None to not save them.
+            sections: A collection of fetch.SECTIONS to display, only their
+            resources are fetched.
+            scope: A dictionary scoping the Security Groups, Subnets and
+            Instances fetched, see aws_resources.scope_filters, None to
+            display all of them.
+        """
+        fetched = []
+        with fetch.fetching_vpcs_resources(
+            vpc_ids,
+            max_workers,
+            target_group_mode,
+            sections=sections,
+            scope=scope,
+        ) as vpcs_resources:
+            for i, resources in enumerate(vpcs_resources):
+                if i > 0:
+                    self._write_lines([""])
+                self._write_lines(self.iter_vpc_lines(resources, sections))
+                fetched.append(resources)
+
+            if snapshot_path is not None:
+                snapshot.save_snapshot(
+                    snapshot_path, (pending.result() for pending in fetched)
+                )
+
+    def display_snapshot_tree(
+        self, snapshot_path, vpc_ids=None, sections=SECTIONS, tag_filters=None
+    ):
+        """Print trees displaying Virtual Private Clouds saved in a snapshot.
+
+        Args:
+            snapshot_path: A string containing the path of the snapshot file.
+            vpc_ids: A list of strings containing the Ids of the Virtual
+            Private Clouds to display, None to display every Virtual Private
+            Cloud in the snapshot.
+            sections: A collection of fetch.SECTIONS to display.
+            tag_filters: A dictionary mapping tag keys to lists of values,
+            only the Security Groups, Subnets and Instances matching them are
+            displayed, None to display all of them.
+
+        Raises:
+            snapshot.SnapshotError: The file is not a valid snapshot or does
+            not contain one of vpc_ids.
+        """
+        vpcs_resources = self._iter_snapshot(snapshot_path, vpc_ids)
+        for i, resources in enumerate(vpcs_resources):
+            if tag_filters is not None:
+                resources = self._filter_by_tags(resources, tag_filters)
+            if i > 0:
+                self._write_lines([""])
+            self._write_lines(self.iter_vpc_lines(resources, sections))
+
+    def display_lookup(
+        self,
+        lines,
+        vpc_ids=None,
+        max_workers=DEFAULT_MAX_WORKERS,
+        snapshot_path=None,
+    ):
+        """Print the Subnet and Instance each IPv4 address belongs to.
+
+        Only the Subnets and Instances are fetched.  Each address is
+        answered as soon as its line is read, so lines can be a stream,
+        unless lines is a regular file, when addresses are answered in
+        batches of LOOKUP_BATCH_SIZE.
+
+        Args:
+            lines: An iterable of strings, each containing an IPv4 address.
+            vpc_ids: A list of strings containing the Ids of the Virtual
+            Private Clouds to search, None to search every Virtual Private
+            Cloud in the region or snapshot.
+            max_workers: An integer giving the maximum number of Boto3 calls
+            to make at the same time.
+            snapshot_path: A string containing the path of a snapshot file to
+            search instead of fetching from AWS, None to fetch.
+
+        Raises:
+            snapshot.SnapshotError: The file is not a valid snapshot or does
+            not contain one of vpc_ids.
+        """
+        vpcs_resources = self._get_vpcs_resources(
+            vpc_ids, max_workers, snapshot_path, ("subnets",)
+        )
+        index = lookup.LookupIndex(vpcs_resources)
+        if _is_regular_file(lines):
+            self._write_lines(
+                index.iter_lookup_lines(lines, LOOKUP_BATCH_SIZE)
+            )
+            return
+
+        write = sys.stdout.write
+        for line in index.iter_lookup_lines(lines):
+            write(line)
+            write("\n")
+            sys.stdout.flush()
+
+    def display_reachability(
+        self,
+        port,
+        source,
+        protocol="tcp",
+        vpc_ids=None,
+        max_workers=DEFAULT_MAX_WORKERS,
+        snapshot_path=None,
+    ):
+        """Print the Instances that can receive traffic on a port from a
+        source, and the Security Group rules allowing it.
+
+        Only the Security Groups, Subnets and Instances are fetched.
+
+        Args:
+            port: An integer giving the destination port.
+            source: A string containing a Security Group Id, an IPv4 CIDR
+            block or an IPv4 address.
+            protocol: A string containing the protocol, such as "tcp".
+            vpc_ids: A list of strings containing the Ids of the Virtual
+            Private Clouds to search, None to search every Virtual Private
+            Cloud in the region or snapshot.
+            max_workers: An integer giving the maximum number of Boto3 calls
+            to make at the same time.
+            snapshot_path: A string containing the path of a snapshot file to
+            search instead of fetching from AWS, None to fetch.
+
+        Raises:
+            snapshot.SnapshotError: The file is not a valid snapshot or does
+            not contain one of vpc_ids.
+        """
+        vpcs_resources = self._get_vpcs_resources(
+            vpc_ids, max_workers, snapshot_path, ("sgs", "subnets")
+        )
+        index = reachability.ReachabilityIndex(vpcs_resources)
+        self._write_lines(index.iter_query_lines(port, source, protocol))
+
+    def display_capacity(self, vpc_ids=None, snapshot_path=None):
+        """Print trees displaying the capacity of Virtual Private Clouds,
+        the addresses available in each Subnet and the free CIDR blocks
+        left in each of their CIDR blocks.
+
+        Only the Virtual Private Clouds and Subnets are fetched.
+
+        Args:
+            vpc_ids: A list of strings containing the Ids of the Virtual
+            Private Clouds to display, None to display every Virtual Private
+            Cloud in the region or snapshot.
+            snapshot_path: A string containing the path of a snapshot file to
+            display instead of fetching from AWS, None to fetch.
+
+        Raises:
+            snapshot.SnapshotError: The file is not a valid snapshot or does
+            not contain one of vpc_ids.
+        """
+        if snapshot_path is None:
+            vpcs = model.project(
+                model.VPC, aws_resources.get_vpcs(vpc_ids=vpc_ids)
+            )
+            if vpc_ids is not None:
+                order = {vpc_id: i for i, vpc_id in enumerate(vpc_ids)}
+                vpcs.sort(key=lambda vpc: order[vpc.vpc_id])
+            subnets = {}
+            for subnet in model.project(
+                model.Subnet, aws_resources.get_subnets_in_vpcs(vpc_ids)
+            ):
+                subnets.setdefault(subnet.vpc_id, []).append(subnet)
+            vpcs_subnets = [
+                (vpc, subnets.get(vpc.vpc_id, [])) for vpc in vpcs
+            ]
+        else:
+            vpcs_subnets = [
+                (resources.vpc, resources.subnets)
+                for resources in self._iter_snapshot(snapshot_path, vpc_ids)
+            ]
+
+        for i, (vpc, subnets) in enumerate(vpcs_subnets):
+            if i > 0:
+                self._write_lines([""])
+            tree_generator = capacity_tree.CapacityTree(vpc, subnets)
+            self._write_lines(
+                [self._get_vpc_description(vpc)]
+                + list(tree_generator.iter_lines([True]))
+            )
+
+    def display_diff(
+        self,
+        old_snapshot_path,
+        vpc_ids=None,
+        max_workers=DEFAULT_MAX_WORKERS,
+        target_group_mode=TARGET_GROUPS_BY_REGION,
+        snapshot_path=None,
+    ):
+        """Print what changed in the trees of Virtual Private Clouds since a
+        snapshot was saved, see tree_diff.
+
+        Args:
+            old_snapshot_path: A string containing the path of the snapshot
+            file to compare against.
+            vpc_ids: A list of strings containing the Ids of the Virtual
+            Private Clouds to compare, None to compare every Virtual Private
+            Cloud in either side.  Those no longer in AWS are shown as
+            removed.
+            max_workers: An integer giving the maximum number of Boto3 calls
+            to make at the same time.
+            target_group_mode: One of fetch.TARGET_GROUP_MODES selecting how
+            Target Groups are fetched.
+            snapshot_path: A string containing the path of a snapshot file
+            holding the new state, None to fetch it from AWS.
+
+        Returns:
+            True if the trees differ, False if they are identical.
+
+        Raises:
+            snapshot.SnapshotError: A file is not a valid snapshot.
+        """
+        old_roots = self._parse_vpc_trees(
+            self._iter_snapshot(old_snapshot_path, vpc_ids, False)
+        )
+        if snapshot_path is None:
+            if vpc_ids is not None:
+                # The VPCs deleted since the snapshot are shown as removed.
+                vpc_ids = aws_resources.get_existing_vpc_ids(vpc_ids)
+            if vpc_ids == []:
+                new_roots = []
+            else:
+                with fetch.fetching_vpcs_resources(
+                    vpc_ids, max_workers, target_group_mode
+                ) as vpcs_resources:
+                    new_roots = self._parse_vpc_trees(vpcs_resources)
+        else:
+            new_roots = self._parse_vpc_trees(
+                self._iter_snapshot(snapshot_path, vpc_ids, False)
+            )
+
+        differs = False
+        write = sys.stdout.write
+        for line in tree_diff.iter_diff_lines(old_roots, new_roots):
+            differs = True
+            write(line)
+            write("\n")
+        sys.stdout.flush()
+        return differs
+
+    def display_watch(
+        self,
+        vpc_id,
+        interval,
+        max_workers=DEFAULT_MAX_WORKERS,
+        target_group_mode=TARGET_GROUPS_BY_REGION,
+        sections=SECTIONS,
+        scope=None,
+        slow_every=watch.DEFAULT_SLOW_EVERY,
+        polls=None,
+    ):
+        """Print the tree of a Virtual Private Cloud, then poll it on an
+        interval and print what changed after each poll, see watch.
+
+        Nothing is printed for a poll finding no changes, otherwise the time
+        and the changes are printed in the style of display_diff.  Only the
+        resources that changed are generated again, and only their lines are
+        read back into nodes to diff.
+
+        Args:
+            vpc_id: A string containing the Id of the Virtual Private Cloud to
+            watch.
+            interval: A number giving the seconds from the start of one poll
+            to the start of the next.
+            max_workers: An integer giving the maximum number of Boto3 calls
+            to make at the same time.
+            target_group_mode: One of fetch.TARGET_GROUP_MODES selecting how
+            Target Groups are fetched.
+            sections: A collection of fetch.SECTIONS to display, only their
+            resources are fetched.
+            scope: A dictionary scoping the Security Groups, Subnets and
+            Instances fetched, see aws_resources.scope_filters, None to
+            display all of them.
+            slow_every: An integer giving the number of polls between
+            fetching the region wide Load Balancers, Auto Scaling Groups and
+            Target Groups.
+            polls: An integer giving the number of polls to make, None to
+            poll until interrupted.
+        """
+        poller = watch.Poller(
+            vpc_id, max_workers, target_group_mode, sections, scope, slow_every
+        )
+        render_cache = text_tree.RenderCache()
+        # Reuses the nodes of the resources whose lines render_cache reused.
+        parser = tree_diff.TreeParser()
+        lines = None
+        # The nodes of lines, only parsed once the tree changes.
+        roots = None
+        next_poll = time.monotonic()
+        while polls is None or poller.polls < polls:
+            if poller.polls > 0:
+                next_poll += interval
+                time.sleep(max(0, next_poll - time.monotonic()))
+            new_lines = list(
+                self.iter_vpc_lines(poller.poll(), sections, render_cache)
+            )
+            render_cache.sweep()
+            if lines is None:
+                self._write_lines(new_lines)
+            elif new_lines != lines:
+                if roots is None:
+                    roots = parser.parse(lines)
+                new_roots = parser.parse(new_lines)
+                self._write_lines(["", time.strftime("%Y-%m-%d %H:%M:%S")])
+                self._write_lines(tree_diff.iter_diff_lines(roots, new_roots))
+                roots = new_roots
+            lines = new_lines
+
+    def iter_vpc_lines(self, resources, sections=SECTIONS, render_cache=None):
+        """Generate the lines of a tree describing a Virtual Private Cloud.
+
+        Each section of the tree is generated as soon as the resources it
+        needs are available.
+
+        Args:
+            resources: A VPCResources or fetch.PendingVPCResources instance
+            containing the Virtual Private Cloud and the resources linked to
+            it.
+            sections: A collection of fetch.SECTIONS to display, always in
+            the order of fetch.SECTIONS.
+            render_cache: A text_tree.RenderCache reusing the lines of
+            resources unchanged since the last tree generated with it, None
+            to generate every line.
+
+        Yields:
+            Strings containing the lines of the tree.
         """
-        text_tree = self._vpc_text(aws_resources.get_vpc(vpc_id))
-        for entry in text_tree:
-            print(entry)
+        yield self._get_vpc_description(resources.vpc)
+
+        sections = [section for section in SECTIONS if section in sections]
+        for i, section in enumerate(sections):
+            span_name, tree_class = SECTION_TREES[section]
+            # Resources are resolved outside the spans, and a span counts
+            # only the time spent generating lines, so it times generating
+            # its section, not waiting for AWS or writing the lines.
+            section_resources = [
+                getattr(resources, name)
+                for name in SECTION_RESOURCES[section]
+            ]
+            section_lines = self._iter_section_lines(
+                tree_class,
+                section_resources,
+                render_cache,
+                [i == len(sections) - 1],
+            )
+            yield from trace.iter_span(span_name, section_lines)
+
+    def _iter_section_lines(
+        self, tree_class, section_resources, render_cache, prefix_description
+    ):
+        """Generate the lines of a section with its tree generator class."""
+        tree_generator = tree_class(
+            *section_resources, render_cache=render_cache
+        )
+        yield from tree_generator.iter_lines(prefix_description)
+
+    def _parse_vpc_trees(self, vpcs_resources):
+        """Read the trees of several VPCResources into tree_diff.Nodes."""
+        return tree_diff.parse_trees(
+            line
+            for resources in vpcs_resources
+            for line in self.iter_vpc_lines(resources)
+        )
+
+    def _write_lines(self, lines):
+        """Write lines to standard output as they are generated."""
+        write = sys.stdout.write
+        for line in lines:
+            write(line)
+            write("\n")
+        sys.stdout.flush()
 
     def _generate_vpc_list(self, vpcs):
         """Return a list of Virtual Private Clouds in AWS account."""
         text = []
 
-        for vpc in vpcs:
-            vpc_id = vpc["VpcId"]
-            name = tags.get_tag_value(vpc, "Name")
+        for vpc in model.project(model.VPC, vpcs):
+            vpc_id = vpc.vpc_id
+            name = vpc.name
 
             if name is None:
                 text.append(f"{vpc_id}")
@@ -48,63 +531,98 @@ class VPCTree:
 
         return text
 
-    def _vpc_text(self, vpc):
-        """Describe Virtual Private Cloud as a list of strings."""
-        text_tree = []
-
-        text_tree.append(self._get_vpc_description(vpc))
+    def _get_vpcs_resources(
+        self, vpc_ids, max_workers, snapshot_path, sections
+    ):
+        """Fetch the resources of sections in vpc_ids, or every Virtual
+        Private Cloud when vpc_ids is None, or load them from a snapshot
+        when snapshot_path is not None."""
+        if snapshot_path is not None:
+            return self._iter_snapshot(snapshot_path, vpc_ids)
+        with fetch.fetching_vpcs_resources(
+            vpc_ids, max_workers, sections=sections
+        ) as pending:
+            return [resources.result() for resources in pending]
 
-        vpc_id = vpc["VpcId"]
+    def _iter_snapshot(self, snapshot_path, vpc_ids, required=True):
+        """Read the VPCResources of vpc_ids, in their order, or of every
+        Virtual Private Cloud in the order saved when vpc_ids is None, from
+        a snapshot one Virtual Private Cloud at a time, raising
+        snapshot.SnapshotError for a missing one unless not required.
 
-        security_groups = aws_resources.get_security_groups(vpc_id)
-        sg_tree_generator = sg_tree.SGTree(security_groups)
-        sg_tree_generator.generate(text_tree, [False])
+        Virtual Private Clouds saved before their turn in vpc_ids are held
+        until it comes.
+        """
+        vpcs_resources = snapshot.iter_snapshot(
+            snapshot_path, None if vpc_ids is None else set(vpc_ids)
+        )
+        if vpc_ids is None:
+            yield from vpcs_resources
+            return
 
-        subnets = aws_resources.get_subnets(vpc_id)
-        instances = aws_resources.get_instances(vpc_id)
-        subnet_tree_generator = subnet_tree.SubnetTree(subnets, instances)
-        subnet_tree_generator.generate(text_tree, [False])
+        early = {}
+        for vpc_id in vpc_ids:
+            while vpc_id not in early:
+                resources = next(vpcs_resources, None)
+                if resources is None:
+                    break
+                early[resources.vpc.vpc_id] = resources
+            if vpc_id in early:
+                yield early.pop(vpc_id)
+            elif required:
+                raise snapshot.SnapshotError(
+                    f"{vpc_id} is not in the snapshot"
+                )
 
-        load_balancers = aws_resources.get_load_balancers()
-        load_balancers = aws_resources.filter_load_balancers_by_vpc(
-            load_balancers, vpc_id
-        )
-        lb_tree_generator = lb_tree.LBTree(load_balancers)
-        lb_tree_generator.generate(text_tree, [False])
-
-        auto_scaling_groups = aws_resources.get_auto_scaling_groups()
-        subnet_ids = aws_resources.get_subnet_ids(subnets)
-        auto_scaling_groups = (
-            aws_resources.filter_auto_scaling_groups_by_subnets(
-                auto_scaling_groups, subnet_ids
+    def _filter_by_tags(self, resources, tag_filters):
+        """Filter the Security Groups, Subnets and Instances of a
+        VPCResources by tags, with one index of their tags."""
+        index = tags.index_tags(
+            (
+                *resources.security_groups,
+                *resources.subnets,
+                *resources.instances,
             )
         )
-        asg_tree_generator = asg_tree.ASGTree(auto_scaling_groups)
-        asg_tree_generator.generate(text_tree, [False])
+        matched = index.match(tag_filters)
+
+        def keep(resources):
+            return [r for r in resources if r.resource_id in matched]
 
-        load_balancer_arns = aws_resources.get_load_balancer_arns(
-            load_balancers
+        return fetch.VPCResources(
+            resources.vpc,
+            keep(resources.security_groups),
+            keep(resources.subnets),
+            keep(resources.instances),
+            resources.load_balancers,
+            resources.auto_scaling_groups,
+            resources.target_groups,
         )
-        target_groups = aws_resources.get_target_groups(load_balancer_arns)
-        tg_tree_generator = tg_tree.TGTree(target_groups)
-        tg_tree_generator.generate(text_tree, [True])
 
-        return text_tree
+    def _vpc_text(self, resources):
+        """Describe Virtual Private Cloud as a list of strings.
 
-    def _get_vpc(self, vpc_id):
-        """Get Virtual Private Cloud linked to vpc_id."""
-        client = boto3.client("ec2")
-        response = client.describe_vpcs(
-            VpcIds=[vpc_id],
-        )
-        return response["Vpcs"][0]
+        Args:
+            resources: A VPCResources instance containing the Virtual Private
+            Cloud and the resources linked to it.
+        """
+        return list(self.iter_vpc_lines(resources))
 
     def _get_vpc_description(self, vpc):
         """Get description of Virtual Private Cloud in vpc."""
-        vpc_id = vpc["VpcId"]
-        name = tags.get_tag_value(vpc["Tags"], "Name")
-        cidr_block = vpc["CidrBlock"]
+        vpc_id = vpc.vpc_id
+        name = vpc.name
+        cidr_block = vpc.cidr_block
         if name is None:
             return f"{vpc_id} : {cidr_block}"
         else:
             return f"{vpc_id} : {name} : {cidr_block}"
+
+
+def _is_regular_file(stream):
+    """Check whether a stream reads a regular file, rather than a pipe or a
+    terminal that may still be written to."""
+    try:
+        return stat.S_ISREG(os.fstat(stream.fileno()).st_mode)
+    except (AttributeError, OSError, ValueError):
+        return False
@@ -0,0 +1,112 @@
+# watch.py
+"""VPC Tree application's polling of a Virtual Private Cloud to watch it
+change.
+
+Resources are polled in two tiers, so watching a deploy roll through an
+Auto Scaling Group makes as few AWS calls as it can...
+- The Security Groups, Subnets and Instances are fetched every poll, with
+  EC2 calls filtered to the Virtual Private Cloud.
+- The Load Balancers, Auto Scaling Groups and Target Groups are fetched
+  every slow_every polls, as each describes the whole region.  The
+  resources from the last poll fetching them are kept in between.
+
+Each poll gives every resource, so the tree can be generated as usual.
+Generating it with a text_tree.RenderCache only runs the tree generators
+for the resources that changed since the last poll.
+"""
+
+from . import fetch
+from .fetch import (
+    DEFAULT_MAX_WORKERS,
+    RESOURCE_NAMES,
+    SECTIONS,
+    TARGET_GROUPS_BY_REGION,
+)
+
+# The sections whose resources are fetched with EC2 calls filtered to the
+# Virtual Private Cloud, polled every time.
+FAST_SECTIONS = ("sgs", "subnets")
+
+DEFAULT_SLOW_EVERY = 5
+
+
+class Poller:
+    """Polls the resources in a Virtual Private Cloud, fetching the region
+    wide resources less often than the rest.
+
+    Attributes:
+        vpc_id: A string containing the Virtual Private Cloud Id.
+        sections: A collection of fetch.SECTIONS to poll the resources of.
+        slow_every: An integer giving the number of polls between fetching
+        the Load Balancers, Auto Scaling Groups and Target Groups.
+        polls: An integer giving the number of polls made.
+    """
+
+    def __init__(
+        self,
+        vpc_id,
+        max_workers=DEFAULT_MAX_WORKERS,
+        target_group_mode=TARGET_GROUPS_BY_REGION,
+        sections=SECTIONS,
+        scope=None,
+        slow_every=DEFAULT_SLOW_EVERY,
+    ):
+        """Initializes instance.
+
+        Args:
+            vpc_id: A string containing the Virtual Private Cloud Id.
+            max_workers: An integer giving the maximum number of Boto3 calls
+            to make at the same time.
+            target_group_mode: One of fetch.TARGET_GROUP_MODES selecting how
+            Target Groups are fetched.
+            sections: A collection of fetch.SECTIONS to poll the resources
+            of.
+            scope: A dictionary scoping the resources fetched, see
+            aws_resources.scope_filters, None to fetch all of them.
+            slow_every: An integer giving the number of polls between
+            fetching the Load Balancers, Auto Scaling Groups and Target
+            Groups, 1 to fetch them every poll.
+        """
+        self.vpc_id = vpc_id
+        self.sections = sections
+        self.slow_every = slow_every
+        self.polls = 0
+        self._max_workers = max_workers
+        self._target_group_mode = target_group_mode
+        self._scope = scope
+        self._resources = None
+
+    def due_sections(self):
+        """Get the sections whose resources the next poll fetches.
+
+        Returns:
+            A tuple of fetch.SECTIONS, every section in sections on the first
+            poll and every slow_every polls, only those in FAST_SECTIONS in
+            between.
+        """
+        if self.polls % self.slow_every == 0:
+            return tuple(self.sections)
+        return tuple(s for s in self.sections if s in FAST_SECTIONS)
+
+    def poll(self):
+        """Fetch the resources that are due and merge them with those kept
+        from earlier polls.
+
+        Returns:
+            A fetch.VPCResources instance holding every resource in
+            sections.
+        """
+        fetched = fetch.fetch_vpc_resources(
+            self.vpc_id,
+            self._max_workers,
+            self._target_group_mode,
+            self.due_sections(),
+            self._scope,
+        )
+        if self._resources is not None:
+            for name in RESOURCE_NAMES:
+                if getattr(fetched, name) is None:
+                    setattr(fetched, name, getattr(self._resources, name))
+        self._resources = fetched
+        self.polls += 1
+        return fetched